@@ -0,0 +1,267 @@
+"""
+🔁 Backtest walk-forward ML Tempo
+Rejoue l'historique jour par jour : à chaque date de référence, le modèle
+ne connaît que les couleurs déjà publiées, et les quotas restants sont ceux
+de ce jour-là. Chaque jour cible (référence + horizon) est prédit avec les
+mêmes features et les mêmes règles EDF (tempo_rules.apply_rules) que
+predict_ml.py. Météo et consommation RTE du jour cible : valeurs observées
+(prévision parfaite, les prévisions passées ne sont pas archivées).
+
+- Réentraînement tous les --retrain-every jours, sur les jours publiés
+  (train_ml : mêmes features, hyperparamètres, poids de classe).
+- Fits en parallèle ; chaque modèle est mis en cache (format compilé) sous
+  l'empreinte de ses données d'entraînement et de ses hyperparamètres :
+  relancer le backtest ne réentraîne que les points nouveaux ou modifiés.
+- Rapport par saison et par horizon : accuracy, score de Brier, rappel rouge.
+
+Usage :
+    python ML/backtest_ml.py
+    python ML/backtest_ml.py --engine hgb --retrain-every 28 --horizons 1 2 3
+"""
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.preprocessing import LabelEncoder
+
+from compiled_model import export_model, load_compiled, save_compiled
+from features import quota_features
+from tempo_rules import COLORS, MAX_DAYS, ROUGE, apply_rules
+from train_ml import (
+    ENGINES, compute_class_weights, engineer_features, load_dataset, make_model, model_params
+)
+
+# ======================
+# PATHS
+# ======================
+CACHE_DIR = Path("ML/backtest_cache")
+OUTPUT_PATH = Path("ML/ml_backtest.json")
+
+RETRAIN_EVERY = 14          # jours entre deux réentraînements
+HORIZONS = [1, 2, 3, 4, 5, 6, 7]
+MIN_TRAIN_DAYS = 365        # historique minimal avant la première date de référence
+
+# ======================
+# DONNÉES
+# ======================
+def season_of(dates: pd.Series) -> np.ndarray:
+    """Année de début de la saison Tempo (1er sept. → 31 août)."""
+    return np.where(dates.dt.month >= 9, dates.dt.year, dates.dt.year - 1)
+
+def used_through(df: pd.DataFrame) -> np.ndarray:
+    """Jours consommés par couleur dans la saison, jour inclus : (N, 3) ordre COLORS."""
+    onehot = np.stack([(df["color"] == c).to_numpy() for c in COLORS], axis=1).astype(int)
+    used = np.zeros_like(onehot)
+    for _, idx in df.groupby("season").indices.items():
+        used[idx] = np.cumsum(onehot[idx], axis=0)
+    return used
+
+def retrain_points(dates: pd.Series, start: pd.Timestamp, every: int) -> list:
+    """Dates de réentraînement (tous les `every` jours à partir de `start`)."""
+    return list(pd.date_range(start, dates.max(), freq=f"{every}D"))
+
+def build_queries(df: pd.DataFrame, features: list, used: np.ndarray,
+                  asof_idx: np.ndarray, horizons: list) -> tuple:
+    """
+    Une ligne par (date de référence, horizon) dont le jour cible est dans le
+    dataset. Calendrier, météo et RTE : jour cible ; quotas : date de référence.
+    Retourne (X, indices cibles, horizons).
+    """
+    position = pd.Series(np.arange(len(df)), index=df["date"])
+    asof = np.repeat(asof_idx, len(horizons))
+    horizon = np.tile(horizons, len(asof_idx))
+    target_dates = df["date"].to_numpy()[asof] + pd.to_timedelta(horizon, unit="D").to_numpy()
+    target = position.reindex(target_dates).to_numpy()
+    found = ~np.isnan(target)
+    asof, horizon, target = asof[found], horizon[found], target[found].astype(int)
+
+    X = df[features].to_numpy(dtype=np.float64)[target]
+    # Quotas connus à la date de référence (saison du jour cible)
+    same_season = (df["season"].to_numpy()[asof] == df["season"].to_numpy()[target])[:, None]
+    remaining = np.maximum(0, np.array([MAX_DAYS[c] for c in COLORS]) - used[asof] * same_season)
+    pool = {**quota_features(remaining, df["month"].to_numpy()[target]), "horizon": horizon}
+    for name, values in pool.items():
+        if name in features:
+            X[:, features.index(name)] = values
+    return X, target, horizon
+
+# ======================
+# MODÈLES (cache par point de réentraînement)
+# ======================
+def cache_key(X: np.ndarray, y: np.ndarray, w: np.ndarray, engine: str, params: dict,
+              features: list) -> str:
+    h = hashlib.sha256()
+    for arr in (X, y, w):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(json.dumps({"engine": engine, "params": params, "features": features},
+                        sort_keys=True).encode())
+    return h.hexdigest()[:20]
+
+def fit_point(engine: str, params: dict, X: np.ndarray, y: np.ndarray, w: np.ndarray,
+              classes: list, features: list):
+    """Un modèle par point de réentraînement, compilé dans le worker."""
+    t0 = time.perf_counter()
+    model = make_model(engine, params=params)
+    model.fit(X, y, sample_weight=w)
+    return export_model(model, classes, features), time.perf_counter() - t0
+
+# ======================
+# MÉTRIQUES
+# ======================
+def metrics(P: np.ndarray, truth: np.ndarray) -> dict:
+    """accuracy, Brier multi-classe et rappel rouge ; P (N, 3) et truth (N,) ordre COLORS."""
+    onehot = np.eye(len(COLORS))[truth]
+    rouge = truth == ROUGE
+    pred = P.argmax(axis=1)
+    return {
+        "n": int(len(truth)),
+        "accuracy": round(float((pred == truth).mean()), 4),
+        "brier": round(float(((P - onehot) ** 2).sum(axis=1).mean()), 4),
+        "rougeDays": int(rouge.sum()),
+        "rougeRecall": round(float((pred[rouge] == ROUGE).mean()), 4) if rouge.any() else None,
+    }
+
+def grouped(P: np.ndarray, truth: np.ndarray, keys: np.ndarray) -> dict:
+    return {str(k): metrics(P[keys == k], truth[keys == k]) for k in np.unique(keys)}
+
+TABLE_HEADER = f"   {'':<10} {'jours':>6} {'accuracy':>9} {'Brier':>7} {'rappel rouge':>13}"
+
+def format_line(label: str, m: dict) -> str:
+    recall = "-" if m["rougeRecall"] is None else f"{m['rougeRecall']:.0%} ({m['rougeDays']})"
+    return f"   {label:<10} {m['n']:>6} {m['accuracy']:>9.2%} {m['brier']:>7.3f} {recall:>13}"
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Backtest walk-forward ML Tempo")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="gb")
+    parser.add_argument("--retrain-every", type=int, default=RETRAIN_EVERY,
+                        help="jours entre deux réentraînements")
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS,
+                        help="horizons en jours (1 = lendemain)")
+    parser.add_argument("--start", default=None,
+                        help="première date de référence (défaut : après un an d'historique)")
+    parser.add_argument("--end", default=None, help="dernière date de référence")
+    parser.add_argument("--jobs", type=int, default=-1, help="processus pour les fits")
+    parser.add_argument("--no-cache", action="store_true", help="réentraîne tous les points")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print(f"🔁 Backtest walk-forward ML Tempo ({ENGINES[args.engine][0]})")
+    df, features = engineer_features(load_dataset())
+    df = df.sort_values("date").reset_index(drop=True)
+    df["season"] = season_of(df["date"])
+    used = used_through(df)
+
+    le = LabelEncoder()
+    y_all = le.fit_transform(df["color"])
+    classes = list(le.classes_)
+    truth_all = np.array([COLORS.index(c) for c in df["color"]])
+    X_all = df[features].to_numpy(dtype=np.float64)
+    params = model_params(args.engine)
+
+    start = pd.Timestamp(args.start) if args.start \
+        else df["date"].min() + pd.Timedelta(days=MIN_TRAIN_DAYS)
+    end = pd.Timestamp(args.end) if args.end else df["date"].max()
+    points = [p for p in retrain_points(df["date"], start, args.retrain_every) if p <= end]
+
+    # ======================
+    # POINTS DE RÉENTRAÎNEMENT
+    # ======================
+    tasks = []
+    for point in points:
+        # Couleurs publiées au point de réentraînement : jours <= point
+        n_train = int((df["date"] <= point).sum())
+        y = y_all[:n_train]
+        if len(np.unique(y)) < len(classes):
+            print(f"⚠️ {point.date()} : toutes les couleurs ne sont pas encore observées, ignoré")
+            continue
+        weights = compute_class_weights(df["color"][:n_train], classes)
+        w = np.array([weights[c] for c in df["color"][:n_train]])
+        key = cache_key(X_all[:n_train], y, w, args.engine, params, features)
+        tasks.append({"point": point, "n_train": n_train, "w": w, "key": key,
+                      "path": CACHE_DIR / f"{key}.npz"})
+
+    todo = [t for t in tasks if args.no_cache or not t["path"].exists()]
+    print(f"🧠 {len(tasks)} points de réentraînement (tous les {args.retrain_every} jours), "
+          f"{len(tasks) - len(todo)} en cache, {len(todo)} à entraîner")
+
+    t0 = time.perf_counter()
+    fitted = Parallel(n_jobs=args.jobs)(
+        delayed(fit_point)(args.engine, params, X_all[:t["n_train"]], y_all[:t["n_train"]],
+                           t["w"], classes, features)
+        for t in todo
+    )
+    fit_seconds = sum(s for _, s in fitted)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for t, (forest, _) in zip(todo, fitted):
+        save_compiled(forest, t["path"])
+    if todo:
+        print(f"   ⏱️ {time.perf_counter() - t0:.1f} s (somme des fits {fit_seconds:.1f} s)")
+
+    # ======================
+    # REJEU
+    # ======================
+    dates = df["date"]
+    blocks = []
+    for i, t in enumerate(tasks):
+        window_end = tasks[i + 1]["point"] if i + 1 < len(tasks) else end + pd.Timedelta(days=1)
+        asof_idx = np.flatnonzero((dates >= t["point"]) & (dates < window_end) & (dates <= end))
+        X, target, horizon = build_queries(df, features, used, asof_idx, args.horizons)
+        if len(X) == 0:
+            continue
+        forest = load_compiled(t["path"])
+        probs = forest.predict_proba(X)
+        raw = np.zeros((len(X), len(COLORS)))
+        for j, c in enumerate(forest.classes):
+            raw[:, COLORS.index(c)] = probs[:, j]
+        target_dates = dates.iloc[target]
+        P = apply_rules(raw, target_dates.dt.weekday.to_numpy(), target_dates.dt.month.to_numpy(),
+                        df["temp"].to_numpy()[target])
+        blocks.append((P, truth_all[target], df["season"].to_numpy()[target], horizon))
+
+    if not blocks:
+        raise SystemExit("❌ Aucune date à rejouer sur la période demandée")
+    P, truth, season, horizon = (np.concatenate(parts) for parts in zip(*blocks))
+    season_label = np.array([f"{s}-{s + 1}" for s in season])
+
+    report = {
+        "engine": args.engine,
+        "retrainEvery": args.retrain_every,
+        "horizons": args.horizons,
+        "start": str(start.date()),
+        "end": str(end.date()),
+        "retrainPoints": len(tasks),
+        "fittedPoints": len(todo),
+        "seconds": round(time.perf_counter() - started, 1),
+        "overall": metrics(P, truth),
+        "bySeason": grouped(P, truth, season_label),
+        "byHorizon": grouped(P, truth, horizon),
+    }
+
+    # ======================
+    # RAPPORT
+    # ======================
+    print("\n📊 Par saison :")
+    print(TABLE_HEADER)
+    for label, m in report["bySeason"].items():
+        print(format_line(label, m))
+    print("\n📊 Par horizon :")
+    print(TABLE_HEADER)
+    for label, m in report["byHorizon"].items():
+        print(format_line(f"J+{label}", m))
+    print(format_line("total", report["overall"]))
+
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n💾 Sauvegardé : {args.output} ({report['seconds']:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+⏱️ Benchmark du format du dataset ML
+Compare l'export JSON (indent=2, lu par pd.read_json comme avant) et le
+format colonnaire de dataset_store.py (.npz + schéma), complet et projeté sur
+les colonnes de l'entraînement (train_ml.DATASET_COLUMNS), sur
+ML/ml_dataset.npz et sur des copies 10× / 100× plus grandes.
+Mesures : taille sur disque, temps de chargement médian, pic mémoire Python.
+
+Usage :
+    python ML/bench_dataset.py
+    python ML/bench_dataset.py --scales 1 10 --repeat 3
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import export_json, load_columns, save_columns, schema_path
+from train_ml import DATASET_COLUMNS, DATASET_PATH
+
+MB = 1024 * 1024
+
+def measure(load, repeat: int) -> tuple:
+    """(temps médian en s, pic mémoire Python en Mo) d'un chargement."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return float(np.median(times)), peak / MB
+
+def bench_scale(df: pd.DataFrame, scale: int, repeat: int, tmp: Path) -> list:
+    big = pd.concat([df] * scale, ignore_index=True)
+    json_path = tmp / f"dataset_x{scale}.json"
+    npz_path = tmp / f"dataset_x{scale}.npz"
+    export_json(json_path, big)
+    save_columns(npz_path, big)
+    npz_bytes = npz_path.stat().st_size + schema_path(npz_path).stat().st_size
+
+    formats = [
+        ("json", json_path.stat().st_size, lambda: pd.read_json(json_path)),
+        ("npz", npz_bytes, lambda: load_columns(npz_path)),
+        ("npz projeté", npz_bytes, lambda: load_columns(npz_path, DATASET_COLUMNS)),
+    ]
+    results = []
+    for name, size, load in formats:
+        seconds, peak = measure(load, repeat)
+        results.append({"format": name, "scale": scale, "rows": len(big), "bytes": size,
+                        "loadSeconds": round(seconds, 4), "peakMb": round(peak, 1)})
+    return results
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du format du dataset ML")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="facteurs de taille du dataset (1 = réel)")
+    parser.add_argument("--repeat", type=int, default=5, help="chargements par mesure")
+    parser.add_argument("--output", type=Path, default=None, help="résultats JSON")
+    args = parser.parse_args()
+
+    print("⏱️ Benchmark du format du dataset ML")
+    df = load_columns(DATASET_PATH)
+    print(f"📊 {len(df)} lignes, {len(df.columns)} colonnes "
+          f"(projection entraînement : {len([c for c in DATASET_COLUMNS if c in df.columns])})")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            print(f"🚀 × {scale} ({len(df) * scale:,} lignes)...")
+            results += bench_scale(df, scale, args.repeat, Path(tmp))
+
+    print("\n📊 Résultats :")
+    print(f"   {'format':<12} {'×':>4} {'lignes':>9} {'taille':>13} {'chargement (s)':>15} "
+          f"{'pic py (Mo)':>12}")
+    for r in results:
+        print(f"   {r['format']:<12} {r['scale']:>4} {r['rows']:>9,} {r['bytes']:>13,} "
+              f"{r['loadSeconds']:>15.4f} {r['peakMb']:>12.1f}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Sauvegardé : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
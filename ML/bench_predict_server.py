@@ -0,0 +1,105 @@
+"""
+⏱️ Benchmark du serveur de prédiction
+Génère de la charge sur POST /predict (plusieurs clients en parallèle)
+et rapporte le débit ainsi que les latences p50 / p99.
+
+Usage :
+    python ML/bench_predict_server.py --spawn --requests 2000 --concurrency 8
+    python ML/bench_predict_server.py --url http://127.0.0.1:8765 --dates 30
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent
+
+def wait_ready(url: str, timeout: float = 30.0) -> dict:
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as r:
+                return json.loads(r.read())
+        except OSError:
+            if time.time() > deadline:
+                raise SystemExit(f"❌ Serveur injoignable : {url}")
+            time.sleep(0.2)
+
+def make_payload(rng: random.Random, n_dates: int) -> bytes:
+    """Dates aléatoires dans la saison, températures et horizons aléatoires."""
+    start = date.today() + timedelta(days=rng.randint(0, 200))
+    days = [{
+        "date": (start + timedelta(days=i)).isoformat(),
+        "temperature": round(rng.uniform(-8, 20), 1),
+        "horizon": min(i, 9),
+    } for i in range(n_dates)]
+    return json.dumps({"days": days}).encode("utf-8")
+
+def timed_request(url: str, body: bytes) -> float:
+    req = urllib.request.Request(f"{url}/predict", data=body,
+                                 headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=30) as r:
+        r.read()
+        if r.status != 200:
+            raise RuntimeError(f"HTTP {r.status}")
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du serveur de prédiction ML")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dates", type=int, default=10, help="dates par requête")
+    parser.add_argument("--spawn", action="store_true",
+                        help="démarre le serveur localement le temps du benchmark")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(":", 1)[-1]
+        server = subprocess.Popen(
+            [sys.executable, str(ML_DIR / "predict_server.py"), "--port", port],
+            stdout=subprocess.DEVNULL,
+        )
+
+    try:
+        info = wait_ready(args.url)
+        print(f"🛰️ Serveur prêt : {info['modelType']} (chargé en {info['loadMs']} ms)")
+
+        rng = random.Random(42)
+        bodies = [make_payload(rng, args.dates) for _ in range(args.requests)]
+
+        # Échauffement
+        for body in bodies[:10]:
+            timed_request(args.url, body)
+
+        print(f"🚀 {args.requests} requêtes × {args.dates} dates, {args.concurrency} clients")
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = list(pool.map(lambda b: timed_request(args.url, b), bodies))
+        wall = time.perf_counter() - t0
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat_ms = np.array(latencies) * 1000
+    print("\n📊 Résultats :")
+    print(f"   Débit   : {args.requests / wall:,.0f} req/s "
+          f"({args.requests * args.dates / wall:,.0f} dates/s)")
+    print(f"   p50     : {np.percentile(lat_ms, 50):.2f} ms")
+    print(f"   p99     : {np.percentile(lat_ms, 99):.2f} ms")
+    print(f"   max     : {lat_ms.max():.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
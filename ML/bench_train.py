@@ -0,0 +1,162 @@
+"""
+⏱️ Benchmark des moteurs d'entraînement
+Compare GradientBoosting et HistGradientBoosting (mêmes features, mêmes
+poids de classe que train_ml.py) sur ML/ml_dataset.npz et sur des jeux
+synthétiques 10× / 100× plus grands (lignes réelles dupliquées, température
+et consommation RTE bruitées ; features météo glissantes recalculées sur la
+température bruitée de chaque copie). Mesures : temps d'entraînement, latence de
+prédiction (modèle compilé et sklearn), taille du modèle, accuracy en
+validation croisée par saison (même découpage que train_ml : les copies
+d'un même jour restent dans la même saison, donc le même fold).
+
+Usage :
+    python ML/bench_train.py
+    python ML/bench_train.py --scales 1 10 --engines hgb --cv-splits 0
+"""
+import argparse
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from compiled_model import export_model, save_compiled
+from features import WEATHER_FEATURES, temp_category, weather_features
+from train_ml import (
+    ENGINES, compute_class_weights, engineer_features, load_dataset, make_model, season_cv
+)
+
+PREDICT_ROWS = 15           # ~ taille de tempo.json
+PREDICT_REPEAT = 50
+TEMP_NOISE = 1.5            # °C
+RTE_NOISE = 0.02            # relatif
+
+# ======================
+# DONNÉES
+# ======================
+def synthetic(df: pd.DataFrame, features: list, scale: int, seed: int = 0) -> tuple:
+    """Duplique le dataset `scale` fois avec bruit ; retourne (X, y, dates)."""
+    rng = np.random.default_rng(seed)
+    X = pd.concat([df[features]] * scale, ignore_index=True)
+    y = np.tile(df["color"].to_numpy(), scale)
+    dates = np.tile(df["date"].to_numpy(), scale)
+
+    if scale > 1:
+        if "temp" in features:
+            X["temp"] += rng.normal(0, TEMP_NOISE, len(X))
+            if "temp_cat" in features:
+                X["temp_cat"] = temp_category(X["temp"])
+            # Chaque copie = une série météo cohérente : fenêtres recalculées sur sa température
+            day_dates = df["date"].to_numpy().astype("datetime64[D]")
+            copies = [weather_features(day_dates, temp, day_dates, temp)
+                      for temp in X["temp"].to_numpy().reshape(scale, len(df))]
+            for name in WEATHER_FEATURES:
+                if name in features:
+                    X[name] = np.concatenate([w[name] for w in copies])
+        if "rte" in features:
+            X["rte"] *= 1 + rng.normal(0, RTE_NOISE, len(X))
+    return X, y, dates
+
+# ======================
+# MESURES
+# ======================
+def model_sizes(model, compiled) -> tuple:
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.npz"
+        save_compiled(compiled, path)
+        return buf.getbuffer().nbytes, path.stat().st_size
+
+def predict_latency(predict, X: np.ndarray) -> float:
+    """Latence médiane (ms) d'un appel sur PREDICT_ROWS lignes."""
+    predict(X)
+    times = []
+    for _ in range(PREDICT_REPEAT):
+        t0 = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+def bench_engine(engine: str, X: pd.DataFrame, y: np.ndarray, dates: np.ndarray,
+                 cv_splits: int, n_jobs: int) -> dict:
+    le = LabelEncoder()
+    y_enc = le.fit_transform(y)
+    classes = list(le.classes_)
+    weights = compute_class_weights(y, classes)
+    sample_weights = np.array([weights[c] for c in y])
+
+    model = make_model(engine)
+    t0 = time.perf_counter()
+    model.fit(X, y_enc, sample_weight=sample_weights)
+    fit_s = time.perf_counter() - t0
+
+    compiled = export_model(model, classes, list(X.columns))
+    sample = X.iloc[:PREDICT_ROWS]
+    pickle_bytes, compiled_bytes = model_sizes(model, compiled)
+
+    result = {
+        "engine": engine,
+        "rows": len(X),
+        "fitSeconds": round(fit_s, 2),
+        "predictMsCompiled": round(predict_latency(compiled.predict_proba, sample.values), 2),
+        "predictMsSklearn": round(predict_latency(model.predict_proba, sample), 2),
+        "pickleBytes": pickle_bytes,
+        "compiledBytes": compiled_bytes,
+        "cvAccuracy": None,
+        "cvSeconds": None,
+    }
+    if cv_splits > 0:
+        folds, wall = season_cv(engine, X.values, y_enc, sample_weights, dates, cv_splits, n_jobs)
+        result["cvAccuracy"] = round(float(np.mean([f["accuracy"] for f in folds])), 4)
+        result["cvSeconds"] = round(wall, 2)
+    return result
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs d'entraînement ML")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="facteurs de taille du dataset (1 = réel)")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--cv-splits", type=int, default=5,
+                        help="saisons de test (0 = sans validation croisée)")
+    parser.add_argument("--jobs", type=int, default=-1, help="processus pour la validation")
+    parser.add_argument("--output", type=Path, default=None, help="résultats JSON")
+    args = parser.parse_args()
+
+    print("⏱️ Benchmark des moteurs d'entraînement")
+    df, features = engineer_features(load_dataset())
+
+    results = []
+    for scale in args.scales:
+        X, y, dates = synthetic(df, features, scale)
+        for engine in args.engines:
+            print(f"🚀 {ENGINES[engine][0]} × {scale} ({len(X):,} lignes)...")
+            r = bench_engine(engine, X, y, dates, args.cv_splits, args.jobs)
+            r["scale"] = scale
+            results.append(r)
+
+    print("\n📊 Résultats :")
+    print(f"   {'moteur':<6} {'×':>4} {'lignes':>9} {'fit (s)':>9} {'compilé (ms)':>13} "
+          f"{'sklearn (ms)':>13} {'pickle':>11} {'compilé':>10} {'CV acc':>7} {'CV (s)':>7}")
+    for r in results:
+        acc = "-" if r["cvAccuracy"] is None else f"{r['cvAccuracy']:.2%}"
+        cv_s = "-" if r["cvSeconds"] is None else f"{r['cvSeconds']:.1f}"
+        print(f"   {r['engine']:<6} {r['scale']:>4} {r['rows']:>9,} {r['fitSeconds']:>9.2f} "
+              f"{r['predictMsCompiled']:>13.2f} {r['predictMsSklearn']:>13.2f} "
+              f"{r['pickleBytes']:>11,} {r['compiledBytes']:>10,} {acc:>7} {cv_s:>7}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Sauvegardé : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,32 @@
 """
 📊 Construction dataset ML Tempo - CORRIGÉ
 Inclut les 3 couleurs (bleu, blanc, rouge) pour un entraînement équilibré.
+Construction colonnaire (pandas) : tempo, météo et RTE joints par date,
+quotas restants par somme cumulée groupée par saison et couleur, features
+calculées par le pipeline partagé avec l'entraînement et la prédiction
+(features.py), sans coût Python par ligne.
+Option --incremental : reprend le checkpoint (dernière date traitée, jours
+consommés par saison, empreintes des entrées) et n'ajoute au dataset que les
+nouvelles dates ; reconstruction complète si une couleur, une météo ou une
+consommation RTE déjà traitée a changé (empreinte sha256 différente).
+Sortie colonnaire typée (dataset_store.py) : ML/ml_dataset.npz + schéma
+ML/ml_dataset.schema.json ; --json exporte aussi ML/ml_dataset.json (débogage).
 """
+import argparse
+import hashlib
 import json
 import os
-from datetime import datetime
+import re
+import time
 from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import export_json, load_columns, save_columns, schema_path
+from features import DEFAULT_CONSUMPTION, DEFAULT_TEMP, compute_features, weather_features
+from tempo_rules import rouge_allowed
 
 # ======================
 # PATHS
@@ -15,15 +36,35 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TEMPO_PATH   = os.path.join(BASE_DIR, "history_real_tempo.json")
 WEATHER_PATH = os.path.join(BASE_DIR, "weather_history.json")
 RTE_PATH     = os.path.join(BASE_DIR, "rte_history.json")
-OUT_PATH     = os.path.join(BASE_DIR, "ML", "ml_dataset.json")
-
-print("📊 Construction dataset ML Tempo (3 couleurs : bleu + blanc + rouge)")
+OUT_PATH     = os.path.join(BASE_DIR, "ML", "ml_dataset.npz")
+JSON_PATH    = os.path.join(BASE_DIR, "ML", "ml_dataset.json")
+CHECKPOINT_PATH = os.path.join(BASE_DIR, "ML", "ml_dataset_checkpoint.json")
 
 # ======================
 # CONSTANTES TEMPO
 # ======================
 MAX_DAYS = {"bleu": 300, "blanc": 43, "rouge": 22}
 COLOR_PRIORITY = {"rouge": 3, "blanc": 2, "bleu": 1}
+COLORS = ["bleu", "blanc", "rouge"]
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Ordre des clés de chaque échantillon dans ml_dataset.json
+COLUMNS = [
+    "date", "color",
+    "weekday", "month", "day_of_month", "seasonDayIndex",
+    "isWeekend", "isWinter", "isPeakWinter", "winter_intensity",
+    "temp", "temperature", "temp_cat", "coldDays",
+    "heatingDegreeDays", "heatingDegreeDays7",
+    "tempMean3", "tempMean7", "tempMean14", "tempMin3", "tempMin7", "tempMin14", "tempDelta",
+    "rte", "rteConsommation", "energyStress",
+    "remainingBleu", "remainingBlanc", "remainingRouge", "winterBleuRemaining",
+    "blancUsageRatio", "rougeUsageRatio", "quota_pressure",
+    "horizon",
+]
+
+# À incrémenter quand le calcul d'une feature change : invalide le checkpoint
+BUILD_VERSION = 3
 
 # ======================
 # UTILS
@@ -35,200 +76,308 @@ def load(path):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def tempo_season_bounds(dt: datetime):
-    year = dt.year if dt.month >= 9 else dt.year - 1
-    return datetime(year, 9, 1), datetime(year + 1, 8, 31)
-
-def is_winter(dt: datetime) -> bool:
-    return dt.month in (11, 12, 1, 2, 3)
-
-def is_peak_winter(dt: datetime) -> bool:
-    return dt.month in (1, 2)
-
-def compute_temp_category(temp: float) -> int:
-    if temp < -5: return 0
-    if temp < 0: return 1
-    if temp < 5: return 2
-    if temp < 10: return 3
-    if temp < 15: return 4
-    return 5
-
-def get_winter_intensity(month: int) -> int:
-    return {11: 2, 12: 3, 1: 4, 2: 4, 3: 2}.get(month, 0)
-
-def compute_energy_stress(consumption: int) -> int:
-    if consumption >= 60000: return 3
-    elif consumption >= 52000: return 2
-    elif consumption >= 45000: return 1
-    return 0
-
-# ======================
-# LOAD DATA
-# ======================
-tempo_raw = load(TEMPO_PATH)
-weather   = load(WEATHER_PATH)
-rte       = load(RTE_PATH)
-
-print(f"📅 Tempo brut : {len(tempo_raw)} entrées")
-print(f"🌦️ Weather : {len(weather)} entrées")
-print(f"⚡ RTE : {len(rte)} entrées")
-
-# Vérification critique : présence de jours bleu
-color_check = Counter(
-    (e.get("color") or e.get("realColor", "")).lower()
-    for e in tempo_raw
-)
-print(f"📈 Distribution brute : {dict(color_check)}")
-
-if color_check.get("bleu", 0) == 0:
-    print("❌ ERREUR CRITIQUE : Aucun jour bleu dans history_real_tempo.json !")
-    print("   → Exécutez d'abord build_history_from_tempo_api.py pour récupérer")
-    print("     l'historique complet avec les jours bleu depuis l'API EDF.")
-    raise SystemExit("Dataset incomplet : pas de jours bleu")
-
-weather_by_date = {w["date"]: w for w in weather if isinstance(w, dict) and "date" in w}
-rte_by_date = {r["date"]: r for r in rte if isinstance(r, dict) and "date" in r}
+def records(raw: list, columns: list) -> pd.DataFrame:
+    """Entrées dict avec une date → DataFrame ; colonnes absentes = NaN, valeurs JSON
+    conservées telles quelles (dtype object : un entier reste un entier)."""
+    rows = [e for e in raw if isinstance(e, dict) and "date" in e]
+    return pd.DataFrame(rows, columns=["date"] + columns, dtype=object)
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Équivalent colonnaire de datetime.fromisoformat (NaT si invalide)."""
+    plain = dates.str.fullmatch(ISO_DATE.pattern).fillna(False).astype(bool)
+    parsed = pd.to_datetime(dates.where(plain), format="%Y-%m-%d", errors="coerce")
+    # Formats ISO plus rares (heure...) : chemin lent, ligne par ligne
+    for i in np.flatnonzero(~plain.to_numpy()):
+        try:
+            parsed.iloc[i] = datetime.fromisoformat(dates.iloc[i])
+        except (TypeError, ValueError):
+            pass
+    return parsed
+
+def usage_ratio_table(max_days: int) -> np.ndarray:
+    """round((max - restant) / max, 3) pour chaque restant possible (arrondi Python exact)."""
+    return np.array([round((max_days - r) / max_days, 3) for r in range(max_days + 1)])
 
 # ======================
 # DÉDUPLICATION TEMPO
 # ======================
-tempo_by_date = {}
-
-for entry in tempo_raw:
-    d = entry.get("date")
-    c = (entry.get("color") or entry.get("realColor", "")).lower().strip()
-    
-    if not d or c not in COLOR_PRIORITY:
-        continue
-    
-    if d not in tempo_by_date or COLOR_PRIORITY[c] > COLOR_PRIORITY[tempo_by_date[d]]:
-        tempo_by_date[d] = c
-
-print(f"📅 Tempo dédupliqué : {len(tempo_by_date)} jours uniques")
+def raw_colors(tempo: pd.DataFrame) -> pd.Series:
+    """color, sinon realColor (comme entry.get("color") or entry.get("realColor", ""))."""
+    color = tempo["color"].where(tempo["color"].astype(bool) & tempo["color"].notna())
+    return color.fillna(tempo["realColor"]).fillna("").astype(str).str.lower()
+
+def dedupe_tempo(tempo: pd.DataFrame) -> pd.DataFrame:
+    """Une couleur par date (priorité rouge > blanc > bleu, première entrée à égalité),
+    triée par date. Colonnes : date, color."""
+    df = pd.DataFrame({"date": tempo["date"], "color": raw_colors(tempo).str.strip()})
+    df = df[df["date"].notna() & df["date"].astype(bool) & df["color"].isin(list(COLOR_PRIORITY))]
+    df = df.assign(priority=df["color"].map(COLOR_PRIORITY).astype(int))
+    df = df.sort_values("priority", ascending=False, kind="stable")
+    df = df.drop_duplicates("date", keep="first")
+    return df.sort_values("date", kind="stable").reset_index(drop=True)[["date", "color"]]
 
 # ======================
 # BUILD DATASET ML
 # ======================
-dataset = []
-used_by_season = {}
-
-for date_str in sorted(tempo_by_date.keys()):
-    color = tempo_by_date[date_str]
-
-    try:
-        dt = datetime.fromisoformat(date_str)
-    except ValueError:
-        continue
-
-    season_start, season_end = tempo_season_bounds(dt)
-    if not (season_start <= dt <= season_end):
-        continue
-
-    season_key = season_start.strftime("%Y")
-
-    if season_key not in used_by_season:
-        used_by_season[season_key] = {"bleu": set(), "blanc": set(), "rouge": set()}
-
-    used = used_by_season[season_key]
-
-    # Règles EDF : rouge interdit hors hiver et samedi
-    if color == "rouge" and not is_winter(dt):
-        continue
-    if color == "rouge" and dt.weekday() == 5:
-        continue
-
-    used[color].add(date_str)
-
-    remaining_bleu  = max(0, MAX_DAYS["bleu"]  - len(used["bleu"]))
-    remaining_blanc = max(0, MAX_DAYS["blanc"] - len(used["blanc"]))
-    remaining_rouge = max(0, MAX_DAYS["rouge"] - len(used["rouge"]))
-
-    season_day_index = (dt - season_start).days + 1
-
-    # Données météo
-    w = weather_by_date.get(date_str, {})
-    temp = w.get("temperature", 10)
-
-    # Données RTE
-    r = rte_by_date.get(date_str, {})
-    consommation = r.get("consommation", 55000)
-
-    sample = {
-        "date": date_str,
-        "color": color,
-
-        # Calendrier
-        "weekday": dt.weekday(),
-        "month": dt.month,
-        "day_of_month": dt.day,
-        "seasonDayIndex": season_day_index,
-        "isWeekend": int(dt.weekday() >= 5),
-        "isWinter": int(is_winter(dt)),
-        "isPeakWinter": int(is_peak_winter(dt)),
-        "winter_intensity": get_winter_intensity(dt.month),
-
-        # Météo
-        "temp": temp,
-        "temperature": temp,
-        "temp_cat": compute_temp_category(temp),
-        "coldDays": w.get("coldDays", 0),
-
-        # Énergie
-        "rte": consommation,
-        "rteConsommation": consommation,
-        "energyStress": compute_energy_stress(consommation),
-
-        # Quotas Tempo
-        "remainingBleu": remaining_bleu,
-        "remainingBlanc": remaining_blanc,
-        "remainingRouge": remaining_rouge,
-        "winterBleuRemaining": remaining_bleu if is_winter(dt) else 0,
-
-        # Ratios
-        "blancUsageRatio": round((43 - remaining_blanc) / 43, 3),
-        "rougeUsageRatio": round((22 - remaining_rouge) / 22, 3),
-        "quota_pressure": round(
-            (43 - remaining_blanc) / 43 * 0.5 +
-            (22 - remaining_rouge) / 22 * 0.5, 3
-        ),
-
-        "horizon": 0
+def build_dataset(tempo: pd.DataFrame, weather: pd.DataFrame, rte: pd.DataFrame,
+                  used_before: dict = None) -> tuple:
+    """
+    (dataset en DataFrame aux colonnes COLUMNS, {saison: {couleur: jours}}).
+    `used_before` : jours déjà consommés par saison avant la première date de
+    `tempo` (mode incrémental) ; inclus dans les quotas et le décompte retourné.
+    """
+    df = tempo.copy()
+    dt = parse_dates(df["date"])
+    df = df[dt.notna()]
+    dt = dt[dt.notna()]
+
+    season_year = np.where(dt.dt.month >= 9, dt.dt.year, dt.dt.year - 1)
+    season_start = pd.to_datetime(pd.DataFrame({"year": season_year, "month": 9, "day": 1}))
+    season_end = pd.to_datetime(pd.DataFrame({"year": season_year + 1, "month": 8, "day": 31}))
+    in_season = ((dt.to_numpy() >= season_start.to_numpy())
+                 & (dt.to_numpy() <= season_end.to_numpy()))
+    df, dt = df[in_season], dt[in_season]
+    seasons = np.unique(season_year[in_season])
+    season_year = season_year[in_season]
+
+    # Règles EDF (tempo_rules) : rouge interdit hors hiver et samedi
+    weekday, month = dt.dt.weekday.to_numpy(), dt.dt.month.to_numpy()
+    keep = (df["color"] != "rouge").to_numpy() | rouge_allowed(weekday, month)
+    df, dt = df[keep].reset_index(drop=True), dt[keep].reset_index(drop=True)
+    season_year = season_year[keep]
+
+    # Jours consommés dans la saison, jour courant inclus
+    used_before = used_before or {}
+    onehot = pd.DataFrame({c: (df["color"] == c).astype(int) for c in COLORS})
+    used = onehot.groupby(season_year).cumsum()
+    zero = dict.fromkeys(COLORS, 0)
+    remaining = {
+        c: np.maximum(0, MAX_DAYS[c] - used[c].to_numpy()
+                      - np.array([used_before.get(str(s), zero)[c] for s in season_year], dtype=int))
+        for c in COLORS
     }
-
-    dataset.append(sample)
+    # Saisons rencontrées, même si tous leurs jours ont été écartés
+    used_by_season = {s: dict(counts) for s, counts in used_before.items()}
+    for s in seasons:
+        used_by_season.setdefault(str(s), dict(zero))
+    for s, counts in onehot.groupby(season_year).sum().iterrows():
+        used_by_season[str(s)] = {c: used_by_season[str(s)][c] + int(counts[c]) for c in COLORS}
+
+    # Météo et RTE : jointure par date (dernière entrée si date en double)
+    df = df.merge(weather.drop_duplicates("date", keep="last"), on="date", how="left")
+    df = df.merge(rte.drop_duplicates("date", keep="last"), on="date", how="left")
+    temp = df["temperature"].where(df["temperature"].notna(), DEFAULT_TEMP)
+    consumption = df["consommation"].where(df["consommation"].notna(), DEFAULT_CONSUMPTION)
+
+    # Features : pipeline partagé avec l'entraînement et la prédiction ;
+    # météo glissante sur tout l'historique météo (jours passés inclus)
+    dates = dt.to_numpy().astype("datetime64[D]")
+    columns = compute_features(
+        dates=dates,
+        temp=temp.to_numpy(),
+        rte=consumption.to_numpy(),
+        remaining=np.stack([remaining[c] for c in COLORS], axis=1),
+        horizon=0,
+        weather=weather_features(
+            dates, temp.to_numpy(dtype=float),
+            parse_dates(weather["date"]).to_numpy().astype("datetime64[D]"),
+            pd.to_numeric(weather["temperature"], errors="coerce").to_numpy(dtype=float),
+        ),
+    )
+    out = pd.DataFrame({
+        "date": df["date"],
+        "color": df["color"],
+        **{name: columns[name] for name in COLUMNS if name in columns},
+        # Ratios (dataset uniquement)
+        "blancUsageRatio": usage_ratio_table(43)[remaining["blanc"]],
+        "rougeUsageRatio": usage_ratio_table(22)[remaining["rouge"]],
+    }, columns=COLUMNS)
+    return out, used_by_season
 
 # ======================
-# STATISTIQUES
+# CHECKPOINT (mode incrémental)
 # ======================
-print(f"\n✅ Dataset généré : {len(dataset)} échantillons")
-
-if dataset:
-    colors = Counter(s["color"] for s in dataset)
-    print("\n📈 Distribution des couleurs :")
-    for c, n in colors.most_common():
-        pct = n / len(dataset) * 100
-        print(f"   {c}: {n} ({pct:.1f}%)")
-
-    # Vérification qualité
-    if colors.get("bleu", 0) < 50:
-        print(f"\n⚠️ Seulement {colors.get('bleu', 0)} jours bleu - le modèle risque d'être biaisé")
-    
-    print("\n📅 Par saison :")
-    for season, used in sorted(used_by_season.items()):
-        total = sum(len(v) for v in used.values())
-        print(f"   {season}-{int(season)+1}: {total} jours " +
-              f"(B:{len(used['bleu'])} W:{len(used['blanc'])} R:{len(used['rouge'])})")
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def frame_sha256(df: pd.DataFrame) -> str:
+    """Empreinte des lignes d'un DataFrame, indépendante de la version de pandas."""
+    rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    return hashlib.sha256(json.dumps(rows, default=str).encode("utf-8")).hexdigest()
+
+def input_hashes(tempo: pd.DataFrame, weather: pd.DataFrame, rte: pd.DataFrame,
+                 through: str) -> dict:
+    """Empreintes des entrées effectives (couleur retenue, dernière météo / RTE
+    de chaque date) pour les dates jusqu'à `through` inclus."""
+    hashes = {}
+    for name, df in (("tempo", tempo),
+                     ("weather", weather.drop_duplicates("date", keep="last")),
+                     ("rte", rte.drop_duplicates("date", keep="last"))):
+        dates = df["date"].astype(str)
+        df = df[dates <= through].sort_values("date", key=lambda d: d.astype(str), kind="stable")
+        hashes[name] = frame_sha256(df)
+    return hashes
+
+def load_checkpoint(path: str = CHECKPOINT_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def full_rebuild_reason(checkpoint, tempo: pd.DataFrame, weather: pd.DataFrame,
+                        rte: pd.DataFrame):
+    """None si un ajout incrémental est possible, sinon la raison de la reconstruction complète."""
+    if checkpoint is None:
+        return "aucun checkpoint"
+    if checkpoint.get("version") != BUILD_VERSION or checkpoint.get("columns") != COLUMNS:
+        return "calcul des features modifié"
+    if not os.path.exists(OUT_PATH):
+        return "dataset absent"
+    output = checkpoint["output"]
+    if os.path.getsize(OUT_PATH) != output["bytes"] or file_sha256(OUT_PATH) != output["sha256"]:
+        return "dataset modifié depuis le checkpoint"
+    last = checkpoint["lastDate"]
+    hashes = input_hashes(tempo, weather, rte, last)
+    for name in ("tempo", "weather", "rte"):
+        if hashes[name] != checkpoint["inputs"].get(name):
+            return f"entrées {name} modifiées jusqu'au {last}"
+    return None
+
+def save_checkpoint(tempo: pd.DataFrame, weather: pd.DataFrame, rte: pd.DataFrame,
+                    used_by_season: dict, colors: Counter, rows: int,
+                    path: str = CHECKPOINT_PATH) -> None:
+    last = tempo["date"].astype(str).max()
+    checkpoint = {
+        "version": BUILD_VERSION,
+        "columns": COLUMNS,
+        "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "lastDate": last,
+        "rows": rows,
+        "colorCounts": dict(colors),
+        "usedBySeason": used_by_season,
+        "inputs": input_hashes(tempo, weather, rte, last),
+        "output": {"bytes": os.path.getsize(OUT_PATH), "sha256": file_sha256(OUT_PATH)},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
 
 # ======================
-# SAVE
+# MAIN
 # ======================
-if not dataset:
-    raise SystemExit("❌ Aucun échantillon ML généré")
-
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-
-with open(OUT_PATH, "w", encoding="utf-8") as f:
-    json.dump(dataset, f, indent=2)
-
-print(f"\n💾 Sauvegardé : {OUT_PATH}")
-print("🎉 Dataset ML avec les 3 couleurs prêt !")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Construction du dataset ML Tempo")
+    parser.add_argument("--incremental", action="store_true",
+                        help="n'ajouter que les nouvelles dates depuis le checkpoint si possible")
+    parser.add_argument("--json", action="store_true",
+                        help=f"exporter aussi le dataset complet en JSON ({JSON_PATH})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print("📊 Construction dataset ML Tempo (3 couleurs : bleu + blanc + rouge)")
+
+    # ======================
+    # LOAD DATA
+    # ======================
+    tempo_raw = load(TEMPO_PATH)
+    weather = load(WEATHER_PATH)
+    rte = load(RTE_PATH)
+
+    print(f"📅 Tempo brut : {len(tempo_raw)} entrées")
+    print(f"🌦️ Weather : {len(weather)} entrées")
+    print(f"⚡ RTE : {len(rte)} entrées")
+
+    tempo = pd.DataFrame.from_records([e for e in tempo_raw if isinstance(e, dict)],
+                                      columns=["date", "color", "realColor"])
+
+    # Vérification critique : présence de jours bleu
+    color_check = Counter(raw_colors(tempo).tolist())
+    print(f"📈 Distribution brute : {dict(color_check)}")
+
+    if color_check.get("bleu", 0) == 0:
+        print("❌ ERREUR CRITIQUE : Aucun jour bleu dans history_real_tempo.json !")
+        print("   → Exécutez d'abord build_history_from_tempo_api.py pour récupérer")
+        print("     l'historique complet avec les jours bleu depuis l'API EDF.")
+        raise SystemExit("Dataset incomplet : pas de jours bleu")
+
+    tempo = dedupe_tempo(tempo)
+    print(f"📅 Tempo dédupliqué : {len(tempo)} jours uniques")
+
+    weather = records(weather, ["temperature"])
+    rte = records(rte, ["consommation"])
+
+    checkpoint = load_checkpoint() if args.incremental else None
+    reason = full_rebuild_reason(checkpoint, tempo, weather, rte) \
+        if args.incremental else "mode complet"
+    incremental = reason is None
+
+    if incremental:
+        last = checkpoint["lastDate"]
+        new = tempo[tempo["date"].astype(str) > last].reset_index(drop=True)
+        print(f"⚡ Mode incrémental : {len(new)} nouvelle(s) date(s) après le {last}")
+        if not len(new):
+            print("✅ Dataset déjà à jour")
+            return
+        dataset, used_by_season = build_dataset(new, weather, rte, checkpoint["usedBySeason"])
+        colors = Counter(checkpoint["colorCounts"]) + Counter(dataset["color"].tolist())
+        n_samples = checkpoint["rows"] + len(dataset)
+    else:
+        if args.incremental:
+            print(f"🔁 Reconstruction complète : {reason}")
+        dataset, used_by_season = build_dataset(tempo, weather, rte)
+        colors = Counter(dataset["color"].tolist())
+        n_samples = len(dataset)
+
+    # ======================
+    # STATISTIQUES
+    # ======================
+    if incremental:
+        print(f"\n✅ Échantillons ajoutés : {len(dataset)} (total {n_samples})")
+    else:
+        print(f"\n✅ Dataset généré : {n_samples} échantillons")
+
+    if n_samples:
+        print("\n📈 Distribution des couleurs :")
+        for c, n in colors.most_common():
+            pct = n / n_samples * 100
+            print(f"   {c}: {n} ({pct:.1f}%)")
+
+        # Vérification qualité
+        if colors.get("bleu", 0) < 50:
+            print(f"\n⚠️ Seulement {colors.get('bleu', 0)} jours bleu - le modèle risque d'être biaisé")
+
+        print("\n📅 Par saison :")
+        for season, used in sorted(used_by_season.items()):
+            total = sum(used.values())
+            print(f"   {season}-{int(season)+1}: {total} jours " +
+                  f"(B:{used['bleu']} W:{used['blanc']} R:{used['rouge']})")
+
+    # ======================
+    # SAVE
+    # ======================
+    if not n_samples:
+        raise SystemExit("❌ Aucun échantillon ML généré")
+
+    if incremental:
+        dataset = pd.concat([load_columns(OUT_PATH), dataset], ignore_index=True)
+    save_columns(OUT_PATH, dataset)
+    save_checkpoint(tempo, weather, rte, used_by_season, colors, n_samples)
+
+    print(f"\n💾 Sauvegardé : {OUT_PATH} ({os.path.getsize(OUT_PATH):,} bytes, "
+          f"schéma : {schema_path(OUT_PATH)}, checkpoint : {CHECKPOINT_PATH})")
+
+    if args.json:
+        export_json(JSON_PATH, dataset)
+        print(f"🧾 Export JSON : {JSON_PATH} ({os.path.getsize(JSON_PATH):,} bytes)")
+    print("🎉 Dataset ML avec les 3 couleurs prêt !")
+
+
+if __name__ == "__main__":
+    main()
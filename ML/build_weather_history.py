@@ -1,63 +1,153 @@
-import requests
+"""
+🌦️ Historique météo (température moyenne journalière, Paris)
+Sans option : reconstruction complète depuis l'archive Open-Meteo (par mois).
+--update : complète les jours après le dernier jour connu et revisite les
+MAX_PAST_DAYS derniers jours : un jour absent (mois d'archive en erreur lors
+d'une exécution précédente) est redemandé, et une valeur provisoire de l'API
+de prévision (marquée "source": "forecast", pour les jours que l'archive n'a
+pas encore) est remplacée par l'archive dès qu'elle est publiée. Les jours
+issus de l'archive ne sont jamais modifiés ; une correction dans la fenêtre
+fait reconstruire le dataset incrémental (hash des entrées du checkpoint).
+Lancé chaque jour avant les prédictions : les fenêtres météo glissantes
+(14 jours) de la prédiction reposent sur des observations, comme à
+l'entraînement.
+"""
+import argparse
 import json
 from datetime import date, timedelta
 
+import requests
+
 LAT = 48.85
 LON = 2.35
 START = date(2017, 11, 1)
-END = date.today()
+OUTPUT = "weather_history.json"
 
-print("🌦️ Construction météo historique (par mois)")
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+MAX_PAST_DAYS = 92          # limite de past_days de l'API de prévision
+FORECAST_SOURCE = "forecast"
 
-weather = []
+def fetch(url: str, **params) -> list:
+    """[(date ISO, température), ...] ; jours sans valeur ignorés."""
+    r = requests.get(url, timeout=15, params={
+        "latitude": LAT,
+        "longitude": LON,
+        "daily": "temperature_2m_mean",
+        "timezone": "Europe/Paris",
+        **params,
+    })
+    r.raise_for_status()
+    daily = r.json().get("daily", {})
+    return [(d, t) for d, t in zip(daily.get("time", []), daily.get("temperature_2m_mean", []))
+            if t is not None]
 
-current = date(START.year, START.month, 1)
+def fetch_archive(start: date, end: date) -> list:
+    """Archive mois par mois de start à end inclus."""
+    weather = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        if current.month == 12:
+            next_month = date(current.year + 1, 1, 1)
+        else:
+            next_month = date(current.year, current.month + 1, 1)
+        month_start = max(current, start)
+        month_end = min(next_month - timedelta(days=1), end)
 
-while current <= END:
-    month_start = current
-    if current.month == 12:
-        month_end = date(current.year, 12, 31)
-    else:
-        month_end = date(current.year, current.month + 1, 1) - timedelta(days=1)
+        print(f"📦 {month_start} → {month_end}")
+        try:
+            weather += fetch(ARCHIVE_URL, start_date=month_start.isoformat(),
+                             end_date=month_end.isoformat())
+        except Exception as e:
+            print(f"⚠️ Erreur mois {month_start}: {e}")
+        current = next_month
+    return weather
+
+def fetch_recent(start: date, today: date) -> list:
+    """Jours passés récents (start → hier) via l'API de prévision."""
+    past_days = min((today - start).days, MAX_PAST_DAYS)
+    if past_days <= 0:
+        return []
+    try:
+        days = fetch(FORECAST_URL, past_days=past_days, forecast_days=1)
+    except Exception as e:
+        print(f"⚠️ Erreur jours récents : {e}")
+        return []
+    return [(d, t) for d, t in days if start.isoformat() <= d < today.isoformat()]
 
-    if month_end > END:
-        month_end = END
+def load_history(path: str) -> list:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
 
-    print(f"📦 {month_start} → {month_end}")
+def update(history: list, today: date) -> list:
+    """Historique complété jusqu'à hier : jours après le dernier connu, plus les jours
+    absents ou provisoires (API de prévision) des MAX_PAST_DAYS derniers jours."""
+    by_date = {w["date"]: w for w in history if isinstance(w, dict) and w.get("date")}
+    last = max((date.fromisoformat(d) for d in by_date), default=START - timedelta(days=1))
+    yesterday = today - timedelta(days=1)
+    start = max(START, min(last + timedelta(days=1), today - timedelta(days=MAX_PAST_DAYS)))
 
-    url = (
-        "https://archive-api.open-meteo.com/v1/archive"
-        f"?latitude={LAT}&longitude={LON}"
-        f"&start_date={month_start}"
-        f"&end_date={month_end}"
-        "&daily=temperature_2m_mean"
-        "&timezone=Europe%2FParis"
-    )
+    stale = []
+    day = start
+    while day <= yesterday:
+        record = by_date.get(day.isoformat())
+        if record is None or record.get("source") == FORECAST_SOURCE:
+            stale.append(day.isoformat())
+        day += timedelta(days=1)
+    if not stale:
+        return history
 
-    try:
-        r = requests.get(url, timeout=15)
-        r.raise_for_status()
-        data = r.json()
+    archive = dict(fetch_archive(date.fromisoformat(stale[0]), yesterday))
+    missing = [d for d in stale if d not in archive]
+    recent = dict(fetch_recent(date.fromisoformat(missing[0]), today)) if missing else {}
 
-        dates = data.get("daily", {}).get("time", [])
-        temps = data.get("daily", {}).get("temperature_2m_mean", [])
+    added = replaced = 0
+    for d in stale:
+        if d in archive:
+            record = {"date": d, "temperature": archive[d]}
+        elif d in recent:
+            record = {"date": d, "temperature": recent[d], "source": FORECAST_SOURCE}
+        else:
+            continue
+        if d in by_date:
+            replaced += by_date[d] != record
+        else:
+            added += 1
+        by_date[d] = record
 
-        for d, t in zip(dates, temps):
-            weather.append({
-                "date": d,
-                "temperature": t
-            })
+    still_missing = sum(d not in by_date for d in stale)
+    print(f"➕ {added} jour(s) ajouté(s), {replaced} valeur(s) provisoire(s) remplacée(s)"
+          + (f", {still_missing} jour(s) toujours absent(s)" if still_missing else ""))
+    return [by_date[d] for d in sorted(by_date)]
 
-    except Exception as e:
-        print(f"⚠️ Erreur mois {month_start}: {e}")
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Historique météo Open-Meteo")
+    parser.add_argument("--update", action="store_true",
+                        help="ajoute les jours manquants au fichier existant")
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
 
-    # mois suivant
-    if current.month == 12:
-        current = date(current.year + 1, 1, 1)
+    today = date.today()
+    if args.update:
+        print("🌦️ Mise à jour de la météo historique")
+        weather = update(load_history(args.output), today)
     else:
-        current = date(current.year, current.month + 1, 1)
+        print("🌦️ Construction météo historique (par mois)")
+        weather = [{"date": d, "temperature": t} for d, t in fetch_archive(START, today)]
+
+    with open(args.output, "w") as f:
+        json.dump(weather, f, indent=2)
+
+    print(f"✅ météo historique : {len(weather)} jours (dernier : "
+          f"{weather[-1]['date'] if weather else '-'})")
 
-with open("weather_history.json", "w") as f:
-    json.dump(weather, f, indent=2)
 
-print(f"✅ météo historique générée : {len(weather)} jours")
+if __name__ == "__main__":
+    main()
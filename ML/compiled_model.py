@@ -0,0 +1,461 @@
+"""
+🌳 Modèle compilé - évaluateur d'arbres sans scikit-learn
+Les arbres du GradientBoosting (ou HistGradientBoosting) sont aplatis en tableaux NumPy compacts
+(feature, seuil, enfants, valeurs de feuille, score initial) et évalués
+en parcourant tous les arbres en parallèle, profondeur par profondeur.
+Seul NumPy est nécessaire pour prédire : ni pandas, ni sklearn, ni joblib.
+Un même artefact peut contenir plusieurs modèles (répliques bootstrap),
+évalués ensemble en une seule passe.
+Deux formats : .npz compressé (artefact versionné) et dossier .mmap de
+fichiers .npy non compressés + meta.json, ouvert en memory-map : les
+processus qui chargent le même modèle partagent les pages du cache disque.
+Le dossier .mmap contient des versions complètes et un fichier CURRENT
+remplacé atomiquement qui désigne la version à lire.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 2
+
+# Nombre de lignes évaluées à la fois (borne la mémoire N × nb_arbres)
+CHUNK_ROWS = 4096
+
+# Tableaux sérialisés (format .npz et dossier memory-mappé)
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "init", "missing_left")
+MAPPED_SUFFIX = ".mmap"
+CURRENT_FILE = "CURRENT"        # nom de la version courante d'un dossier .mmap
+
+# ======================
+# EXPORT (depuis un modèle sklearn entraîné)
+# ======================
+def _flatten_trees(trees: list, scale: float) -> dict:
+    """Concatène les arbres sklearn en tableaux plats à indices absolus."""
+    features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for tree in trees:
+        t = tree.tree_
+        n = t.node_count
+        leaf = t.children_left == -1
+        idx = np.arange(n) + offset
+
+        # Les feuilles bouclent sur elles-mêmes : le parcours peut continuer
+        # jusqu'à la profondeur max sans test particulier
+        features.append(np.where(leaf, 0, t.feature))
+        thresholds.append(np.where(leaf, np.inf, t.threshold))
+        lefts.append(np.where(leaf, idx, t.children_left + offset))
+        rights.append(np.where(leaf, idx, t.children_right + offset))
+        values.append(scale * t.value[:, 0, 0])
+        missing.append(np.zeros(n, dtype=bool))
+        roots.append(offset)
+
+        offset += n
+        max_depth = max(max_depth, t.max_depth)
+
+    return {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values).astype(np.float64),
+        "missing_left": np.concatenate(missing),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": max_depth,
+    }
+
+def _flatten_hist_predictors(predictors: list) -> dict:
+    """Même format que _flatten_trees pour les TreePredictor d'HistGradientBoosting
+    (valeurs de feuille déjà multipliées par le learning rate)."""
+    features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for predictor in predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("features catégorielles non prises en charge")
+        n = len(nodes)
+        leaf = nodes["is_leaf"].astype(bool)
+        idx = np.arange(n) + offset
+
+        features.append(np.where(leaf, 0, nodes["feature_idx"]))
+        thresholds.append(np.where(leaf, np.inf, nodes["num_threshold"]))
+        lefts.append(np.where(leaf, idx, nodes["left"].astype(np.int64) + offset))
+        rights.append(np.where(leaf, idx, nodes["right"].astype(np.int64) + offset))
+        values.append(nodes["value"])
+        missing.append(nodes["missing_go_to_left"].astype(bool) & ~leaf)
+        roots.append(offset)
+
+        offset += n
+        max_depth = max(max_depth, int(nodes["depth"].max()))
+
+    return {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values).astype(np.float64),
+        "missing_left": np.concatenate(missing),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": max_depth,
+    }
+
+def _from_flat(flat: dict, n_stages: int, n_raw: int, init: np.ndarray, meta: dict) -> "CompiledForest":
+    return CompiledForest(
+        feature=flat["feature"],
+        threshold=flat["threshold"],
+        left=flat["left"],
+        right=flat["right"],
+        value=flat["value"],
+        roots=flat["roots"].reshape(1, n_stages, n_raw),
+        init=init[None],
+        max_depth=flat["max_depth"],
+        meta={"format_version": FORMAT_VERSION, **meta},
+        missing_left=flat["missing_left"],
+    )
+
+def export_gradient_boosting(model, classes: list, features: list,
+                             model_type: str = "GradientBoosting") -> "CompiledForest":
+    """Aplatit un GradientBoostingClassifier entraîné en CompiledForest."""
+    n_stages, n_raw = model.estimators_.shape
+
+    # Ordre étape par étape, classe par classe (comme predict_stages de sklearn)
+    flat = _flatten_trees(list(model.estimators_.ravel()), model.learning_rate)
+
+    X0 = np.zeros((1, len(features)), dtype=np.float32)
+    init = np.asarray(model._raw_predict_init(X0)[0], dtype=np.float64)
+
+    return _from_flat(flat, n_stages, n_raw, init, {
+        "model_type": model_type,
+        "features": list(features),
+        "classes": [str(c) for c in classes],
+        "input_dtype": "float32",
+    })
+
+def export_hist_gradient_boosting(model, classes: list, features: list,
+                                  model_type: str = "HistGradientBoosting") -> "CompiledForest":
+    """Aplatit un HistGradientBoostingClassifier entraîné en CompiledForest."""
+    n_stages, n_raw = len(model._predictors), model.n_trees_per_iteration_
+    flat = _flatten_hist_predictors([p for stage in model._predictors for p in stage])
+    init = np.asarray(model._baseline_prediction, dtype=np.float64).reshape(n_raw)
+
+    # HistGradientBoosting compare les entrées en float64
+    return _from_flat(flat, n_stages, n_raw, init, {
+        "model_type": model_type,
+        "features": list(features),
+        "classes": [str(c) for c in classes],
+        "input_dtype": "float64",
+    })
+
+def export_model(model, classes: list, features: list) -> "CompiledForest":
+    """Exporte selon le type de modèle sklearn (sans importer sklearn)."""
+    kind = type(model).__name__
+    if kind == "GradientBoostingClassifier":
+        return export_gradient_boosting(model, classes, features)
+    if kind == "HistGradientBoostingClassifier":
+        return export_hist_gradient_boosting(model, classes, features)
+    raise ValueError(f"modèle non exportable : {kind}")
+
+# ======================
+# ÉVALUATEUR
+# ======================
+class CompiledForest:
+    """
+    Forêt(s) de boosting aplaties, évaluables avec NumPy seul.
+    Plusieurs modèles (ex. répliques bootstrap) peuvent partager les mêmes
+    tableaux : roots (n_models, n_stages, n_raw), init (n_models, n_raw).
+    Le modèle d'indice 0 est le modèle principal.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, init,
+                 max_depth, meta, missing_left=None, children=None, feature_index=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        # Format v1 : un seul modèle, sans axe "modèles"
+        self.roots = roots if roots.ndim == 3 else roots[None]
+        self.init = init if init.ndim == 2 else init[None]
+        self.max_depth = int(max_depth)
+        self.meta = meta
+        # Sens des valeurs manquantes (NaN) par nœud ; absent = à droite, comme sklearn
+        self.missing_left = np.zeros(len(feature), dtype=bool) if missing_left is None \
+            else np.asarray(missing_left, dtype=bool)
+        # Tables de parcours : enfants entrelacés (gauche, droite) → un seul gather
+        # par niveau ; indices natifs (intp) pour éviter les conversions.
+        # Fournies précalculées par le format memory-mappé (pas de copie).
+        self._children = np.stack([left, right], axis=1).ravel().astype(np.intp) \
+            if children is None else np.asarray(children, dtype=np.intp)
+        self._feature = feature.astype(np.intp) if feature_index is None \
+            else np.asarray(feature_index, dtype=np.intp)
+
+    @property
+    def features(self) -> list:
+        return self.meta["features"]
+
+    @property
+    def classes(self) -> list:
+        return self.meta["classes"]
+
+    @property
+    def input_dtype(self):
+        return np.dtype(self.meta.get("input_dtype", "float32"))
+
+    @property
+    def n_models(self) -> int:
+        return self.roots.shape[0]
+
+    @property
+    def n_stages(self) -> int:
+        return self.roots.shape[1]
+
+    def _leaves(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        """Indice de feuille atteint dans chaque arbre : (n_arbres, N)."""
+        n = len(X)
+        flat_x = np.ascontiguousarray(X.T).ravel()          # colonne par colonne
+        offsets = np.arange(n)[None, :]
+        node = np.repeat(roots.astype(np.intp)[:, None], n, axis=1)
+        has_nan = bool(np.isnan(flat_x).any())
+        for _ in range(self.max_depth):
+            x = flat_x[self._feature[node] * n + offsets]
+            # not (x <= seuil) : NaN à droite, sauf nœuds "manquants à gauche"
+            go_right = ~(x <= self.threshold[node])
+            if has_nan:
+                go_right &= ~(np.isnan(x) & self.missing_left[node])
+            node = self._children[2 * node + go_right]
+        return node
+
+    def raw_predict_all(self, X, models=None) -> np.ndarray:
+        """Scores bruts (N, n_models, n_raw) ; tous les arbres évalués en une passe."""
+        # Même précision que sklearn : entrées en float32 (GradientBoosting) ou
+        # float64 (HistGradientBoosting), seuils en float64
+        X = np.asarray(X, dtype=self.input_dtype)
+        roots = self.roots if models is None else self.roots[models]
+        init = self.init if models is None else self.init[models]
+        n_models, n_stages, n_raw = roots.shape
+        flat_roots = roots.transpose(1, 0, 2).ravel()      # étape → modèle → classe
+        raw = np.empty((len(X), n_models, n_raw))
+
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            leaf_values = self.value[self._leaves(chunk, flat_roots)]
+            leaf_values = leaf_values.reshape(n_stages, n_models, n_raw, len(chunk))
+            out = np.repeat(init[:, :, None], len(chunk), axis=2)
+            # Accumulation séquentielle par étape : mêmes arrondis que sklearn
+            for s in range(n_stages):
+                out += leaf_values[s]
+            raw[start:start + CHUNK_ROWS] = out.transpose(2, 0, 1)
+        return raw
+
+    def predict_proba_all(self, X, models=None) -> np.ndarray:
+        """Probabilités (N, n_models, n_classes)."""
+        raw = self.raw_predict_all(X, models)
+        if raw.shape[2] == 1:
+            p = 1.0 / (1.0 + np.exp(-raw[..., 0]))
+            return np.stack([1.0 - p, p], axis=2)
+        raw -= raw.max(axis=2, keepdims=True)
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=2, keepdims=True)
+        return raw
+
+    def raw_predict(self, X) -> np.ndarray:
+        return self.raw_predict_all(X, models=[0])[:, 0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilités du modèle principal, (N, n_classes)."""
+        return self.predict_proba_all(X, models=[0])[:, 0]
+
+def select_models(forest: CompiledForest, models: list) -> CompiledForest:
+    """Sous-ensemble de modèles d'une forêt empilée ; seuls les nœuds encore
+    atteignables sont conservés (renumérotés)."""
+    roots = forest.roots[models]
+    keep = np.zeros(len(forest.feature), dtype=bool)
+    frontier = np.unique(roots)
+    while frontier.size:
+        keep[frontier] = True
+        children = np.concatenate([forest.left[frontier], forest.right[frontier]])
+        frontier = np.unique(children[~keep[children]])
+
+    new_index = np.cumsum(keep) - 1
+    return CompiledForest(
+        feature=forest.feature[keep],
+        threshold=forest.threshold[keep],
+        left=new_index[forest.left[keep]].astype(np.int32),
+        right=new_index[forest.right[keep]].astype(np.int32),
+        value=forest.value[keep],
+        roots=new_index[roots].astype(np.int32),
+        init=forest.init[models],
+        max_depth=forest.max_depth,
+        meta={**forest.meta, "n_models": len(roots)},
+        missing_left=forest.missing_left[keep],
+    )
+
+def stack_forests(forests: list) -> CompiledForest:
+    """
+    Regroupe plusieurs forêts (mêmes features et classes) dans un seul
+    CompiledForest. Les modèles plus courts sont complétés par une feuille
+    nulle partagée : ajouter 0.0 ne change pas les scores.
+    """
+    first = forests[0]
+    for f in forests[1:]:
+        if f.features != first.features or f.classes != first.classes \
+                or f.input_dtype != first.input_dtype:
+            raise ValueError("forêts incompatibles (features, classes ou précision différentes)")
+
+    offsets = np.cumsum([0] + [len(f.feature) for f in forests])
+    zero_leaf = int(offsets[-1])
+    n_stages = max(f.n_stages for f in forests)
+    n_raw = first.roots.shape[2]
+
+    roots = np.full((sum(f.n_models for f in forests), n_stages, n_raw), zero_leaf, dtype=np.int32)
+    m = 0
+    for f, off in zip(forests, offsets[:-1]):
+        roots[m:m + f.n_models, :f.n_stages] = f.roots + off
+        m += f.n_models
+
+    def concat(name, extra, shift=False):
+        parts = [getattr(f, name) + (off if shift else 0) for f, off in zip(forests, offsets[:-1])]
+        return np.concatenate(parts + [np.asarray(extra)])
+
+    # Feuille nulle : boucle sur elle-même, seuil +inf, valeur 0.0
+    return CompiledForest(
+        feature=concat("feature", [0]).astype(np.int32),
+        threshold=concat("threshold", [np.inf]).astype(np.float64),
+        left=concat("left", [zero_leaf], shift=True).astype(np.int32),
+        right=concat("right", [zero_leaf], shift=True).astype(np.int32),
+        value=concat("value", [0.0]).astype(np.float64),
+        roots=roots,
+        init=np.concatenate([f.init for f in forests]),
+        max_depth=max(f.max_depth for f in forests),
+        meta={**first.meta, "n_models": int(roots.shape[0])},
+        missing_left=concat("missing_left", [False]).astype(bool),
+    )
+
+# ======================
+# SÉRIALISATION
+# ======================
+def save_compiled(forest: CompiledForest, path: Path) -> None:
+    np.savez_compressed(
+        path,
+        feature=forest.feature,
+        threshold=forest.threshold,
+        left=forest.left,
+        right=forest.right,
+        value=forest.value,
+        roots=forest.roots,
+        init=forest.init,
+        missing_left=forest.missing_left,
+        max_depth=np.int32(forest.max_depth),
+        meta=np.array(json.dumps(forest.meta)),
+    )
+
+def load_compiled(path: Path) -> CompiledForest:
+    if Path(path).is_dir():
+        return load_mapped(path)
+    with np.load(path, allow_pickle=False) as data:
+        return CompiledForest(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            value=data["value"],
+            roots=data["roots"],
+            init=data["init"],
+            max_depth=int(data["max_depth"]),
+            meta=json.loads(str(data["meta"])),
+            missing_left=data["missing_left"] if "missing_left" in data.files else None,
+        )
+
+def mapped_path(path: Path) -> Path:
+    """Dossier memory-mappé associé à un artefact .npz."""
+    return Path(path).with_suffix(MAPPED_SUFFIX)
+
+def mapped_current(directory: Path) -> Path:
+    """Version courante d'un dossier .mmap (désignée par le fichier CURRENT) ;
+    ancien format sans versions : le dossier lui-même."""
+    directory = Path(directory)
+    try:
+        version = (directory / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return directory
+    return directory / version
+
+def save_mapped(forest: CompiledForest, directory: Path, source: str = None) -> None:
+    """
+    Un .npy non compressé par tableau (tables de parcours incluses) + meta.json,
+    dans un sous-dossier de version neuf. Le fichier CURRENT qui le désigne est
+    remplacé d'un bloc (os.replace) une fois la version complète : un lecteur
+    concurrent ouvre l'ancienne version ou la nouvelle, jamais un mélange.
+    La version précédente est gardée pour les lecteurs en cours ; les plus
+    anciennes sont supprimées.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = mapped_current(directory)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    target = directory / version
+    target.mkdir()
+    for name in ARRAYS:
+        np.save(target / f"{name}.npy", getattr(forest, name))
+    np.save(target / "children.npy", forest._children)
+    np.save(target / "feature_index.npy", forest._feature)
+    (target / "meta.json").write_text(json.dumps({
+        "max_depth": forest.max_depth,
+        "source": source,
+        "meta": forest.meta,
+    }), encoding="utf-8")
+
+    pointer = directory / f"{CURRENT_FILE}.tmp{os.getpid()}"
+    pointer.write_text(version, encoding="utf-8")
+    os.replace(pointer, directory / CURRENT_FILE)
+
+    # Nettoyage : versions plus anciennes que la nouvelle, sauf la précédente (une
+    # écriture concurrente plus récente reste intacte), fichiers de l'ancien format
+    for entry in directory.iterdir():
+        if entry.is_dir() and entry.name < version and entry != previous:
+            shutil.rmtree(entry, ignore_errors=True)
+        elif entry.is_file() and entry.name != CURRENT_FILE and not entry.name.startswith(
+                f"{CURRENT_FILE}.tmp"):
+            entry.unlink(missing_ok=True)
+
+def load_mapped(directory: Path, mmap_mode: str = "r") -> CompiledForest:
+    """Ouvre la version courante d'un dossier .mmap sans copier les tableaux dans le
+    tas du processus (tableaux ouverts : toujours lisibles après un remplacement)."""
+    version = mapped_current(directory)
+    header = json.loads((version / "meta.json").read_text(encoding="utf-8"))
+    arrays = {name: np.load(version / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+              for name in ARRAYS + ("children", "feature_index")}
+    return CompiledForest(max_depth=header["max_depth"], meta=header["meta"], **arrays)
+
+def mapped_source(directory: Path):
+    """Empreinte de l'artefact .npz dont le dossier .mmap est issu (None si absent)."""
+    try:
+        meta = mapped_current(directory) / "meta.json"
+        return json.loads(meta.read_text(encoding="utf-8"))["source"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def open_shared(path: Path, source: str) -> CompiledForest:
+    """
+    Modèle compilé partagé entre processus : le dossier .mmap voisin est
+    (re)généré une fois si son empreinte `source` ne correspond plus à
+    l'artefact .npz, puis ouvert en memory-map. Repli sur le .npz en mémoire
+    si le dossier ne peut pas être écrit ou lu (ex. version supprimée par un
+    écrivain concurrent entre la lecture de CURRENT et l'ouverture).
+    """
+    directory = mapped_path(path)
+    try:
+        if mapped_source(directory) != source:
+            save_mapped(load_compiled(path), directory, source)
+        if mapped_source(directory) != source:
+            return load_compiled(path)
+        return load_mapped(directory)
+    except (OSError, ValueError, KeyError):
+        return load_compiled(path)
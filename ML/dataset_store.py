@@ -0,0 +1,109 @@
+"""
+🗃️ Stockage colonnaire du dataset ML Tempo
+Une colonne = un tableau numpy typé dans ML/ml_dataset.npz, décrit par un
+schéma JSON à côté (ML/ml_dataset.schema.json : lignes, type de chaque
+colonne, catégories, empreinte du contenu).
+- entiers réduits au plus petit type qui contient leurs valeurs (int64 au
+  chargement), flottants en float64 ;
+- chaînes peu variées (couleur) encodées en uint8 + liste de catégories ;
+- projection : np.load ne lit que les membres demandés du .npz ;
+- écriture déterministe (dates zip fixes) : mêmes données → même fichier,
+  donc même empreinte pour le registre et le checkpoint.
+L'export JSON (une ligne = un dict, indent=2) reste disponible pour le débogage.
+"""
+import hashlib
+import json
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMAT = "tempo-ml-columnar"
+VERSION = 1
+MAX_CATEGORIES = 255
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+def schema_path(path) -> Path:
+    """ML/ml_dataset.npz → ML/ml_dataset.schema.json"""
+    path = Path(path)
+    return path.with_name(path.stem + ".schema.json")
+
+# ======================
+# ENCODAGE
+# ======================
+def encode_column(values: list) -> tuple:
+    """Valeurs JSON d'une colonne → (tableau stocké, description du schéma)."""
+    arr = np.asarray(values)
+    if arr.dtype.kind == "b":
+        arr = arr.astype(np.int8)
+    if arr.dtype.kind in "iu":
+        lo, hi = (int(arr.min()), int(arr.max())) if len(arr) else (0, 0)
+        small = next(t for t in INT_TYPES if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max)
+        return arr.astype(small), {"kind": "int"}
+    if arr.dtype.kind == "f":
+        return arr.astype(np.float64), {"kind": "float"}
+    arr = arr.astype(str)
+    categories, codes = np.unique(arr, return_inverse=True)
+    if len(categories) <= MAX_CATEGORIES:
+        return codes.astype(np.uint8), {"kind": "category", "categories": categories.tolist()}
+    return arr, {"kind": "str"}
+
+def decode_column(arr: np.ndarray, spec: dict) -> np.ndarray:
+    if spec["kind"] == "int":
+        return arr.astype(np.int64)
+    if spec["kind"] == "category":
+        return np.asarray(spec["categories"], dtype=object)[arr]
+    if spec["kind"] == "str":
+        return arr.astype(object)
+    return arr
+
+# ======================
+# ÉCRITURE / LECTURE
+# ======================
+def save_columns(path, df: pd.DataFrame) -> dict:
+    """Écrit le .npz et son schéma ; retourne le schéma."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = hashlib.sha256()
+    columns = []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for name in df.columns:
+            arr, spec = encode_column(df[name].tolist())
+            with zf.open(zipfile.ZipInfo(f"{name}.npy", date_time=ZIP_DATE), "w") as f:
+                np.lib.format.write_array(f, arr, allow_pickle=False)
+            content.update(name.encode("utf-8"))
+            content.update(arr.dtype.str.encode())
+            content.update(arr.tobytes())
+            columns.append({"name": name, "dtype": arr.dtype.str, **spec})
+    schema = {
+        "format": FORMAT,
+        "version": VERSION,
+        "rows": len(df),
+        "columns": columns,
+        "sha256": content.hexdigest(),
+    }
+    schema_path(path).write_text(json.dumps(schema, indent=2), encoding="utf-8")
+    return schema
+
+def read_schema(path) -> dict:
+    schema = json.loads(schema_path(path).read_text(encoding="utf-8"))
+    if schema.get("format") != FORMAT or schema.get("version") != VERSION:
+        raise ValueError(f"Schéma de dataset inconnu : {schema_path(path)}")
+    return schema
+
+def load_columns(path, columns: list = None) -> pd.DataFrame:
+    """
+    DataFrame des colonnes demandées (toutes si None), dans l'ordre du schéma.
+    Les colonnes demandées mais absentes du dataset sont ignorées.
+    """
+    schema = read_schema(path)
+    specs = [c for c in schema["columns"] if columns is None or c["name"] in columns]
+    with np.load(path, allow_pickle=False) as npz:
+        data = {c["name"]: decode_column(npz[c["name"]], c) for c in specs}
+    return pd.DataFrame(data, index=pd.RangeIndex(schema["rows"]))
+
+def export_json(path, df: pd.DataFrame) -> None:
+    """Export de débogage : même mise en forme que l'ancien ml_dataset.json."""
+    Path(path).write_text(json.dumps(df.to_dict("records"), indent=2), encoding="utf-8")
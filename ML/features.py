@@ -0,0 +1,252 @@
+"""
+🧮 Features ML Tempo - pipeline unique
+Un seul calcul vectorisé (NumPy seul) des features, partagé par
+build_ml_dataset.py (dataset), train_ml.py (entraînement) et predict_ml.py
+(prédiction) : mêmes formules, mêmes bornes, même ordre de colonnes.
+
+Entrées colonnaires (une valeur par jour) : dates (datetime64[D]),
+température, consommation RTE, jours restants par couleur (N × 3, ordre
+COLORS), horizon et features météo glissantes. Sortie : {nom: tableau} pour
+toutes les features connues, puis model_matrix() dans l'ordre FEATURES du
+bundle.
+
+Météo glissante (weather_features) : série journalière contiguë des
+températures observées (historique, + prévision en prédiction ; jours
+manquants = NaN), puis série de jours froids consécutifs (une passe),
+degrés-jours de chauffage, moyennes et minima sur 3/7/14 jours, écart avec
+la veille. Moyennes et minima réduisent une vue (N × w) de chaque fenêtre :
+O(N·w), w ≤ 14. Pas de somme cumulée : la valeur d'un jour ne dépend que de
+ses w voisins, pas des arrondis accumulés depuis le début de la série
+(dataset et prédiction identiques au bit près).
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from tempo_rules import COLORS, MAX_DAYS, is_peak_winter, is_winter
+
+# Features du modèle (ordre des colonnes de la matrice d'entraînement)
+FEATURES = [
+    "temp", "temp_cat", "coldDays",
+    "heatingDegreeDays", "heatingDegreeDays7",
+    "tempMean3", "tempMean7", "tempMean14", "tempMin3", "tempMin7", "tempMin14", "tempDelta",
+    "rte",
+    "weekday", "month", "day_of_month",
+    "isWeekend", "isWinter", "winter_intensity",
+    "remainingBlanc", "remainingRouge", "winterBleuRemaining",
+    "seasonDayIndex", "quota_pressure",
+    "horizon"
+]
+
+# Valeurs par défaut quand la météo ou RTE manque pour une date
+DEFAULT_TEMP = 10
+DEFAULT_CONSUMPTION = 55000
+
+# Météo glissante
+COLD_DAY_TEMP = 3.0         # jour froid : moyenne journalière sous 3 °C
+HDD_BASE = 18.0             # base des degrés-jours de chauffage (°C)
+ROLLING_WINDOWS = (3, 7, 14)
+WEATHER_FEATURES = [
+    "coldDays", "heatingDegreeDays", "heatingDegreeDays7",
+    *(f"tempMean{w}" for w in ROLLING_WINDOWS), *(f"tempMin{w}" for w in ROLLING_WINDOWS),
+    "tempDelta",
+]
+
+# Bornes hautes (exclues) des catégories de température 0..4, 5 au-delà
+TEMP_BINS = [-5, 0, 5, 10, 15]
+WINTER_INTENSITY = {11: 2, 12: 3, 1: 4, 2: 4, 3: 2}
+# Bornes basses (incluses) des niveaux de tension réseau 1..3
+ENERGY_STRESS_BINS = [45000, 52000, 60000]
+
+# ======================
+# CALENDRIER
+# ======================
+def calendar(dates) -> dict:
+    """weekday (lundi = 0), month, day, season (année de début, 1er sept.) en entiers."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    months = dates.astype("datetime64[M]")
+    year = months.astype("datetime64[Y]").astype(int) + 1970
+    month = months.astype(int) % 12 + 1
+    return {
+        # 1970-01-01 était un jeudi
+        "weekday": (dates.astype(int) + 3) % 7,
+        "month": month,
+        "day": (dates - months).astype(int) + 1,
+        "season": np.where(month >= 9, year, year - 1),
+    }
+
+def season_start(season) -> np.ndarray:
+    """1er septembre de l'année de début de saison (datetime64[D])."""
+    september = (np.asarray(season) - 1970).astype("datetime64[Y]").astype("datetime64[M]") \
+        + np.timedelta64(8, "M")
+    return september.astype("datetime64[D]")
+
+# ======================
+# FEATURES
+# ======================
+def temp_category(temp) -> np.ndarray:
+    return np.digitize(np.asarray(temp, dtype=float), TEMP_BINS, right=False)
+
+def winter_intensity(month) -> np.ndarray:
+    month = np.asarray(month)
+    return np.select([month == m for m in WINTER_INTENSITY], list(WINTER_INTENSITY.values()), 0)
+
+def energy_stress(consumption) -> np.ndarray:
+    return np.digitize(np.asarray(consumption, dtype=float), ENERGY_STRESS_BINS, right=False)
+
+def quota_features(remaining, month) -> dict:
+    """Features dérivées des jours restants (N × 3, ordre COLORS) à une date du mois `month`."""
+    remaining = np.asarray(remaining).reshape(-1, len(COLORS))
+    bleu, blanc, rouge = (remaining[:, COLORS.index(c)] for c in COLORS)
+    return {
+        "remainingBleu": bleu,
+        "remainingBlanc": blanc,
+        "remainingRouge": rouge,
+        "winterBleuRemaining": np.where(is_winter(month), bleu, 0),
+        "quota_pressure": ((MAX_DAYS["blanc"] - blanc) / MAX_DAYS["blanc"] * 0.5
+                           + (MAX_DAYS["rouge"] - rouge) / MAX_DAYS["rouge"] * 0.5),
+    }
+
+# ======================
+# MÉTÉO GLISSANTE
+# ======================
+def daily_series(dates, temps) -> tuple:
+    """(premier jour, températures jour par jour) ; jour absent = NaN, dernière valeur
+    retenue pour une date en double."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    temps = np.asarray(temps, dtype=float)
+    ok = ~np.isnat(dates)
+    dates, temps = dates[ok], temps[ok]
+    if not len(dates):
+        return None, np.empty(0)
+    first = dates.min()
+    idx = (dates - first).astype(int)
+    values = np.full(int(idx.max()) + 1, np.nan)
+    # Dernière occurrence de chaque jour
+    last = len(idx) - 1 - np.unique(idx[::-1], return_index=True)[1]
+    values[idx[last]] = temps[last]
+    return first, values
+
+def window(values: np.ndarray, size: int) -> np.ndarray:
+    """Vue (N × size) des `size` derniers jours, jour courant inclus (NaN avant le début)."""
+    return sliding_window_view(np.concatenate([np.full(size - 1, np.nan), values]), size)
+
+def window_mean(values: np.ndarray, size: int) -> np.ndarray:
+    view = window(values, size)
+    count = (~np.isnan(view)).sum(axis=1)
+    total = np.nansum(view, axis=1)
+    return np.divide(total, count, out=np.full(len(values), np.nan), where=count > 0)
+
+def rolling_weather(values: np.ndarray) -> dict:
+    """Features glissantes sur une série journalière contiguë (NaN = jour sans mesure)."""
+    n = len(values)
+    idx = np.arange(n)
+    # Jours froids consécutifs jusqu'au jour courant inclus (un jour sans mesure coupe la série)
+    cold = values < COLD_DAY_TEMP
+    last_warm = np.maximum.accumulate(np.where(cold, -1, idx)) if n else idx
+    hdd = np.maximum(0.0, HDD_BASE - values)
+    previous = np.concatenate([[np.nan], values[:-1]]) if n else values
+    return {
+        "coldDays": idx - last_warm,
+        "heatingDegreeDays7": window_mean(hdd, 7) * 7,
+        **{f"tempMean{w}": window_mean(values, w) for w in ROLLING_WINDOWS},
+        **{f"tempMin{w}": np.fmin.reduce(window(values, w), axis=1) for w in ROLLING_WINDOWS},
+        "tempDelta": values - previous,
+    }
+
+def fill_weather(columns: dict, temp) -> dict:
+    """Complète les features météo d'un lot de jours : valeur absente (NaN, colonne
+    manquante) → valeur déduite de la température du jour."""
+    temp = np.asarray(temp, dtype=float)
+    hdd = np.maximum(0.0, HDD_BASE - temp)
+    fallback = {
+        "coldDays": np.zeros(len(temp)),
+        "heatingDegreeDays": hdd,
+        "heatingDegreeDays7": hdd * 7,
+        **{f"tempMean{w}": temp for w in ROLLING_WINDOWS},
+        **{f"tempMin{w}": temp for w in ROLLING_WINDOWS},
+        "tempDelta": np.zeros(len(temp)),
+    }
+    filled = {}
+    for name in WEATHER_FEATURES:
+        values = np.asarray(columns.get(name, fallback[name]), dtype=float)
+        filled[name] = np.where(np.isnan(values), fallback[name], values)
+    # Degrés-jours du jour : toujours ceux de la température retenue
+    filled["heatingDegreeDays"] = hdd
+    return filled
+
+def weather_features(dates, temp, obs_dates, obs_temps) -> dict:
+    """
+    Features météo glissantes des jours `dates` (température retenue `temp`)
+    à partir des températures observées (obs_dates, obs_temps) : historique,
+    complété de la prévision en prédiction.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    # Série couvrant aussi les jours demandés (NaN si non observés : les observations priment)
+    first, values = daily_series(
+        np.concatenate([dates, np.asarray(obs_dates, dtype="datetime64[D]")]),
+        np.concatenate([np.full(len(dates), np.nan), np.asarray(obs_temps, dtype=float)]),
+    )
+    columns = {}
+    if first is not None and len(dates):
+        rolling = rolling_weather(values)
+        pos = (dates - first).astype(int)
+        inside = (pos >= 0) & (pos < len(values))
+        for name, arr in rolling.items():
+            col = np.full(len(dates), np.nan)
+            col[inside] = arr[pos[inside]]
+            columns[name] = col
+    return fill_weather(columns, temp)
+
+def compute_features(dates, temp, rte, remaining, horizon, weather: dict = None,
+                     start=None) -> dict:
+    """
+    Toutes les features d'un lot de jours. Les entrées sont complètes (valeurs
+    par défaut déjà appliquées) ; température et consommation sont reprises
+    telles quelles. `weather` : features météo glissantes (weather_features ;
+    à défaut, déduites de la température du jour). `start` : début de saison
+    imposé pour seasonDayIndex (défaut : saison de chaque date).
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    cal = calendar(dates)
+    weekday, month = cal["weekday"], cal["month"]
+    winter = is_winter(month)
+    start = season_start(cal["season"]) if start is None else np.datetime64(start, "D")
+    n = len(dates)
+    return {
+        # Calendrier
+        "weekday": weekday,
+        "month": month,
+        "day_of_month": cal["day"],
+        "seasonDayIndex": (dates - start).astype(int) + 1,
+        "isWeekend": (weekday >= 5).astype(int),
+        "isWinter": winter.astype(int),
+        "isPeakWinter": is_peak_winter(month).astype(int),
+        "winter_intensity": winter_intensity(month),
+
+        # Météo
+        "temp": temp,
+        "temperature": temp,
+        "temp_cat": temp_category(temp),
+        **(weather if weather is not None else fill_weather({}, temp)),
+
+        # Énergie
+        "rte": rte,
+        "rteConsommation": rte,
+        "energyStress": energy_stress(rte),
+
+        # Quotas Tempo
+        **quota_features(remaining, month),
+
+        "horizon": np.broadcast_to(horizon, n),
+    }
+
+def model_matrix(columns: dict, features: list, overrides: dict = None) -> np.ndarray:
+    """Matrice (N × len(features)) float64 dans l'ordre `features` ; feature inconnue → 0.
+    `overrides` force la valeur de features sur toutes les lignes."""
+    n = len(columns["weekday"])
+    columns = {**columns, **(overrides or {})}
+    X = np.zeros((n, len(features)))
+    for j, name in enumerate(features):
+        if name in columns:
+            X[:, j] = columns[name]
+    return X
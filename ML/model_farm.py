@@ -0,0 +1,290 @@
+"""
+🏭 Ferme de modèles ML Tempo
+Plusieurs familles de classifieurs entraînées en parallèle sur le même
+dataset : GradientBoosting, HistGradientBoosting, régression logistique
+régularisée et forêt aléatoire (poids de classe de train_ml inclus).
+
+- X, y et les poids sont copiés une seule fois en mémoire partagée
+  (multiprocessing.shared_memory) ; les workers y accèdent sans copie.
+- Chaque famille est validée sur la dernière saison Tempo (entraînement sur
+  les saisons précédentes) : log-loss, accuracy, temps d'entraînement et
+  latence de prédiction (accuracy par milliseconde pour choisir).
+- Ensemble : moyenne pondérée des probabilités, poids choisis par sélection
+  gloutonne avec remise sur la log-loss d'une moitié de la saison de
+  validation (semaines paires) ; familles et ensemble sont comparés sur
+  l'autre moitié (semaines impaires), jamais vue par les poids. Les membres
+  sont réentraînés sur tout le dataset et sauvegardés dans un seul bundle
+  (ML/ml_ensemble.pkl, compatible avec predict_ml.load_bundle).
+
+Usage :
+    python ML/train_ml.py --farm
+    python ML/train_ml.py --farm gb logreg --jobs 2
+"""
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+# ======================
+# PATHS
+# ======================
+ENSEMBLE_PATH = Path("ML/ml_ensemble.pkl")
+REPORT_PATH = Path("ML/ml_farm_report.json")
+
+# ======================
+# CANDIDATS
+# ======================
+LOGREG_PARAMS = dict(C=1.0, max_iter=2000)
+
+RF_PARAMS = dict(
+    n_estimators=300,
+    max_depth=10,
+    min_samples_leaf=4,
+    n_jobs=1,
+    random_state=42
+)
+
+# Hyperparamètres des moteurs de boosting : fournis par train_ml (GB_PARAMS, HGB_PARAMS)
+CANDIDATES = {
+    "gb": ("GradientBoosting", GradientBoostingClassifier, None),
+    "hgb": ("HistGradientBoosting", HistGradientBoostingClassifier, None),
+    "logreg": ("LogisticRegression", LogisticRegression, LOGREG_PARAMS),
+    "rf": ("RandomForest", RandomForestClassifier, RF_PARAMS),
+}
+
+ENSEMBLE_ROUNDS = 20        # tirages de la sélection gloutonne (poids = k / 20)
+SPLIT_BLOCK_DAYS = 7        # saison de validation : blocs alternés poids / score
+PREDICT_ROWS = 15           # ~ taille de tempo.json
+PREDICT_REPEAT = 50
+
+def make_candidate(name: str, params: dict = None):
+    """Classifieur non entraîné ; la régression logistique est précédée d'une standardisation."""
+    _, cls, defaults = CANDIDATES[name]
+    model = cls(**{**(defaults or {}), **(params or {})})
+    if name == "logreg":
+        return make_pipeline(StandardScaler(), model)
+    return model
+
+def fit_candidate(model, X: np.ndarray, y: np.ndarray, w: np.ndarray):
+    if hasattr(model, "steps"):
+        # Pipeline : le poids va au classifieur final
+        return model.fit(X, y, **{f"{model.steps[-1][0]}__sample_weight": w})
+    return model.fit(X, y, sample_weight=w)
+
+class WeightedEnsemble:
+    """Moyenne pondérée des predict_proba de modèles entraînés sur les mêmes classes."""
+
+    def __init__(self, members: dict, weights: dict, classes: np.ndarray):
+        self.members = {n: m for n, m in members.items() if weights.get(n, 0) > 0}
+        self.weights = {n: weights[n] for n in self.members}
+        self.classes_ = classes
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return sum(w * self.members[n].predict_proba(X) for n, w in self.weights.items())
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_proba(X).argmax(axis=1)
+
+    def __repr__(self) -> str:
+        return "WeightedEnsemble(" + ", ".join(f"{n}={w:.2f}" for n, w in self.weights.items()) + ")"
+
+# ======================
+# MÉMOIRE PARTAGÉE
+# ======================
+_SHARED = {}
+
+def share_arrays(arrays: dict) -> tuple:
+    """Copie chaque tableau dans un segment partagé ; retourne (segments, descripteurs)."""
+    blocks, specs = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+def _init_worker(specs: dict) -> None:
+    # Un thread par worker : le parallélisme vient du pool de processus
+    threadpool_limits(1)
+    for name, (shm_name, shape, dtype) in specs.items():
+        # Segment créé et libéré par le processus principal (même resource_tracker)
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+
+def _fit_task(name: str, params: dict, train_idx, test_idx) -> dict:
+    """train_idx None = tout le dataset (modèle final) ; sinon fit + probabilités de validation."""
+    X, y, w = (_SHARED[k][1] for k in ("X", "y", "w"))
+    if train_idx is not None:
+        X, y, w = X[train_idx], y[train_idx], w[train_idx]
+
+    t0 = time.perf_counter()
+    model = fit_candidate(make_candidate(name, params), X, y, w)
+    result = {"name": name, "fitSeconds": time.perf_counter() - t0}
+    if test_idx is None:
+        result["model"] = model
+    else:
+        result["proba"] = model.predict_proba(_SHARED["X"][1][test_idx])
+    return result
+
+# ======================
+# MESURES / ENSEMBLE
+# ======================
+def predict_latency(model, X: np.ndarray) -> float:
+    """Latence médiane (ms) d'un predict_proba sur PREDICT_ROWS lignes."""
+    model.predict_proba(X)
+    times = []
+    for _ in range(PREDICT_REPEAT):
+        t0 = time.perf_counter()
+        model.predict_proba(X)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+def ensemble_weights(probas: dict, y: np.ndarray, labels: list,
+                     rounds: int = ENSEMBLE_ROUNDS) -> dict:
+    """Sélection gloutonne avec remise : à chaque tour, le membre qui réduit le plus la log-loss."""
+    counts = dict.fromkeys(probas, 0)
+    total = np.zeros_like(next(iter(probas.values())))
+    for r in range(1, rounds + 1):
+        scores = {n: log_loss(y, (total + p) / r, labels=labels) for n, p in probas.items()}
+        best = min(scores, key=scores.get)
+        counts[best] += 1
+        total += probas[best]
+    return {n: c / rounds for n, c in counts.items()}
+
+def split_holdout(n: int, block: int = SPLIT_BLOCK_DAYS) -> tuple:
+    """
+    Positions (poids, score) dans la saison de validation : blocs de `block`
+    jours alternés, pour que les deux moitiés couvrent tout l'hiver (les
+    rouges n'existent que de novembre à mars).
+    """
+    fit_half = (np.arange(n) // block) % 2 == 0
+    return np.flatnonzero(fit_half), np.flatnonzero(~fit_half)
+
+def score(y: np.ndarray, proba: np.ndarray, labels: list) -> dict:
+    return {
+        "logLoss": round(float(log_loss(y, proba, labels=labels)), 4),
+        "accuracy": round(float((proba.argmax(axis=1) == y).mean()), 4),
+    }
+
+# ======================
+# FERME
+# ======================
+def train_farm(X: np.ndarray, y: np.ndarray, w: np.ndarray, folds: list, le, features: list,
+               names: list, params: dict, n_jobs: int = None) -> tuple:
+    """
+    Validation (dernier fold) et modèles finaux de chaque famille, en parallèle.
+    `params` : surcharges par famille (ex. hyperparamètres de boosting de train_ml).
+    Retourne (bundle, rapport).
+    """
+    season, train_idx, test_idx = folds[-1]
+    labels = list(range(len(le.classes_)))
+    blocks, specs = share_arrays({
+        "X": np.asarray(X, dtype=np.float64),
+        "y": np.asarray(y),
+        "w": np.asarray(w, dtype=np.float64),
+    })
+    try:
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(specs,)) as pool:
+            holdout = [pool.submit(_fit_task, n, params.get(n), train_idx, test_idx) for n in names]
+            final = [pool.submit(_fit_task, n, params.get(n), None, None) for n in names]
+            holdout = [f.result() for f in holdout]
+            final = [f.result() for f in final]
+        wall = time.perf_counter() - t0
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    y_test = np.asarray(y)[test_idx]
+    fit_pos, score_pos = split_holdout(len(test_idx))
+    sample = np.asarray(X, dtype=np.float64)[:PREDICT_ROWS]
+    members = {r["name"]: r["model"] for r in final}
+    probas = {r["name"]: r["proba"] for r in holdout}
+
+    candidates = []
+    for h, f in zip(holdout, final):
+        name = h["name"]
+        r = {
+            "name": name,
+            "modelType": CANDIDATES[name][0],
+            **score(y_test[score_pos], h["proba"][score_pos], labels),
+            "fitSeconds": round(f["fitSeconds"], 2),
+            "predictMs": round(predict_latency(members[name], sample), 3),
+        }
+        r["accuracyPerMs"] = round(r["accuracy"] / r["predictMs"], 2)
+        candidates.append(r)
+
+    # Poids appris sur une moitié, ensemble évalué sur l'autre (comme les familles)
+    weights = ensemble_weights({n: p[fit_pos] for n, p in probas.items()}, y_test[fit_pos], labels)
+    blend = sum(w * probas[n] for n, w in weights.items())
+    ensemble = WeightedEnsemble(members, weights, le.classes_)
+    ensemble_r = {
+        "name": "ensemble",
+        "modelType": repr(ensemble),
+        **score(y_test[score_pos], blend[score_pos], labels),
+        "fitSeconds": round(sum(f["fitSeconds"] for f in final if weights[f["name"]] > 0), 2),
+        "predictMs": round(predict_latency(ensemble, sample), 3),
+    }
+    ensemble_r["accuracyPerMs"] = round(ensemble_r["accuracy"] / ensemble_r["predictMs"], 2)
+    # Pour information : score sur la moitié qui a servi à choisir les poids (optimiste)
+    in_sample = score(y_test[fit_pos], blend[fit_pos], labels)
+
+    report = {
+        "validationSeason": f"{season}-{season + 1}",
+        "trainRows": len(train_idx),
+        "validationRows": len(test_idx),
+        "weightRows": len(fit_pos),
+        "scoreRows": len(score_pos),
+        "wallSeconds": round(wall, 2),
+        "candidates": candidates,
+        "ensemble": {**ensemble_r, "weights": weights,
+                     "inSampleLogLoss": in_sample["logLoss"],
+                     "inSampleAccuracy": in_sample["accuracy"]},
+    }
+    bundle = {
+        "model": ensemble,
+        "label_encoder": le,
+        "features": features,
+        "classes": list(le.classes_),
+        "model_type": repr(ensemble),
+        "ensemble_weights": weights,
+        "farm_report": report,
+    }
+    return bundle, report
+
+def print_report(report: dict) -> None:
+    print(f"\n📊 Validation saison {report['validationSeason']} "
+          f"(train {report['trainRows']}, test {report['validationRows']} : "
+          f"{report['weightRows']} pour les poids, {report['scoreRows']} pour le score) :")
+    print(f"   {'modèle':<10} {'log-loss':>9} {'acc':>7} {'fit (s)':>8} {'prédiction (ms)':>16} {'acc/ms':>8}")
+    rows = sorted(report["candidates"], key=lambda r: r["accuracyPerMs"], reverse=True)
+    for r in rows + [report["ensemble"]]:
+        print(f"   {r['name']:<10} {r['logLoss']:>9.4f} {r['accuracy']:>7.2%} {r['fitSeconds']:>8.2f} "
+              f"{r['predictMs']:>16.3f} {r['accuracyPerMs']:>8.2f}")
+    weights = ", ".join(f"{n} {w:.0%}" for n, w in report["ensemble"]["weights"].items() if w > 0)
+    print(f"   Poids de l'ensemble : {weights} (sur les jours des poids : log-loss "
+          f"{report['ensemble']['inSampleLogLoss']:.4f}, acc {report['ensemble']['inSampleAccuracy']:.2%})")
+    print(f"   ⏱️ {report['wallSeconds']:.1f} s (validation + modèles finaux en parallèle)")
+
+def save_farm(bundle: dict, report: dict, path: Path = ENSEMBLE_PATH,
+              report_path: Path = REPORT_PATH) -> None:
+    path.parent.mkdir(exist_ok=True)
+    joblib.dump(bundle, path)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n✅ Ensemble sauvegardé : {path} ({path.stat().st_size:,} bytes), rapport : {report_path}")
@@ -0,0 +1,178 @@
+"""
+🗂️ Registre des modèles ML Tempo
+Chaque bundle entraîné (ml_model.pkl + ml_model_compiled.npz) est archivé
+sous l'empreinte de ses entrées : contenu du dataset, liste des features,
+hyperparamètres et options d'entraînement. train_ml.py ne réentraîne pas
+si l'empreinte existe déjà ; la prédiction peut être épinglée sur une
+entrée (ou revenir à la précédente) sans réentraînement.
+
+Usage :
+    python ML/model_registry.py list
+    python ML/model_registry.py pin <id>
+    python ML/model_registry.py rollback
+    python ML/model_registry.py unpin
+"""
+import argparse
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+
+from prediction_cache import file_sha256
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+REGISTRY_DIR = BASE_DIR / "ML" / "registry"
+
+MAX_ENTRIES = 5         # entrées conservées (hors entrée active / épinglée)
+ID_LENGTH = 16
+
+MODEL_FILE = "ml_model.pkl"
+COMPILED_FILE = "ml_model_compiled.npz"
+
+def training_key(dataset_path: Path, features: list, params: dict, options: dict = None) -> str:
+    """Empreinte des entrées de l'entraînement (données + features + hyperparamètres)."""
+    h = hashlib.sha256()
+    h.update(file_sha256(dataset_path).encode())
+    h.update(json.dumps({"features": features, "params": params, "options": options or {}},
+                        sort_keys=True).encode())
+    return h.hexdigest()
+
+class ModelRegistry:
+    """Index JSON + un dossier par entrée (id = début de l'empreinte)."""
+
+    def __init__(self, root: Path = REGISTRY_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.index = {"entries": [], "active": None, "pinned": None}
+        if self.index_path.exists():
+            self.index.update(json.loads(self.index_path.read_text(encoding="utf-8")))
+
+    # ======================
+    # LECTURE
+    # ======================
+    def entries(self) -> list:
+        return self.index["entries"]
+
+    def get(self, entry_id: str):
+        """Entrée par id (ou préfixe non ambigu, ou empreinte complète)."""
+        matches = [e for e in self.entries() if e["id"].startswith(entry_id[:ID_LENGTH])]
+        if len(matches) > 1:
+            raise SystemExit(f"❌ Identifiant ambigu : {entry_id}")
+        return matches[0] if matches else None
+
+    def paths(self, entry_id: str) -> tuple:
+        folder = self.root / entry_id
+        return folder / MODEL_FILE, folder / COMPILED_FILE
+
+    def pinned(self):
+        pinned = self.index.get("pinned")
+        return self.get(pinned) if pinned else None
+
+    # ======================
+    # ÉCRITURE
+    # ======================
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(json.dumps(self.index, indent=2), encoding="utf-8")
+
+    def register(self, key: str, model_path: Path, compiled_path: Path, meta: dict) -> dict:
+        """Archive les fichiers actifs sous l'empreinte `key` et la marque active."""
+        entry_id = key[:ID_LENGTH]
+        model_dst, compiled_dst = self.paths(entry_id)
+        model_dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(model_path, model_dst)
+        if Path(compiled_path).exists():
+            shutil.copy2(compiled_path, compiled_dst)
+
+        entry = {
+            "id": entry_id,
+            "key": key,
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **meta,
+        }
+        self.index["entries"] = [e for e in self.entries() if e["id"] != entry_id] + [entry]
+        self.index["active"] = entry_id
+        self.prune()
+        self.save()
+        return entry
+
+    def activate(self, entry_id: str, model_path: Path, compiled_path: Path) -> None:
+        """Recopie une entrée vers les fichiers actifs (ML/ml_model.pkl, ...)."""
+        model_src, compiled_src = self.paths(entry_id)
+        for src, dst in ((model_src, Path(model_path)), (compiled_src, Path(compiled_path))):
+            if not src.exists():
+                dst.unlink(missing_ok=True)
+            elif not dst.exists() or file_sha256(src) != file_sha256(dst):
+                shutil.copy2(src, dst)
+        self.index["active"] = entry_id
+        self.save()
+
+    def pin(self, entry_id: str) -> dict:
+        entry = self.get(entry_id)
+        if entry is None:
+            raise SystemExit(f"❌ Entrée inconnue : {entry_id}")
+        self.index["pinned"] = entry["id"]
+        self.save()
+        return entry
+
+    def unpin(self) -> None:
+        self.index["pinned"] = None
+        self.save()
+
+    def rollback(self) -> dict:
+        """Épingle l'entrée qui précède la version utilisée (épinglée, sinon active)."""
+        current = self.index.get("pinned") or self.index.get("active")
+        ids = [e["id"] for e in self.entries()]
+        if current not in ids or ids.index(current) == 0:
+            raise SystemExit("❌ Aucune version précédente dans le registre")
+        return self.pin(ids[ids.index(current) - 1])
+
+    def prune(self) -> None:
+        """Garde les MAX_ENTRIES plus récentes, plus l'entrée active et l'épinglée."""
+        keep_ids = {e["id"] for e in self.entries()[-MAX_ENTRIES:]}
+        keep_ids |= {self.index.get("active"), self.index.get("pinned")}
+        for e in self.entries():
+            if e["id"] not in keep_ids:
+                shutil.rmtree(self.root / e["id"], ignore_errors=True)
+        self.index["entries"] = [e for e in self.entries() if e["id"] in keep_ids]
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Registre des modèles ML Tempo")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="entrées du registre")
+    pin = sub.add_parser("pin", help="épingle une entrée pour la prédiction")
+    pin.add_argument("entry_id")
+    sub.add_parser("unpin", help="revient au modèle actif")
+    sub.add_parser("rollback", help="épingle la version précédente")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+
+    if args.command == "list":
+        for e in registry.entries():
+            flags = "".join([
+                " [actif]" if e["id"] == registry.index.get("active") else "",
+                " [épinglé]" if e["id"] == registry.index.get("pinned") else "",
+            ])
+            acc = e.get("accuracy")
+            acc = "-" if acc is None else f"{acc:.2%}"
+            print(f"  {e['id']}  {e['createdAt']}  {e.get('modelType', '?'):<22} "
+                  f"{e.get('samples', '?'):>6} éch.  acc {acc}  "
+                  f"{e.get('trainingSeconds', 0):.0f} s{flags}")
+    elif args.command == "pin":
+        e = registry.pin(args.entry_id)
+        print(f"📌 Prédiction épinglée sur {e['id']} ({e['createdAt']})")
+    elif args.command == "unpin":
+        registry.unpin()
+        print("📌 Épinglage supprimé : prédiction sur le modèle actif")
+    elif args.command == "rollback":
+        e = registry.rollback()
+        print(f"⏪ Prédiction épinglée sur la version précédente {e['id']} ({e['createdAt']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,271 +1,415 @@
 """
 🤖 Prédictions ML Tempo - CORRIGÉ
-Post-processing amélioré avec des probabilités plus différenciées.
+Post-processing amélioré avec des probabilités plus différenciées
+(règles EDF vectorisées, voir tempo_rules.py).
+Inférence groupée : une seule matrice de features et un seul predict_proba
+pour tous les jours à prédire. Utilise le modèle compilé (NumPy seul) s'il
+existe, sinon le bundle sklearn. Les probabilités brutes sont mises en
+cache par empreinte des features (voir prediction_cache.py). La séquence
+jointe la plus probable sous quotas est ajoutée (voir quota_decoder.py).
+Si le modèle compilé contient des répliques bootstrap, toutes sont évaluées
+en une passe sur la même matrice : moyenne et intervalle par date.
+Une entrée du registre (model_registry.py) peut être épinglée pour la
+prédiction ; --model ID l'impose pour une exécution.
+Le modèle compilé est ouvert en memory-map (dossier .mmap voisin du .npz) :
+serveur, prédictions et backtests partagent les mêmes pages en mémoire.
+Features : pipeline partagé avec le dataset et l'entraînement (features.py) ;
+météo glissante (jours froids, degrés-jours, moyennes / minima) calculée sur
+weather_history.json (complété chaque jour par build_weather_history.py
+--update) prolongé par la prévision de chaque trajectoire ; avertissement si
+l'historique ne couvre pas la fenêtre la plus longue des jours prédits.
 """
+import argparse
 import json
-import pandas as pd
-import joblib
+import numpy as np
+from collections import Counter
 from datetime import datetime, date
 from pathlib import Path
 
+from compiled_model import CompiledForest, open_shared
+from features import ROLLING_WINDOWS, compute_features, model_matrix, weather_features
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, file_sha256
+from quota_decoder import decode_sequence
+from tempo_rules import COLORS, MAX_DAYS, apply_rules, calendar_arrays
+
 # ======================
 # PATHS
 # ======================
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 MODEL_PATH   = BASE_DIR / "ML" / "ml_model.pkl"
+COMPILED_PATH = BASE_DIR / "ML" / "ml_model_compiled.npz"
 TEMPO_PATH   = BASE_DIR / "tempo.json"
+WEATHER_PATH = BASE_DIR / "weather_history.json"
 EDF_PATH     = BASE_DIR / "edf_tempo.json"
 API_PERIOD   = BASE_DIR / "api_tempo.json"
 OUTPUT_PATH  = BASE_DIR / "ML" / "ml_predictions.json"
+CACHE_PATH   = BASE_DIR / "ML" / "ml_prediction_cache.json"
 
-print("🤖 Prédictions ML Tempo (post-processing amélioré)")
-
-# ======================
-# LOAD MODEL
-# ======================
-if not MODEL_PATH.exists():
-    raise SystemExit("❌ Modèle ML introuvable")
-
-bundle = joblib.load(MODEL_PATH)
-model = bundle["model"]
-le = bundle["label_encoder"]
-FEATURES = bundle["features"]
-model_type = bundle.get("model_type", "Unknown")
-
-print(f"🧠 Modèle : {model_type} | Features : {len(FEATURES)}")
-
-COLORS = ["bleu", "blanc", "rouge"]
+WEEKDAY_LABELS = ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"]
 
-MAX_DAYS = {"bleu": 300, "blanc": 43, "rouge": 22}
+ENSEMBLE_INTERVAL = (5, 95)     # percentiles sur les modèles de l'ensemble
 
 # ======================
-# LOAD DATA
+# UTILS
 # ======================
-if not TEMPO_PATH.exists():
-    raise SystemExit("❌ tempo.json introuvable")
-
-tempo = json.loads(TEMPO_PATH.read_text(encoding="utf-8"))
+def season_start_for(d: date) -> date:
+    season_year = d.year if d.month >= 9 else d.year - 1
+    return date(season_year, 9, 1)
 
 # ======================
-# COMPTEURS RÉELS DEPUIS L'API PÉRIODE
+# LOADERS
 # ======================
-used_days = {c: 0 for c in COLORS}
-
-if API_PERIOD.exists():
-    try:
-        api_data = json.loads(API_PERIOD.read_text(encoding="utf-8"))
-        if isinstance(api_data, list):
-            for entry in api_data:
-                lib = (entry.get("libCouleur") or "").lower().strip()
-                if "bleu" in lib:
-                    used_days["bleu"] += 1
-                elif "blanc" in lib:
-                    used_days["blanc"] += 1
-                elif "rouge" in lib:
-                    used_days["rouge"] += 1
-            print(f"📊 Compteurs API : B={used_days['bleu']} W={used_days['blanc']} R={used_days['rouge']}")
-    except Exception as e:
-        print(f"⚠️ api_tempo.json illisible : {e}")
+def resolve_model_paths(model_id: str = None) -> tuple:
+    """(pickle, compilé, id registre) : entrée demandée, sinon épinglée, sinon modèle actif."""
+    registry = ModelRegistry()
+    entry = registry.get(model_id) if model_id else registry.pinned()
+    if model_id and entry is None:
+        raise SystemExit(f"❌ Entrée du registre inconnue : {model_id}")
+    if entry is None:
+        return MODEL_PATH, COMPILED_PATH, registry.index.get("active")
+    print(f"📌 Modèle du registre : {entry['id']} ({entry['createdAt']})")
+    return (*registry.paths(entry["id"]), entry["id"])
+
+def load_bundle(path: Path = None, compiled_path: Path = None, model_id: str = None) -> dict:
+    """Modèle compilé en priorité (ni pandas, ni sklearn, ni joblib), sinon pickle sklearn.
+    Sans chemins explicites : entrée `model_id` ou épinglée du registre, sinon modèle actif."""
+    registry_id = None
+    if path is None and compiled_path is None:
+        path, compiled_path, registry_id = resolve_model_paths(model_id)
+    path = path or MODEL_PATH
+    compiled_path = compiled_path or COMPILED_PATH
+
+    if compiled_path.exists():
+        model_hash = file_sha256(compiled_path)
+        compiled = open_shared(compiled_path, model_hash)
+        return {
+            "model": compiled,
+            "features": compiled.features,
+            "classes": compiled.classes,
+            "model_type": f"{compiled.meta.get('model_type', 'Unknown')} (compilé)",
+            "model_hash": model_hash,
+            "registry_id": registry_id,
+        }
+
+    if not path.exists():
+        raise SystemExit("❌ Modèle ML introuvable")
+
+    import joblib
+    bundle = joblib.load(path)
+    bundle.setdefault("classes", list(bundle["label_encoder"].classes_))
+    bundle["model_hash"] = file_sha256(path)
+    bundle["registry_id"] = registry_id
+    return bundle
+
+def load_used_days(path: Path = API_PERIOD) -> dict:
+    """Compteurs réels de la saison depuis l'API période EDF."""
+    used_days = {c: 0 for c in COLORS}
+
+    if path.exists():
+        try:
+            api_data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(api_data, list):
+                for entry in api_data:
+                    lib = (entry.get("libCouleur") or "").lower().strip()
+                    if "bleu" in lib:
+                        used_days["bleu"] += 1
+                    elif "blanc" in lib:
+                        used_days["blanc"] += 1
+                    elif "rouge" in lib:
+                        used_days["rouge"] += 1
+                print(f"📊 Compteurs API : B={used_days['bleu']} W={used_days['blanc']} R={used_days['rouge']}")
+        except Exception as e:
+            print(f"⚠️ api_tempo.json illisible : {e}")
+
+    return used_days
+
+# (clé du fichier, dates, températures) : remplacé d'un bloc, jamais modifié en
+# place, donc lisible sans verrou par les threads de predict_server.py
+_WEATHER_HISTORY = None
+
+def load_weather_history(path: Path = WEATHER_PATH) -> tuple:
+    """(dates datetime64[D], températures) de weather_history.json, relu si le fichier change."""
+    global _WEATHER_HISTORY
+    if not path.exists():
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0)
+    key = (path, path.stat().st_mtime_ns)
+    cached = _WEATHER_HISTORY
+    if cached is None or cached[0] != key:
+        try:
+            records = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            records = []
+        dates, temps = [], []
+        for w in records if isinstance(records, list) else []:
+            try:
+                d = datetime.fromisoformat(w["date"]).date()
+                t = float(w["temperature"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            dates.append(d)
+            temps.append(t)
+        dates, temps = np.array(dates, dtype="datetime64[D]"), np.array(temps)
+        dates.setflags(write=False)
+        temps.setflags(write=False)
+        cached = (key, dates, temps)
+        _WEATHER_HISTORY = cached
+    return cached[1], cached[2]
+
+def weather_history_gap(pending: list) -> int:
+    """Jours non couverts par weather_history.json dans les fenêtres glissantes du
+    premier jour prédit (0 si l'historique va jusqu'à la veille)."""
+    if not pending:
+        return 0
+    hist_dates, _ = load_weather_history()
+    first = np.datetime64(min(d for _, d in pending), "D")
+    window_start = first - np.timedelta64(max(ROLLING_WINDOWS) - 1, "D")
+    covered_until = hist_dates.max() + 1 if len(hist_dates) else window_start
+    return int(np.clip((first - max(covered_until, window_start)).astype(int), 0, None))
 
 # ======================
-# UTILS
+# FEATURES
 # ======================
-def is_winter(d: date) -> bool:
-    return d.month in (11, 12, 1, 2, 3)
-
-def is_peak_winter(d: date) -> bool:
-    return d.month in (1, 2)
-
-def get_winter_intensity(month: int) -> int:
-    return {11: 2, 12: 3, 1: 4, 2: 4, 3: 2}.get(month, 0)
-
-def get_temp_category(temp: float) -> int:
-    if temp < -5: return 0
-    if temp < 0: return 1
-    if temp < 5: return 2
-    if temp < 10: return 3
-    if temp < 15: return 4
-    return 5
-
-today = date.today()
-season_year = today.year if today.month >= 9 else today.year - 1
-SEASON_START = date(season_year, 9, 1)
+def pending_days(tempo: list) -> list:
+    """Jours non figés de tempo.json avec leur date parsée, dans l'ordre du fichier."""
+    pending = []
+    for day in tempo:
+        if day.get("fixed"):
+            continue
+        try:
+            d = datetime.fromisoformat(day["date"]).date()
+        except Exception:
+            continue
+        pending.append((day, d))
+    return pending
+
+def build_feature_matrix(pending: list, features: list, used_days: dict,
+                         season_start: date, overrides: dict = None) -> np.ndarray:
+    """Une ligne par jour à prédire, colonnes dans l'ordre FEATURES du bundle.
+    `overrides` force la valeur de features (ex. {"remainingRouge": 3}) sur toutes les lignes."""
+    remaining = [max(0, MAX_DAYS[c] - used_days[c]) for c in COLORS]
+    days = [day for day, _ in pending]
+    dates = np.array([d for _, d in pending], dtype="datetime64[D]")
+    temp = np.array([day.get("temperature", 8) for day in days], dtype=float)
+    columns = compute_features(
+        dates=dates,
+        temp=temp,
+        rte=np.array([day.get("rteConsommation", 55000) for day in days], dtype=float),
+        remaining=np.tile(remaining, (len(pending), 1)),
+        horizon=np.array([day.get("horizon", 0) for day in days], dtype=float),
+        weather=forecast_weather(days, dates, temp),
+        start=season_start,
+    )
+    return model_matrix(columns, features, overrides)
+
+def forecast_weather(days: list, dates: np.ndarray, temp: np.ndarray) -> dict:
+    """
+    Features météo glissantes : historique prolongé par les températures
+    prévues. La k-ième occurrence d'une date appartient à la trajectoire k
+    (scénarios de predict_scenarios, ordre date-major) : chaque trajectoire
+    a sa propre série.
+    """
+    hist_dates, hist_temps = load_weather_history()
+    forecast = np.array(["temperature" in day for day in days], dtype=bool)
+    seen = Counter()
+    trajectory = np.zeros(len(days), dtype=int)
+    for i, d in enumerate(dates.tolist()):
+        trajectory[i] = seen[d]
+        seen[d] += 1
+
+    weather = {}
+    for k in np.unique(trajectory):
+        rows = trajectory == k
+        known = rows & forecast
+        part = weather_features(dates[rows], temp[rows],
+                                np.concatenate([hist_dates, dates[known]]),
+                                np.concatenate([hist_temps, temp[known]]))
+        for name, values in part.items():
+            weather.setdefault(name, np.zeros(len(days)))[rows] = values
+    return weather
 
 # ======================
-# PREDICTIONS
+# ML PREDICTION (groupée)
 # ======================
-predictions = []
-
-for day in tempo:
-    if day.get("fixed"):
-        continue
-
-    try:
-        d = datetime.fromisoformat(day["date"]).date()
-    except Exception:
-        continue
-
-    weekday = d.weekday()
-
-    # Quotas restants
-    remaining = {c: max(0, MAX_DAYS[c] - used_days[c]) for c in COLORS}
-
-    season_day_index = (d - SEASON_START).days + 1
-    temp = day.get("temperature", 8)
-
-    quota_pressure = (
-        (43 - remaining["blanc"]) / 43 * 0.5 +
-        (22 - remaining["rouge"]) / 22 * 0.5
-    )
-
-    # ======================
-    # BUILD FEATURES
-    # ======================
-    feature_pool = {
-        "temp": temp,
-        "temperature": temp,
-        "temp_cat": get_temp_category(temp),
-        "coldDays": day.get("coldDays", 0),
-        "rte": day.get("rteConsommation", 55000),
-        "rteConsommation": day.get("rteConsommation", 55000),
-        "weekday": weekday,
-        "month": d.month,
-        "day_of_month": d.day,
-        "horizon": day.get("horizon", 0),
-        "seasonDayIndex": season_day_index,
-        "isWinter": int(is_winter(d)),
-        "isWeekend": int(weekday >= 5),
-        "winter_intensity": get_winter_intensity(d.month),
-        "remainingBleu": remaining["bleu"],
-        "remainingBlanc": remaining["blanc"],
-        "remainingRouge": remaining["rouge"],
-        "winterBleuRemaining": remaining["bleu"] if is_winter(d) else 0,
-        "quota_pressure": quota_pressure
+def predict_raw(bundle: dict, X: np.ndarray) -> np.ndarray:
+    """Un seul predict_proba pour toute la matrice → tableau (N × 3) ordre COLORS."""
+    P = np.zeros((len(X), len(COLORS)))
+    if len(X) == 0:
+        return P
+
+    model = bundle["model"]
+    if isinstance(model, CompiledForest):
+        probs = model.predict_proba(X)
+    else:
+        import pandas as pd
+        probs = model.predict_proba(pd.DataFrame(X, columns=bundle["features"]))
+
+    for i, c in enumerate(bundle["classes"]):
+        P[:, COLORS.index(c)] = probs[:, i]
+    return P
+
+def predict_raw_all(bundle: dict, X: np.ndarray) -> np.ndarray:
+    """Tous les modèles du bundle en une passe → (N × n_modèles × 3) ordre COLORS.
+    Le modèle 0 est le modèle principal ; un bundle sklearn n'en a qu'un."""
+    model = bundle["model"]
+    if not isinstance(model, CompiledForest) or model.n_models == 1:
+        return predict_raw(bundle, X)[:, None, :]
+
+    P = np.zeros((len(X), model.n_models, len(COLORS)))
+    if len(X) == 0:
+        return P
+    probs = model.predict_proba_all(X)
+    for i, c in enumerate(bundle["classes"]):
+        P[:, :, COLORS.index(c)] = probs[:, :, i]
+    return P
+
+def predict_raw_cached(bundle: dict, X: np.ndarray, cache: PredictionCache,
+                       n_models: int = 1) -> np.ndarray:
+    """Comme predict_raw (ou predict_raw_all si n_models > 1), mais seules les
+    lignes absentes du cache passent par le modèle."""
+    n_outputs = n_models * len(COLORS)
+    P, missing, keys = cache.lookup(X, n_outputs)
+    if missing.any():
+        fresh = predict_raw(bundle, X[missing]) if n_models == 1 \
+            else predict_raw_all(bundle, X[missing]).reshape(-1, n_outputs)
+        P[missing] = fresh
+        cache.store([k for k, m in zip(keys, missing) if m], P[missing])
+    return P if n_models == 1 else P.reshape(len(X), n_models, len(COLORS))
+
+def format_prediction(date_str: str, probs) -> dict:
+    ml_probs = {c: float(probs[i]) for i, c in enumerate(COLORS)}
+    ml_color = max(ml_probs, key=ml_probs.get)
+    return {
+        "date": date_str,
+        "mlPrediction": ml_color,
+        "mlProbabilities": {c: round(ml_probs[c] * 100) for c in COLORS},
+        "mlConfidence": round(ml_probs[ml_color] * 100)
     }
 
-    X = pd.DataFrame([{f: feature_pool.get(f, 0) for f in FEATURES}])
-
-    # ======================
-    # ML PREDICTION
-    # ======================
-    probs = model.predict_proba(X)[0]
-    classes = le.inverse_transform(range(len(probs)))
-
-    ml_probs = {c: 0.0 for c in COLORS}
-    for i, c in enumerate(classes):
-        ml_probs[c] = float(probs[i])
+def predict_matrix(bundle: dict, pending: list, used_days: dict, season_start: date,
+                   cache: PredictionCache = None, overrides: dict = None) -> np.ndarray:
+    """Chemin groupé complet : features → predict_proba unique → règles EDF vectorisées.
+    Retourne les probabilités finales (N × 3, ordre COLORS)."""
+    X = build_feature_matrix(pending, bundle["features"], used_days, season_start, overrides)
+    raw = predict_raw(bundle, X) if cache is None else predict_raw_cached(bundle, X, cache)
+
+    weekday, month = calendar_arrays([d for _, d in pending])
+    temp = [day.get("temperature", 8) for day, _ in pending]
+    return apply_rules(raw, weekday, month, temp)
+
+def predict_ensemble(bundle: dict, pending: list, used_days: dict, season_start: date,
+                     cache: PredictionCache = None, overrides: dict = None) -> np.ndarray:
+    """Comme predict_matrix pour chaque modèle de l'ensemble (règles EDF comprises).
+    Retourne (N × n_modèles × 3) ; [:, 0] est identique à predict_matrix."""
+    model = bundle["model"]
+    n_models = model.n_models if isinstance(model, CompiledForest) else 1
+
+    X = build_feature_matrix(pending, bundle["features"], used_days, season_start, overrides)
+    if cache is None:
+        raw = predict_raw_all(bundle, X)
+    else:
+        raw = predict_raw_cached(bundle, X, cache, n_models).reshape(len(X), n_models, len(COLORS))
+
+    weekday, month = calendar_arrays([d for _, d in pending])
+    temp = [day.get("temperature", 8) for day, _ in pending]
+    P = apply_rules(raw.reshape(-1, len(COLORS)), np.repeat(weekday, n_models),
+                    np.repeat(month, n_models), np.repeat(temp, n_models))
+    return P.reshape(len(pending), n_models, len(COLORS))
+
+def format_ensemble(probs_models: np.ndarray) -> dict:
+    """probs_models : (n_modèles × 3) → moyenne et intervalle par couleur (%)."""
+    mean = probs_models.mean(axis=0)
+    low, high = np.percentile(probs_models, ENSEMBLE_INTERVAL, axis=0)
+    return {
+        "models": len(probs_models),
+        "interval": list(ENSEMBLE_INTERVAL),
+        "mean": {c: round(float(mean[i]) * 100) for i, c in enumerate(COLORS)},
+        "low": {c: round(float(low[i]) * 100) for i, c in enumerate(COLORS)},
+        "high": {c: round(float(high[i]) * 100) for i, c in enumerate(COLORS)},
+    }
 
-    # ======================
-    # 🔒 RÈGLES EDF ABSOLUES (appliquées en premier)
-    # ======================
-    
-    # Dimanche : TOUJOURS bleu
-    if weekday == 6:
-        ml_probs = {"bleu": 1.0, "blanc": 0.0, "rouge": 0.0}
-    
-    # Samedi : JAMAIS rouge
-    elif weekday == 5:
-        rouge_removed = ml_probs["rouge"]
-        ml_probs["rouge"] = 0.0
-        # Redistribuer proportionnellement entre bleu et blanc
-        if ml_probs["bleu"] + ml_probs["blanc"] > 0:
-            ratio_bleu = ml_probs["bleu"] / (ml_probs["bleu"] + ml_probs["blanc"])
-            ml_probs["bleu"] += rouge_removed * ratio_bleu
-            ml_probs["blanc"] += rouge_removed * (1 - ratio_bleu)
-        else:
-            ml_probs["bleu"] = 0.7
-            ml_probs["blanc"] = 0.3
-    
-    # Rouge interdit hors hiver
-    elif not is_winter(d):
-        rouge_removed = ml_probs["rouge"]
-        ml_probs["rouge"] = 0.0
-        if ml_probs["bleu"] + ml_probs["blanc"] > 0:
-            ratio_bleu = ml_probs["bleu"] / (ml_probs["bleu"] + ml_probs["blanc"])
-            ml_probs["bleu"] += rouge_removed * ratio_bleu
-            ml_probs["blanc"] += rouge_removed * (1 - ratio_bleu)
+def predict_days(bundle: dict, pending: list, used_days: dict, season_start: date,
+                 cache: PredictionCache = None, overrides: dict = None) -> list:
+    """Comme predict_matrix, formaté comme ml_predictions.json."""
+    P = predict_matrix(bundle, pending, used_days, season_start, cache, overrides)
+    return [format_prediction(day["date"], P[i]) for i, (day, _) in enumerate(pending)]
 
-    # ======================
-    # 🔥 AJUSTEMENT HIVERNAL (léger, le modèle devrait déjà gérer)
-    # ======================
-    if is_winter(d) and weekday not in [5, 6]:
-        # Si le modèle est très confiant sur bleu en plein hiver semaine,
-        # on réduit légèrement (mais le modèle entraîné avec bleu devrait être meilleur)
-        if ml_probs["bleu"] > 0.7 and is_peak_winter(d):
-            excess = (ml_probs["bleu"] - 0.55) * 0.3
-            ml_probs["bleu"] -= excess
-            ml_probs["blanc"] += excess * 0.6
-            ml_probs["rouge"] += excess * 0.4
-        
-        # Boost température très froide
-        if temp < 0:
-            ml_probs["rouge"] = min(0.5, ml_probs["rouge"] * 1.3)
-            ml_probs["bleu"] *= 0.85
-        elif temp < 5 and is_peak_winter(d):
-            ml_probs["blanc"] = min(0.5, ml_probs["blanc"] * 1.15)
-            ml_probs["bleu"] *= 0.9
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Prédictions ML Tempo")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="recalculer toutes les dates sans lire ni écrire le cache")
+    parser.add_argument("--model", default=None,
+                        help="id d'une entrée du registre (sinon entrée épinglée ou modèle actif)")
+    args = parser.parse_args()
+
+    print("🤖 Prédictions ML Tempo (post-processing amélioré)")
+
+    bundle = load_bundle(model_id=args.model)
+    model_type = bundle.get("model_type", "Unknown")
+    print(f"🧠 Modèle : {model_type} | Features : {len(bundle['features'])}")
+
+    if not TEMPO_PATH.exists():
+        raise SystemExit("❌ tempo.json introuvable")
+
+    tempo = json.loads(TEMPO_PATH.read_text(encoding="utf-8"))
+    used_days = load_used_days()
+
+    cache = None if args.no_cache else PredictionCache(CACHE_PATH, bundle["model_hash"])
+
+    pending = pending_days(tempo)
+    gap = weather_history_gap(pending)
+    if gap:
+        print(f"⚠️ Météo observée manquante sur {gap} jour(s) des fenêtres glissantes "
+              f"(weather_history.json à compléter : ML/build_weather_history.py --update)")
+    PE = predict_ensemble(bundle, pending, used_days, season_start_for(date.today()), cache)
+    P = PE[:, 0]
+    predictions = [format_prediction(day["date"], P[i]) for i, (day, _) in enumerate(pending)]
+
+    # Ensemble bootstrap : dispersion des probabilités entre modèles
+    if PE.shape[1] > 1:
+        print(f"🎯 Ensemble : {PE.shape[1]} modèles évalués en une passe")
+        for i, p in enumerate(predictions):
+            p["mlEnsemble"] = format_ensemble(PE[i])
 
     # ======================
-    # NORMALISATION
+    # 🧭 DÉCODAGE JOINT SOUS QUOTAS
     # ======================
-    total = sum(ml_probs.values())
-    if total > 0:
-        for c in COLORS:
-            ml_probs[c] = ml_probs[c] / total
-    else:
-        if is_winter(d):
-            ml_probs = {"bleu": 0.4, "blanc": 0.35, "rouge": 0.25}
-        else:
-            ml_probs = {"bleu": 0.85, "blanc": 0.12, "rouge": 0.03}
+    order = sorted(range(len(pending)), key=lambda i: pending[i][1])
+    joint = decode_sequence(P[order], [pending[i][1] for i in order], used_days)
+    for i, c in zip(order, joint):
+        predictions[i]["mlJointPrediction"] = COLORS[c]
+
+    for (day, d), p in zip(pending, predictions):
+        probs = p["mlProbabilities"]
+        joint_note = "" if p["mlJointPrediction"] == p["mlPrediction"] \
+            else f" [joint : {p['mlJointPrediction'].upper()}]"
+        ens = p.get("mlEnsemble")
+        ens_note = "" if ens is None else \
+            f" [{ens['low'][p['mlPrediction']]}–{ens['high'][p['mlPrediction']]}%]"
+        print(f"  {p['date']} ({WEEKDAY_LABELS[d.weekday()]}) "
+              f"→ {p['mlPrediction'].upper()} "
+              f"(B:{probs['bleu']}% W:{probs['blanc']}% R:{probs['rouge']}%){ens_note}{joint_note}")
 
     # ======================
-    # PLAFONNEMENT INTELLIGENT
-    # Pas de 100% sauf dimanche, mais on garde la différenciation
+    # SAVE
     # ======================
-    if weekday != 6:
-        max_prob = max(ml_probs.values())
-        if max_prob > 0.92:
-            top_color = max(ml_probs, key=ml_probs.get)
-            ml_probs[top_color] = 0.92
-            # Redistribuer le surplus proportionnellement aux autres
-            others = {c: ml_probs[c] for c in COLORS if c != top_color}
-            others_total = sum(others.values())
-            surplus = 1.0 - 0.92 - others_total
-            if others_total > 0:
-                for c in others:
-                    ml_probs[c] += surplus * (others[c] / others_total)
-            else:
-                # Distribuer uniformément
-                for c in others:
-                    ml_probs[c] = (1.0 - 0.92) / len(others)
-
-    # Re-normaliser après plafonnement
-    total = sum(ml_probs.values())
-    if total > 0 and abs(total - 1.0) > 0.01:
-        for c in COLORS:
-            ml_probs[c] /= total
-
-    ml_color = max(ml_probs, key=ml_probs.get)
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    OUTPUT_PATH.write_text(json.dumps(predictions, indent=2), encoding="utf-8")
 
-    predictions.append({
-        "date": day["date"],
-        "mlPrediction": ml_color,
-        "mlProbabilities": {c: round(ml_probs[c] * 100) for c in COLORS},
-        "mlConfidence": round(ml_probs[ml_color] * 100)
-    })
+    if cache is not None:
+        cache.save()
 
-    print(f"  {day['date']} ({['Lun','Mar','Mer','Jeu','Ven','Sam','Dim'][weekday]}) "
-          f"→ {ml_color.upper()} "
-          f"(B:{round(ml_probs['bleu']*100)}% W:{round(ml_probs['blanc']*100)}% R:{round(ml_probs['rouge']*100)}%)")
+    print(f"\n✅ {len(predictions)} prédictions ML générées")
+    for color in COLORS:
+        count = sum(1 for p in predictions if p["mlPrediction"] == color)
+        print(f"   {color}: {count}")
+    if cache is not None:
+        print(cache.summary())
 
-# ======================
-# SAVE
-# ======================
-OUTPUT_PATH.parent.mkdir(exist_ok=True)
-OUTPUT_PATH.write_text(json.dumps(predictions, indent=2), encoding="utf-8")
 
-print(f"\n✅ {len(predictions)} prédictions ML générées")
-for color in COLORS:
-    count = sum(1 for p in predictions if p["mlPrediction"] == color)
-    print(f"   {color}: {count}")
+if __name__ == "__main__":
+    main()
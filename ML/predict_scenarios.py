@@ -0,0 +1,141 @@
+"""
+🌡️ Prédictions ML Tempo par scénarios météo
+Pour chaque date, K scénarios de température (membres d'ensemble fournis,
+ou perturbations de la prévision de tempo.json dont l'écart-type croît
+avec l'horizon). Les N × K lignes passent par le même code de features
+que predict_ml et sont scorées en un seul appel groupé ; on rapporte la
+dispersion des probabilités (moyenne, écart-type, quantiles) par date.
+
+Usage :
+    python ML/predict_scenarios.py --members 50
+    python ML/predict_scenarios.py --members-file ensemble.json   # {"AAAA-MM-JJ": [t1, ..., tK]}
+"""
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from predict_ml import (
+    BASE_DIR, TEMPO_PATH, load_bundle, load_used_days, pending_days,
+    predict_matrix, season_start_for
+)
+from tempo_rules import COLORS
+
+OUTPUT_PATH = BASE_DIR / "ML" / "ml_scenarios.json"
+
+DEFAULT_MEMBERS = 50
+DEFAULT_TEMPERATURE = 8     # même défaut que predict_ml
+QUANTILES = (10, 50, 90)
+
+# Incertitude de la prévision de température : sigma = BASE + SLOPE × horizon (°C)
+SIGMA_BASE = 1.0
+SIGMA_SLOPE = 0.4
+
+# ======================
+# SCÉNARIOS
+# ======================
+def perturbed_members(pending: list, k: int, seed: int = None) -> np.ndarray:
+    """(N × K) températures : prévision + bruit gaussien croissant avec l'horizon."""
+    rng = np.random.default_rng(seed)
+    base = np.array([day.get("temperature", DEFAULT_TEMPERATURE) for day, _ in pending], dtype=float)
+    horizon = np.array([day.get("horizon", 0) for day, _ in pending], dtype=float)
+    sigma = SIGMA_BASE + SIGMA_SLOPE * horizon
+    return base[:, None] + rng.standard_normal((len(pending), k)) * sigma[:, None]
+
+def file_members(pending: list, path: Path) -> np.ndarray:
+    """(N × K) températures lues depuis un fichier d'ensemble {date: [membres]}."""
+    members = json.loads(path.read_text(encoding="utf-8"))
+    missing = [day["date"] for day, _ in pending if day["date"] not in members]
+    if missing:
+        raise SystemExit(f"❌ Membres absents pour : {', '.join(missing)}")
+    sizes = {len(members[day["date"]]) for day, _ in pending}
+    if len(sizes) != 1:
+        raise SystemExit("❌ Nombre de membres différent selon les dates")
+    return np.array([members[day["date"]] for day, _ in pending], dtype=float)
+
+def expand_scenarios(pending: list, temps: np.ndarray) -> list:
+    """Duplique chaque jour K fois avec la température du scénario (ordre date-major)."""
+    return [({**day, "temperature": float(t)}, d)
+            for (day, d), row in zip(pending, temps) for t in row]
+
+def summarize(P: np.ndarray) -> list:
+    """P : (N × K × 3) → statistiques par date et par couleur."""
+    mean = P.mean(axis=1)
+    std = P.std(axis=1)
+    q = np.percentile(P, QUANTILES, axis=1)            # (len(QUANTILES) × N × 3)
+    winner = np.stack([(P.argmax(axis=2) == i).mean(axis=1) for i in range(len(COLORS))], axis=1)
+
+    stats = []
+    for n in range(len(P)):
+        stats.append({
+            c: {
+                "mean": round(float(mean[n, i]) * 100, 1),
+                "std": round(float(std[n, i]) * 100, 1),
+                **{f"p{qq}": round(float(q[j, n, i]) * 100, 1) for j, qq in enumerate(QUANTILES)},
+                "winShare": round(float(winner[n, i]), 3),
+            } for i, c in enumerate(COLORS)
+        })
+    return stats
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Prédictions ML par scénarios météo")
+    parser.add_argument("--members", type=int, default=DEFAULT_MEMBERS,
+                        help="nombre de perturbations par date")
+    parser.add_argument("--members-file", type=Path, default=None,
+                        help="membres d'ensemble {date: [températures]} (remplace --members)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print("🌡️ Prédictions ML par scénarios météo")
+
+    if not TEMPO_PATH.exists():
+        raise SystemExit("❌ tempo.json introuvable")
+
+    bundle = load_bundle()
+    used_days = load_used_days()
+    pending = pending_days(json.loads(TEMPO_PATH.read_text(encoding="utf-8")))
+
+    if args.members_file is not None:
+        temps = file_members(pending, args.members_file)
+    else:
+        temps = perturbed_members(pending, args.members, args.seed)
+    k = temps.shape[1] if len(pending) else 0
+
+    t0 = time.perf_counter()
+    scenarios = expand_scenarios(pending, temps)
+    P = predict_matrix(bundle, scenarios, used_days, season_start_for(date.today()))
+    P = P.reshape(len(pending), k, len(COLORS))
+    elapsed = time.perf_counter() - t0
+
+    stats = summarize(P) if len(pending) else []
+    output = [{
+        "date": day["date"],
+        "members": k,
+        "temperature": {
+            "mean": round(float(temps[n].mean()), 1),
+            "min": round(float(temps[n].min()), 1),
+            "max": round(float(temps[n].max()), 1),
+        },
+        "probabilities": stats[n],
+    } for n, (day, _) in enumerate(pending)]
+
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    OUTPUT_PATH.write_text(json.dumps(output, indent=2), encoding="utf-8")
+
+    print(f"⏱️ {len(pending)} dates × {k} scénarios scorés en {elapsed * 1000:.0f} ms")
+    for entry in output:
+        r = entry["probabilities"]["rouge"]
+        w = entry["probabilities"]["blanc"]
+        print(f"  {entry['date']} → W {w['mean']}% [{w['p10']}–{w['p90']}] "
+              f"R {r['mean']}% [{r['p10']}–{r['p90']}]")
+    print(f"💾 Sauvegardé : {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+📅 Prévision longue portée ML Tempo - jusqu'au 31 août
+Probabilités pour chaque jour restant de la saison Tempo en cours. Les
+jours présents dans tempo.json gardent leurs données ; au-delà, la
+température est remplacée par la climatologie de weather_history.json
+(moyenne du jour de l'année, lissée sur ±7 jours).
+Une seule matrice de features, un seul predict_proba (inférence groupée).
+Sortie séparée, chargée à la demande par le frontend.
+"""
+import json
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from predict_ml import (
+    BASE_DIR, TEMPO_PATH, format_prediction, load_bundle, load_used_days,
+    predict_matrix, season_start_for
+)
+from quota_decoder import decode_sequence
+from tempo_rules import COLORS
+
+WEATHER_PATH = BASE_DIR / "weather_history.json"
+OUTPUT_PATH  = BASE_DIR / "ML" / "ml_season_forecast.json"
+
+CLIMATOLOGY_WINDOW = 7          # ± jours de lissage
+DEFAULT_TEMPERATURE = 8         # même défaut que predict_ml
+
+# ======================
+# CLIMATOLOGIE
+# ======================
+def _day_of_year(d: date) -> int:
+    """Index 0..365 sur un calendrier bissextile (le 29/02 a sa propre case)."""
+    return (date(2000, d.month, d.day) - date(2000, 1, 1)).days
+
+def build_climatology(weather: list, window: int = CLIMATOLOGY_WINDOW) -> np.ndarray:
+    """Température moyenne par jour de l'année (366 valeurs), lissage circulaire."""
+    sums = np.zeros(366)
+    counts = np.zeros(366)
+    for w in weather:
+        if not isinstance(w, dict) or w.get("temperature") is None:
+            continue
+        try:
+            d = date.fromisoformat(w["date"])
+        except (KeyError, ValueError):
+            continue
+        i = _day_of_year(d)
+        sums[i] += w["temperature"]
+        counts[i] += 1
+
+    # Somme glissante circulaire (décembre ↔ janvier) sur 2 × window + 1 jours
+    kernel = np.ones(2 * window + 1)
+    smooth_sums = np.convolve(np.pad(sums, window, mode="wrap"), kernel, mode="valid")
+    smooth_counts = np.convolve(np.pad(counts, window, mode="wrap"), kernel, mode="valid")
+
+    return np.divide(smooth_sums, smooth_counts,
+                     out=np.full(366, float(DEFAULT_TEMPERATURE)),
+                     where=smooth_counts > 0)
+
+# ======================
+# JOURS DE LA SAISON
+# ======================
+def season_days(today: date, tempo: list, climatology: np.ndarray) -> list:
+    """De aujourd'hui au 31 août : entrées tempo.json si disponibles, sinon climatologie."""
+    season_end = date(season_start_for(today).year + 1, 8, 31)
+    by_date = {day.get("date"): day for day in tempo}
+
+    pending = []
+    d = today
+    while d <= season_end:
+        known = by_date.get(d.isoformat())
+        if known is not None and known.get("fixed"):
+            d += timedelta(days=1)
+            continue
+
+        day = dict(known) if known is not None else {"date": d.isoformat()}
+        day.setdefault("horizon", (d - today).days)
+        if "temperature" in day:
+            day["temperatureSource"] = "prevision"
+        else:
+            day["temperature"] = round(float(climatology[_day_of_year(d)]), 1)
+            day["temperatureSource"] = "climatologie"
+
+        pending.append((day, d))
+        d += timedelta(days=1)
+    return pending
+
+# ======================
+# MAIN
+# ======================
+def main():
+    print("📅 Prévision ML jusqu'à la fin de saison Tempo")
+
+    bundle = load_bundle()
+    used_days = load_used_days()
+
+    tempo = json.loads(TEMPO_PATH.read_text(encoding="utf-8")) if TEMPO_PATH.exists() else []
+    weather = json.loads(WEATHER_PATH.read_text(encoding="utf-8")) if WEATHER_PATH.exists() else []
+
+    t0 = time.perf_counter()
+    today = date.today()
+    climatology = build_climatology(weather)
+    pending = season_days(today, tempo, climatology)
+
+    P = predict_matrix(bundle, pending, used_days, season_start_for(today))
+    joint = decode_sequence(P, [d for _, d in pending], used_days)
+    elapsed = time.perf_counter() - t0
+
+    days = []
+    for i, (day, _) in enumerate(pending):
+        p = format_prediction(day["date"], P[i])
+        p["mlJointPrediction"] = COLORS[joint[i]]
+        p["temperature"] = day["temperature"]
+        p["temperatureSource"] = day["temperatureSource"]
+        days.append(p)
+
+    output = {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seasonEnd": days[-1]["date"] if days else None,
+        "modelType": bundle.get("model_type", "Unknown"),
+        "usedDays": used_days,
+        "days": days,
+    }
+
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    OUTPUT_PATH.write_text(json.dumps(output, indent=2), encoding="utf-8")
+
+    n_clim = sum(1 for day, _ in pending if day["temperatureSource"] == "climatologie")
+    print(f"⏱️ {len(days)} jours prédits en {elapsed * 1000:.0f} ms "
+          f"({n_clim} sur climatologie)")
+    for color in COLORS:
+        count = sum(1 for p in days if p["mlJointPrediction"] == color)
+        print(f"   {color} (séquence jointe) : {count}")
+    print(f"💾 Sauvegardé : {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+🛰️ Serveur de prédiction ML Tempo
+Charge le modèle une seule fois (features, classes, compteurs de quotas)
+et répond aux demandes de prédiction sur une API HTTP locale, sans payer
+à chaque appel le démarrage de Python, les imports et le chargement du modèle.
+
+Usage :
+    python ML/predict_server.py --port 8765
+
+    GET  /health   → état du modèle chargé
+    POST /predict  → {"dates": ["2027-01-12", ...]}
+                     ou {"days": [{"date": "2027-01-12", "temperature": -3, "horizon": 2}]}
+                     options : "overrides" {feature: valeur}, "usedDays" {couleur: n}
+                     (features du modèle uniquement, n entre 0 et le quota : sinon 400)
+                     temperature / rteConsommation / horizon : nombres (null → 400)
+    POST /reload   → recharge le modèle et api_tempo.json
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from predict_ml import (
+    COLORS, MAX_DAYS, load_bundle, load_used_days, load_weather_history, pending_days, predict_days,
+    season_start_for
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Champs numériques facultatifs d'un jour : absents → valeur par défaut, jamais null
+NUMERIC_FIELDS = ("temperature", "rteConsommation", "horizon")
+
+# ======================
+# ÉTAT CHAUD
+# ======================
+class PredictorState:
+    """Modèle et compteurs gardés en mémoire entre les requêtes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        t0 = time.perf_counter()
+        bundle = load_bundle()
+        used_days = load_used_days()
+        load_weather_history()
+        with self._lock:
+            self.bundle = bundle
+            self.used_days = used_days
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - t0
+        print(f"🧠 Modèle chargé : {bundle.get('model_type', 'Unknown')} "
+              f"en {self.load_seconds * 1000:.0f} ms")
+
+    def snapshot(self) -> tuple:
+        """(bundle, compteurs) cohérents, même pendant un /reload concurrent."""
+        with self._lock:
+            return self.bundle, self.used_days
+
+    def info(self) -> dict:
+        with self._lock:
+            bundle, used_days = self.bundle, self.used_days
+            loaded_at, load_seconds = self.loaded_at, self.load_seconds
+        return {
+            "status": "ok",
+            "modelType": bundle.get("model_type", "Unknown"),
+            "modelHash": bundle.get("model_hash"),
+            "registryId": bundle.get("registry_id"),
+            "features": list(bundle["features"]),
+            "usedDays": used_days,
+            "loadedAt": loaded_at,
+            "loadMs": round(load_seconds * 1000, 1),
+        }
+
+    def predict(self, payload: dict) -> list:
+        days = payload.get("days")
+        if days is None:
+            days = [{"date": d} for d in payload.get("dates", [])]
+        if not isinstance(days, list):
+            raise ValueError("'days' doit être une liste")
+        for day in days:
+            check_day(day)
+
+        bundle, used_days = self.snapshot()
+        used_days = {**used_days, **check_used_days(payload.get("usedDays"))}
+        overrides = check_overrides(payload.get("overrides"), bundle["features"])
+
+        # Les jours 'fixed' n'ont pas de sens ici : tout ce qui est demandé est prédit
+        pending = pending_days([{**d, "fixed": False} for d in days])
+        if len(pending) != len(days):
+            raise ValueError("date(s) invalide(s), format attendu AAAA-MM-JJ")
+
+        return predict_days(bundle, pending, used_days, season_start_for(date.today()),
+                            overrides=overrides)
+
+# ======================
+# VALIDATION (ValueError → 400)
+# ======================
+def is_number(value) -> bool:
+    """Nombre JSON fini (ni booléen, ni chaîne, ni entier hors des flottants)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+def check_day(day) -> None:
+    """Refuse un jour mal formé plutôt que d'appliquer une valeur par défaut."""
+    if not isinstance(day, dict):
+        raise ValueError("chaque jour doit être un objet {\"date\": ...}")
+    for field in NUMERIC_FIELDS:
+        if field in day and not is_number(day[field]):
+            raise ValueError(f"{field} doit être un nombre ({day.get('date')} : {day[field]!r})")
+
+def check_used_days(used) -> dict:
+    """Compteurs imposés : couleur connue, entier entre 0 et le quota de la couleur."""
+    if used is None:
+        return {}
+    if not isinstance(used, dict):
+        raise ValueError("'usedDays' doit être un objet {couleur: n}")
+    checked = {}
+    for c, n in used.items():
+        if c not in COLORS:
+            raise ValueError(f"couleur inconnue dans usedDays : {c}")
+        if not is_number(n) or n != int(n) or not 0 <= n <= MAX_DAYS[c]:
+            raise ValueError(f"usedDays.{c} doit être un entier entre 0 et {MAX_DAYS[c]} : {n!r}")
+        checked[c] = int(n)
+    return checked
+
+def check_overrides(overrides, features: list) -> dict:
+    """Surcharges : features du modèle chargé uniquement, valeurs numériques finies."""
+    if overrides is None:
+        return None
+    if not isinstance(overrides, dict):
+        raise ValueError("'overrides' doit être un objet {feature: valeur}")
+    unknown = sorted(k for k in overrides if k not in features)
+    if unknown:
+        raise ValueError(f"feature(s) inconnue(s) dans overrides : {unknown}")
+    for name, value in overrides.items():
+        if not is_number(value):
+            raise ValueError(f"overrides.{name} doit être un nombre : {value!r}")
+    return overrides
+
+# ======================
+# HTTP
+# ======================
+def make_handler(state: PredictorState):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            payload = json.loads(raw or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("le corps JSON doit être un objet")
+            return payload
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, state.info())
+            else:
+                self._send(404, {"error": "route inconnue"})
+
+        def do_POST(self):
+            try:
+                if self.path == "/predict":
+                    payload = self._read_json()
+                    t0 = time.perf_counter()
+                    predictions = state.predict(payload)
+                    self._send(200, {
+                        "predictions": predictions,
+                        "elapsedMs": round((time.perf_counter() - t0) * 1000, 3),
+                    })
+                elif self.path == "/reload":
+                    state.reload()
+                    self._send(200, state.info())
+                else:
+                    self._send(404, {"error": "route inconnue"})
+            except (ValueError, KeyError, TypeError, OverflowError) as e:
+                self._send(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # Pas de log par requête : le benchmark en envoie des milliers
+            pass
+
+    return Handler
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    state = PredictorState()
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    print(f"🛰️ Serveur de prédiction sur http://{host}:{port} (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("👋 Serveur arrêté")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur de prédiction ML Tempo")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+🗃️ Cache des prédictions ML
+Les probabilités brutes du modèle sont mémorisées par empreinte du vecteur
+de features + empreinte du modèle : entre deux exécutions horaires, seules
+les dates dont les features ont changé sont recalculées. Éviction par âge
+(dernière utilisation) puis par taille (LRU).
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_AGE_DAYS = 30
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class PredictionCache:
+    """Cache persistant (JSON) clé = sha256(modèle + features) → probabilités brutes."""
+
+    def __init__(self, path: Path, model_hash: str,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.model_hash = model_hash
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.entries = data.get("entries", {})
+        except Exception as e:
+            print(f"⚠️ Cache prédictions illisible, ignoré : {e}")
+            self.entries = {}
+
+    def key(self, row: np.ndarray, n_outputs: int) -> str:
+        # n_outputs dans la clé : modèle seul (3) et ensemble (n_modèles × 3) ne se
+        # remplacent pas mutuellement
+        row = np.ascontiguousarray(row, dtype=np.float64)
+        prefix = f"{self.model_hash}:{n_outputs}:".encode()
+        return hashlib.sha256(prefix + row.tobytes()).hexdigest()
+
+    def lookup(self, X: np.ndarray, n_outputs: int) -> tuple:
+        """Retourne (probas avec NaN pour les absents, masque des absents, clés)."""
+        keys = [self.key(row, n_outputs) for row in X]
+        P = np.full((len(X), n_outputs), np.nan)
+        missing = np.ones(len(X), dtype=bool)
+        now = time.time()
+
+        for i, k in enumerate(keys):
+            entry = self.entries.get(k)
+            if entry is not None and len(entry["probs"]) == n_outputs:
+                P[i] = entry["probs"]
+                entry["used"] = now
+                missing[i] = False
+
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+        return P, missing, keys
+
+    def store(self, keys: list, P: np.ndarray) -> None:
+        now = time.time()
+        for k, probs in zip(keys, P):
+            self.entries[k] = {"probs": [float(p) for p in probs], "used": now}
+
+    def evict(self) -> None:
+        before = len(self.entries)
+        cutoff = time.time() - self.max_age
+        self.entries = {k: e for k, e in self.entries.items() if e["used"] >= cutoff}
+
+        if len(self.entries) > self.max_entries:
+            recent = sorted(self.entries.items(), key=lambda kv: kv[1]["used"], reverse=True)
+            self.entries = dict(recent[:self.max_entries])
+
+        self.evicted += before - len(self.entries)
+
+    def save(self) -> None:
+        self.evict()
+        self.path.parent.mkdir(exist_ok=True)
+        self.path.write_text(json.dumps({"entries": self.entries}), encoding="utf-8")
+
+    def summary(self) -> str:
+        return (f"🗃️ Cache prédictions : {self.hits} hit(s) / {self.misses} miss "
+                f"| {len(self.entries)} entrées, {self.evicted} évincée(s)")
@@ -0,0 +1,89 @@
+"""
+🧭 Décodage joint de l'horizon sous contrainte de quotas
+Programmation dynamique (type Viterbi) sur l'état (blancs restants,
+rouges restants) : retourne la séquence de couleurs la plus probable sur
+tout l'horizon, qui ne peut jamais dépasser les quotas issus d'api_tempo.json.
+
+L'état est une grille dense (blancs × rouges) traitée d'un bloc par NumPy
+à chaque jour. Les états trop improbables (score < meilleur - beam) sont
+élagués et seuls les pointeurs arrière de la zone encore vivante sont
+conservés : la mémoire reste bornée, même sur des centaines de jours.
+Le quota bleu (300) n'est jamais contraignant sur une saison et n'est pas suivi.
+"""
+import numpy as np
+
+from tempo_rules import BLANC, BLEU, COLORS, MAX_DAYS, ROUGE, allowed_colors, calendar_arrays
+
+DEFAULT_BEAM = 25.0     # en log-probabilité (≈ facteur e^25)
+MIN_PROB = 1e-12        # plancher : un choix autorisé n'est jamais impossible
+
+def _season_segments(dates: list) -> list:
+    """Découpe l'horizon par saison Tempo : les quotas repartent à zéro au 1er septembre."""
+    season = [d.year if d.month >= 9 else d.year - 1 for d in dates]
+    bounds = [0] + [t for t in range(1, len(dates)) if season[t] != season[t - 1]] + [len(dates)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _decode_segment(logp: np.ndarray, start_blanc: int, start_rouge: int,
+                    beam: float) -> np.ndarray:
+    """Viterbi sur un segment d'une seule saison. logp : (T × 3)."""
+    T = len(logp)
+    score = np.full((start_blanc + 1, start_rouge + 1), -np.inf)
+    score[start_blanc, start_rouge] = 0.0
+    backptrs = []
+
+    for t in range(T):
+        # Candidats : rester (bleu), consommer un blanc (b+1 → b), un rouge (r+1 → r)
+        cand = np.full((3,) + score.shape, -np.inf)
+        cand[BLEU] = score + logp[t, BLEU]
+        cand[BLANC, :-1, :] = score[1:, :] + logp[t, BLANC]
+        cand[ROUGE, :, :-1] = score[:, 1:] + logp[t, ROUGE]
+
+        choice = cand.argmax(axis=0).astype(np.int8)
+        score = np.take_along_axis(cand, choice[None].astype(np.intp), axis=0)[0]
+
+        # Élagage : on ne garde que les états proches du meilleur
+        if beam is not None:
+            score[score < score.max() - beam] = -np.inf
+
+        # Pointeurs arrière limités à la boîte englobante des états vivants
+        live_b, live_r = np.nonzero(np.isfinite(score))
+        b0, b1 = live_b.min(), live_b.max() + 1
+        r0, r1 = live_r.min(), live_r.max() + 1
+        backptrs.append((b0, r0, choice[b0:b1, r0:r1].copy()))
+
+    # Remontée depuis le meilleur état final
+    b, r = np.unravel_index(score.argmax(), score.shape)
+    colors = np.empty(T, dtype=np.intp)
+    for t in range(T - 1, -1, -1):
+        b0, r0, box = backptrs[t]
+        c = box[b - b0, r - r0]
+        colors[t] = c
+        if c == BLANC:
+            b += 1
+        elif c == ROUGE:
+            r += 1
+    return colors
+
+def decode_sequence(P, dates: list, used_days: dict, beam: float = DEFAULT_BEAM) -> np.ndarray:
+    """
+    Séquence jointe la plus probable (indices COLORS) pour des jours triés.
+    P : probabilités journalières (T × 3), typiquement après apply_rules.
+    """
+    P = np.asarray(P, dtype=float).reshape(-1, len(COLORS))
+    if len(P) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    weekday, month = calendar_arrays(dates)
+    allowed = allowed_colors(weekday, month)
+    with np.errstate(divide="ignore"):
+        logp = np.where(allowed, np.log(np.maximum(P, MIN_PROB)), -np.inf)
+
+    colors = np.empty(len(P), dtype=np.intp)
+    for i, (start, end) in enumerate(_season_segments(dates)):
+        if i == 0:
+            blanc = max(0, MAX_DAYS["blanc"] - used_days.get("blanc", 0))
+            rouge = max(0, MAX_DAYS["rouge"] - used_days.get("rouge", 0))
+        else:
+            blanc, rouge = MAX_DAYS["blanc"], MAX_DAYS["rouge"]
+        colors[start:end] = _decode_segment(logp[start:end], blanc, rouge, beam)
+    return colors
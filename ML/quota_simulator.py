@@ -0,0 +1,164 @@
+"""
+🎲 Simulation Monte Carlo des quotas Tempo
+Tire des milliers de séquences de couleurs futures à partir des
+probabilités journalières du modèle, en consommant les quotas restants
+(MAX_DAYS 300/43/22) et en respectant les règles EDF (dimanche bleu,
+samedi et hors hiver sans rouge). Vectorisé sur les trajectoires : une
+boucle par jour, chaque itération traite tous les chemins à la fois.
+
+Usage :
+    python ML/quota_simulator.py --paths 100000
+    python ML/quota_simulator.py --days-file ML/ml_season_forecast.json
+
+--days-file : liste de jours (tempo.json, ml_predictions.json) ou objet
+{"days": [...]} (ml_season_forecast.json).
+"""
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from tempo_rules import BLEU, COLORS, MAX_DAYS, allowed_colors, calendar_arrays
+
+DEFAULT_PATHS = 100_000
+
+# ======================
+# SIMULATION
+# ======================
+def simulate(P, dates: list, used_days: dict, n_paths: int = DEFAULT_PATHS,
+             seed: int = None) -> dict:
+    """
+    P : probabilités journalières (T × 3, ordre COLORS) pour `dates`, triées.
+    Retourne les marginales par jour après contrainte de quotas et les
+    quotas restants en fin d'horizon pour chaque trajectoire. Les quotas
+    repartent de MAX_DAYS si l'horizon change de saison (1er septembre).
+    """
+    P = np.asarray(P, dtype=float).reshape(-1, len(COLORS))
+    rng = np.random.default_rng(seed)
+    weekday, month = calendar_arrays(dates)
+    allowed = allowed_colors(weekday, month)
+
+    full = np.asarray([MAX_DAYS[c] for c in COLORS], dtype=np.int16)
+    start = [max(0, MAX_DAYS[c] - used_days.get(c, 0)) for c in COLORS]
+    remaining = np.tile(np.asarray(start, dtype=np.int16), (n_paths, 1))
+    rows = np.arange(n_paths)
+    marginals = np.zeros_like(P)
+
+    # Année de saison Tempo (1er septembre → 31 août) de chaque jour
+    season = [d.year if d.month >= 9 else d.year - 1 for d in dates]
+
+    for t in range(len(P)):
+        if t > 0 and season[t] != season[t - 1]:
+            remaining[:] = full
+
+        # Couleurs possibles ce jour-là sur chaque trajectoire (règles + quota)
+        q = P[t] * (allowed[t] & (remaining > 0))
+        total = q.sum(axis=1)
+
+        # Plus aucune couleur autorisée avec une proba > 0 → bleu par défaut
+        empty = total <= 0
+        q[empty] = 0.0
+        q[empty, BLEU] = 1.0
+        total[empty] = 1.0
+
+        cum = np.cumsum(q, axis=1) / total[:, None]
+        # Pas de masse au-delà de k → seuil exactement 1 (évite les arrondis)
+        rest = q[:, :0:-1].cumsum(axis=1)[:, ::-1]
+        cum[:, :-1][rest <= 0] = 1.0
+
+        u = rng.random(n_paths)
+        color = (u >= cum[:, 0]).astype(np.intp) + (u >= cum[:, 1])
+
+        remaining[rows, color] -= 1
+        np.maximum(remaining, 0, out=remaining)
+        marginals[t] = np.bincount(color, minlength=len(COLORS)) / n_paths
+
+    return {"marginals": marginals, "remaining": remaining}
+
+def summarize_remaining(remaining: np.ndarray) -> dict:
+    summary = {}
+    for i, c in enumerate(COLORS):
+        values = remaining[:, i].astype(int)
+        counts = np.bincount(values)
+        summary[c] = {
+            "mean": round(float(values.mean()), 2),
+            "p5": int(np.percentile(values, 5)),
+            "p50": int(np.percentile(values, 50)),
+            "p95": int(np.percentile(values, 95)),
+            "exhausted": round(float((values == 0).mean()), 4),
+            "distribution": {int(n): round(k / len(values), 4)
+                             for n, k in enumerate(counts) if k},
+        }
+    return summary
+
+def load_days(path: Path) -> list:
+    """Jours à simuler : liste (tempo.json) ou objet de sortie {"days": [...]}."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("days")
+    if not isinstance(data, list):
+        raise SystemExit(f"❌ {path} : liste de jours ou objet {{\"days\": [...]}} attendu")
+    return data
+
+# ======================
+# MAIN
+# ======================
+def main():
+    from predict_ml import (
+        BASE_DIR, TEMPO_PATH, load_bundle, load_used_days, pending_days,
+        predict_matrix, season_start_for
+    )
+
+    parser = argparse.ArgumentParser(description="Simulation Monte Carlo des quotas Tempo")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--days-file", type=Path, default=TEMPO_PATH,
+                        help="jours à simuler (tempo.json par défaut, ou sortie {\"days\": [...]})")
+    parser.add_argument("--output", type=Path,
+                        default=BASE_DIR / "ML" / "ml_quota_simulation.json")
+    args = parser.parse_args()
+
+    print(f"🎲 Simulation Monte Carlo des quotas ({args.paths:,} trajectoires)")
+
+    if not args.days_file.exists():
+        raise SystemExit(f"❌ {args.days_file} introuvable")
+
+    bundle = load_bundle()
+    used_days = load_used_days()
+    days = load_days(args.days_file)
+    pending = sorted(pending_days(days), key=lambda p: p[1])
+
+    P = predict_matrix(bundle, pending, used_days, season_start_for(date.today()))
+
+    t0 = time.perf_counter()
+    result = simulate(P, [d for _, d in pending], used_days, args.paths, args.seed)
+    elapsed = time.perf_counter() - t0
+
+    summary = summarize_remaining(result["remaining"])
+    output = {
+        "paths": args.paths,
+        "usedDays": used_days,
+        "remaining": summary,
+        "days": [{
+            "date": day["date"],
+            "marginals": {c: round(float(result["marginals"][t, i]) * 100, 1)
+                          for i, c in enumerate(COLORS)},
+        } for t, (day, _) in enumerate(pending)],
+    }
+
+    args.output.parent.mkdir(exist_ok=True)
+    args.output.write_text(json.dumps(output, indent=2), encoding="utf-8")
+
+    print(f"⏱️ {len(pending)} jours × {args.paths:,} trajectoires en {elapsed:.2f} s")
+    for c in ("blanc", "rouge"):
+        s = summary[c]
+        print(f"   {c} restants en fin d'horizon : moyenne {s['mean']} "
+              f"(p5={s['p5']} p50={s['p50']} p95={s['p95']}) | épuisé {s['exhausted']:.1%}")
+    print(f"💾 Sauvegardé : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+⏱️ Instrumentation des étapes d'un script ML
+Chronomètre « à tours » : chaque appel à mark(nom, ...) clôt l'étape
+commencée au mark précédent et note son temps réel, son temps CPU (processus
+principal), le pic mémoire Python (tracemalloc) de l'étape, le pic RSS du
+processus et les compteurs fournis (lignes, features...).
+Le relevé est écrit en JSON avec un historique court (évolution du coût
+d'entraînement avec la taille du dataset, ralentissements en CI).
+"""
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:     # Windows : pas de getrusage
+    resource = None
+
+HISTORY_MAX = 100
+MB = 1024 * 1024
+
+def peak_rss_mb():
+    """Pic RSS du processus depuis son démarrage (Mo), None si indisponible."""
+    if resource is None:
+        return None
+    # ru_maxrss : kilo-octets sous Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+class StageProfiler:
+    """Relevés par étape ; tracemalloc (trace_memory) double environ la durée d'un fit sklearn."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.stages = []
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self._wall0 = self._wall = time.perf_counter()
+        self._cpu0 = self._cpu = time.process_time()
+
+    def mark(self, name: str, **counts) -> dict:
+        """Clôt l'étape `name` (depuis le mark précédent) et la retourne."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        stage = {
+            "name": name,
+            "wallSeconds": round(wall - self._wall, 3),
+            "cpuSeconds": round(cpu - self._cpu, 3),
+            "tracemallocPeakMb": None,
+            "peakRssMb": peak_rss_mb(),
+            **counts,
+        }
+        if self.trace_memory:
+            stage["tracemallocPeakMb"] = round(tracemalloc.get_traced_memory()[1] / MB, 1)
+            tracemalloc.reset_peak()
+        self.stages.append(stage)
+        self._wall, self._cpu = wall, cpu
+        return stage
+
+    def record(self, **meta) -> dict:
+        return {
+            "startedAt": self.started_at,
+            **meta,
+            "wallSeconds": round(self._wall - self._wall0, 3),
+            "cpuSeconds": round(self._cpu - self._cpu0, 3),
+            "peakRssMb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def print_summary(self) -> None:
+        print("\n⏱️ Étapes :")
+        print(f"   {'étape':<10} {'réel (s)':>9} {'CPU (s)':>8} {'pic py (Mo)':>12} {'RSS (Mo)':>9}")
+        for s in self.stages:
+            traced = "-" if s["tracemallocPeakMb"] is None else f"{s['tracemallocPeakMb']:.1f}"
+            rss = "-" if s["peakRssMb"] is None else f"{s['peakRssMb']:.0f}"
+            print(f"   {s['name']:<10} {s['wallSeconds']:>9.2f} {s['cpuSeconds']:>8.2f} "
+                  f"{traced:>12} {rss:>9}")
+
+    def save(self, path: Path, **meta) -> dict:
+        """Écrit {latest, history} ; history garde un résumé des HISTORY_MAX derniers relevés."""
+        record = self.record(**meta)
+        history = []
+        if path.exists():
+            try:
+                history = json.loads(path.read_text(encoding="utf-8")).get("history", [])
+            except (OSError, ValueError):
+                history = []
+        summary = {k: v for k, v in record.items() if k != "stages"}
+        summary["stageSeconds"] = {s["name"]: s["wallSeconds"] for s in self.stages}
+        history = (history + [summary])[-HISTORY_MAX:]
+        path.write_text(json.dumps({"latest": record, "history": history}, indent=2),
+                        encoding="utf-8")
+        return record
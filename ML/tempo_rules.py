@@ -0,0 +1,164 @@
+"""
+📋 Règles EDF Tempo - moteur vectorisé
+Règles EDF absolues et post-processing des prédictions appliqués en une
+passe sur un tableau de probabilités (N × 3, ordre COLORS) à l'aide de
+masques booléens : des milliers de dates ou de scénarios d'un coup.
+"""
+import numpy as np
+
+COLORS = ["bleu", "blanc", "rouge"]
+BLEU, BLANC, ROUGE = 0, 1, 2
+
+MAX_DAYS = {"bleu": 300, "blanc": 43, "rouge": 22}
+
+WINTER_MONTHS = (11, 12, 1, 2, 3)
+PEAK_WINTER_MONTHS = (1, 2)
+
+PROB_CAP = 0.92
+
+# Repli quand toutes les probabilités sont nulles
+FALLBACK_WINTER = (0.4, 0.35, 0.25)
+FALLBACK_SUMMER = (0.85, 0.12, 0.03)
+
+# ======================
+# CALENDRIER
+# ======================
+def calendar_arrays(dates) -> tuple:
+    """(weekday, month) en tableaux entiers à partir d'une séquence de dates."""
+    weekday = np.fromiter((d.weekday() for d in dates), dtype=np.int8, count=len(dates))
+    month = np.fromiter((d.month for d in dates), dtype=np.int8, count=len(dates))
+    return weekday, month
+
+def is_winter(month) -> np.ndarray:
+    return np.isin(month, WINTER_MONTHS)
+
+def is_peak_winter(month) -> np.ndarray:
+    return np.isin(month, PEAK_WINTER_MONTHS)
+
+# ======================
+# CONTRAINTES EDF
+# ======================
+def rouge_allowed(weekday, month) -> np.ndarray:
+    """Rouge uniquement en hiver (nov → mars) et jamais le samedi."""
+    return is_winter(month) & (np.asarray(weekday) != 5)
+
+def allowed_colors(weekday, month) -> np.ndarray:
+    """Masque (N × 3) des couleurs autorisées : dimanche toujours bleu,
+    samedi et hors hiver jamais rouge."""
+    weekday = np.asarray(weekday)
+    sunday = weekday == 6
+    mask = np.ones((len(weekday), len(COLORS)), dtype=bool)
+    mask[:, BLANC] = ~sunday
+    mask[:, ROUGE] = rouge_allowed(weekday, month) & ~sunday
+    return mask
+
+# ======================
+# POST-PROCESSING
+# ======================
+def _remove_rouge(P: np.ndarray, mask: np.ndarray, fallback: bool) -> None:
+    """Retire la proba rouge et la redistribue entre bleu et blanc au prorata."""
+    removed = P[mask, ROUGE]
+    bleu, blanc = P[mask, BLEU], P[mask, BLANC]
+    base = bleu + blanc
+    ok = base > 0
+    ratio = np.divide(bleu, base, out=np.zeros_like(base), where=ok)
+
+    new_bleu = np.where(ok, bleu + removed * ratio, 0.7 if fallback else bleu)
+    new_blanc = np.where(ok, blanc + removed * (1 - ratio), 0.3 if fallback else blanc)
+
+    P[mask, BLEU] = new_bleu
+    P[mask, BLANC] = new_blanc
+    P[mask, ROUGE] = 0.0
+
+def _row_total(P: np.ndarray) -> np.ndarray:
+    # Somme explicite bleu + blanc + rouge (même ordre que la version dict)
+    return P[:, BLEU] + P[:, BLANC] + P[:, ROUGE]
+
+def apply_rules(probs, weekday, month, temp) -> np.ndarray:
+    """
+    Applique les règles EDF et les ajustements hivernaux sur (N × 3).
+    Retourne un nouveau tableau normalisé, plafonné à PROB_CAP hors dimanche.
+    """
+    P = np.array(probs, dtype=float, copy=True).reshape(-1, len(COLORS))
+    weekday = np.asarray(weekday)
+    temp = np.asarray(temp, dtype=float)
+
+    sunday = weekday == 6
+    saturday = weekday == 5
+    winter = is_winter(month)
+    peak = is_peak_winter(month)
+
+    # ======================
+    # 🔒 RÈGLES EDF ABSOLUES
+    # ======================
+    # Dimanche : TOUJOURS bleu
+    P[sunday] = (1.0, 0.0, 0.0)
+    # Samedi : JAMAIS rouge (repli 70/30 si bleu + blanc nul)
+    _remove_rouge(P, saturday, fallback=True)
+    # Rouge interdit hors hiver
+    _remove_rouge(P, ~sunday & ~saturday & ~winter, fallback=False)
+
+    # ======================
+    # 🔥 AJUSTEMENT HIVERNAL (semaine uniquement)
+    # ======================
+    weekday_winter = winter & (weekday < 5)
+
+    damp = weekday_winter & peak & (P[:, BLEU] > 0.7)
+    excess = (P[damp, BLEU] - 0.55) * 0.3
+    P[damp, BLEU] -= excess
+    P[damp, BLANC] += excess * 0.6
+    P[damp, ROUGE] += excess * 0.4
+
+    cold = weekday_winter & (temp < 0)
+    P[cold, ROUGE] = np.minimum(0.5, P[cold, ROUGE] * 1.3)
+    P[cold, BLEU] *= 0.85
+
+    cool = weekday_winter & ~(temp < 0) & (temp < 5) & peak
+    P[cool, BLANC] = np.minimum(0.5, P[cool, BLANC] * 1.15)
+    P[cool, BLEU] *= 0.9
+
+    # ======================
+    # NORMALISATION
+    # ======================
+    total = _row_total(P)
+    positive = total > 0
+    P[positive] /= total[positive, None]
+    P[~positive & winter] = FALLBACK_WINTER
+    P[~positive & ~winter] = FALLBACK_SUMMER
+
+    # ======================
+    # PLAFONNEMENT (pas de 100% sauf dimanche)
+    # ======================
+    top = P.argmax(axis=1)
+    capped = ~sunday & (P.max(axis=1) > PROB_CAP)
+    if capped.any():
+        rows = np.flatnonzero(capped)
+        top_c = top[rows]
+        others = np.ones((len(rows), len(COLORS)), dtype=bool)
+        others[np.arange(len(rows)), top_c] = False
+
+        sub = P[rows]
+        sub[np.arange(len(rows)), top_c] = PROB_CAP
+        other_vals = sub[others].reshape(len(rows), len(COLORS) - 1)
+        others_total = other_vals[:, 0] + other_vals[:, 1]
+        surplus = 1.0 - PROB_CAP - others_total
+
+        spread = others_total > 0
+        share = np.divide(other_vals, others_total[:, None],
+                          out=np.zeros_like(other_vals), where=spread[:, None])
+        other_vals = np.where(spread[:, None],
+                              other_vals + surplus[:, None] * share,
+                              (1.0 - PROB_CAP) / (len(COLORS) - 1))
+        sub[others] = other_vals.ravel()
+        P[rows] = sub
+
+    # Re-normaliser après plafonnement
+    total = _row_total(P)
+    renorm = (total > 0) & (np.abs(total - 1.0) > 0.01)
+    P[renorm] /= total[renorm, None]
+
+    return P
+
+def decide(P: np.ndarray) -> np.ndarray:
+    """Indice de la couleur la plus probable (premier maximum, ordre COLORS)."""
+    return P.argmax(axis=1)
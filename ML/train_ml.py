@@ -2,222 +2,805 @@
 🌲 Entraînement ML Tempo - CORRIGÉ
 GradientBoosting avec les 3 couleurs (bleu, blanc, rouge)
 et poids de classe adaptés à la saisonnalité.
+Moteur au choix (--engine) : "gb" (GradientBoostingClassifier, défaut) ou
+"hgb" (HistGradientBoostingClassifier : features binnées, multi-cœurs).
+Option --bootstrap B : B répliques entraînées en parallèle sur des
+rééchantillonnages stratifiés, empilées avec le modèle principal dans le
+modèle compilé (incertitude des probabilités en prédiction).
+Validation croisée temporelle par saison Tempo (entraînement sur les saisons
+passées, test sur la suivante), folds en parallèle, poids de classe inclus.
+Option --tuned : hyperparamètres issus de tune_ml.py (sinon constantes ci-dessous).
+Option --incremental : reprend le bundle précédent et ajoute quelques arbres
+(warm_start) sur le dataset complété des nouveaux jours ; réentraînement
+complet automatique si le modèle est trop ancien, a trop grossi ou dérive.
+Registre (model_registry.py) : si dataset, features, hyperparamètres et mode
+(complet, ou incrémental depuis le même modèle parent) sont identiques à une
+entrée existante, elle est réactivée sans réentraînement (--force pour
+réentraîner quand même).
+Option --early-stopping : arrêt du boosting quand le score sur une fraction
+de validation ne progresse plus. Option --prune [tolérance] : coupe les
+dernières étapes tant que l'accuracy de validation croisée reste dans la
+tolérance et la log-loss CV (probabilités publiées) aussi, sans descendre
+sous PRUNE_MIN_STAGES étapes. Nombre d'arbres, taille et temps de chargement notés dans le bundle.
+Option --farm [familles] : ferme de modèles (model_farm.py), plusieurs
+familles entraînées en parallèle et combinées dans ML/ml_ensemble.pkl ;
+le modèle de production n'est pas modifié.
+Chaque étape (chargement, features, fit, validation, rapport, sauvegarde,
+export) est mesurée — temps réel et CPU, pic mémoire, lignes / features —
+et consignée dans ML/ml_training_stats.json (voir stage_profiler.py) ;
+--tracemalloc ajoute le pic mémoire Python par étape.
 """
+import argparse
 import json
+import time
+from datetime import date
+import numpy as np
 import pandas as pd
 import joblib
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import log_loss
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import cross_val_score
+from joblib import Parallel, delayed
 from pathlib import Path
 from collections import Counter
 
+from compiled_model import (
+    export_model, load_compiled, load_mapped, mapped_current, mapped_path, save_compiled,
+    save_mapped, select_models, stack_forests
+)
+from dataset_store import load_columns
+from features import (
+    DEFAULT_CONSUMPTION, DEFAULT_TEMP, FEATURES, WEATHER_FEATURES, compute_features, fill_weather
+)
+from model_farm import CANDIDATES, print_report, save_farm, train_farm
+from model_registry import ModelRegistry, training_key
+from prediction_cache import file_sha256
+from stage_profiler import StageProfiler
+from tempo_rules import COLORS, MAX_DAYS
+
 # ======================
 # PATHS
 # ======================
-DATASET_PATH = Path("ML/ml_dataset.json")
+DATASET_PATH = Path("ML/ml_dataset.npz")
 MODEL_PATH   = Path("ML/ml_model.pkl")
+COMPILED_PATH = Path("ML/ml_model_compiled.npz")
+TUNING_PATH  = Path("ML/ml_tuning_state.json")
+STATS_PATH   = Path("ML/ml_training_stats.json")
+
+# ======================
+# MOTEURS
+# ======================
+GB_PARAMS = dict(
+    n_estimators=300,
+    max_depth=5,
+    learning_rate=0.08,
+    min_samples_leaf=8,
+    subsample=0.85,
+    random_state=42
+)
+
+# Mêmes ordres de grandeur que GB_PARAMS (pas de subsample en HGB)
+HGB_PARAMS = dict(
+    max_iter=300,
+    max_depth=5,
+    learning_rate=0.08,
+    min_samples_leaf=8,
+    early_stopping=False,
+    random_state=42
+)
+
+ENGINES = {
+    "gb": ("GradientBoosting", GradientBoostingClassifier, GB_PARAMS),
+    "hgb": ("HistGradientBoosting", HistGradientBoostingClassifier, HGB_PARAMS),
+}
+
+# Paramètre qui fixe le nombre d'arbres (budget de tune_ml)
+N_ESTIMATORS_PARAM = {"gb": "n_estimators", "hgb": "max_iter"}
+
+CV_SPLITS = 5       # saisons de test (les plus récentes)
+
+# Arrêt précoce (--early-stopping) : validation interne de sklearn
+EARLY_STOPPING_ROUNDS = 10
+VALIDATION_FRACTION = 0.1
+EARLY_STOPPING = {
+    "gb": dict(n_iter_no_change=EARLY_STOPPING_ROUNDS, validation_fraction=VALIDATION_FRACTION),
+    "hgb": dict(early_stopping=True, n_iter_no_change=EARLY_STOPPING_ROUNDS,
+                validation_fraction=VALIDATION_FRACTION),
+}
+
+# Élagage (--prune) : perte d'accuracy CV tolérée en coupant les dernières étapes ;
+# la log-loss CV (calibration des probabilités publiées) doit aussi rester à
+# PRUNE_LOSS_TOLERANCE du modèle complet, et au moins PRUNE_MIN_STAGES étapes
+PRUNE_TOLERANCE = 0.005
+PRUNE_LOSS_TOLERANCE = 0.01
+PRUNE_MIN_STAGES = 20
+
+# Entraînement incrémental (warm_start)
+INCREMENTAL_STAGES = 10     # arbres ajoutés par mise à jour
+MAX_MODEL_AGE_DAYS = 7      # au-delà : réentraînement complet
+MAX_EXTRA_STAGES = 100      # arbres ajoutés depuis le dernier entraînement complet
+DRIFT_TOLERANCE = 0.10      # baisse d'accuracy tolérée sur les jours récents
+DRIFT_MIN_DAYS = 7          # jours nouveaux évalués avant de juger la dérive
+DRIFT_WINDOW = 30
+
+# Colonnes lues dans le dataset colonnaire : cible + entrées du pipeline de
+# features (features.py), noms historiques temperature / rteConsommation inclus
+DATASET_COLUMNS = [
+    "date", "color", "temp", "temperature", "rte", "rteConsommation",
+    "remainingBleu", "remainingBlanc", "remainingRouge", "horizon", *WEATHER_FEATURES,
+]
 
-print("🌲 Entraînement ML Tempo (GradientBoosting - 3 couleurs)")
+def model_params(engine: str, overrides: dict = None) -> dict:
+    """Hyperparamètres effectifs : constantes du moteur + surcharges éventuelles."""
+    return {**ENGINES[engine][2], **(overrides or {})}
+
+def make_model(engine: str, random_state: int = None, params: dict = None):
+    """Nouveau classifieur non entraîné pour le moteur demandé."""
+    _, cls, _ = ENGINES[engine]
+    params = model_params(engine, params)
+    if random_state is not None:
+        params["random_state"] = random_state
+    return cls(**params)
+
+def fitted_stages(model) -> int:
+    """Étapes de boosting réellement entraînées (après arrêt précoce éventuel)."""
+    if hasattr(model, "n_estimators_"):
+        return int(model.n_estimators_)
+    return int(model.n_iter_)
+
+def truncate_stages(model, n_stages: int):
+    """Ne garde que les n_stages premières étapes (modèle équivalent à un fit plus court)."""
+    if hasattr(model, "estimators_"):
+        model.estimators_ = model.estimators_[:n_stages]
+        model.train_score_ = model.train_score_[:n_stages]
+        if hasattr(model, "oob_improvement_"):
+            model.oob_improvement_ = model.oob_improvement_[:n_stages]
+            model.oob_scores_ = model.oob_scores_[:n_stages]
+        model.n_estimators_ = n_stages
+        model.set_params(n_estimators=n_stages)
+    else:
+        # Scores HGB : une valeur initiale + une par étape
+        model._predictors = model._predictors[:n_stages]
+        model.train_score_ = model.train_score_[:n_stages + 1]
+        model.validation_score_ = model.validation_score_[:n_stages + 1]
+        model.set_params(max_iter=n_stages)
+    return model
+
+def load_tuned_params(path: Path, engine: str) -> tuple:
+    """Meilleure configuration trouvée par tune_ml.py → (surcharges, métadonnées).
+    Sans configuration utilisable (recherche interrompue, autre moteur) :
+    constantes du moteur, ({}, None)."""
+    if not path.exists():
+        raise SystemExit(f"❌ Résultats de tuning introuvables : {path}")
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        state = {}
+    best = state.get("best") if isinstance(state, dict) else None
+    if not isinstance(best, dict) or "params" not in best or "nEstimators" not in best \
+            or state.get("engine") != engine:
+        print(f"⚠️ Pas de configuration optimisée pour le moteur {engine} dans {path} : "
+              f"hyperparamètres par défaut")
+        return {}, None
+    params = {**best["params"], N_ESTIMATORS_PARAM[engine]: best["nEstimators"]}
+    return params, best
 
 # ======================
 # LOAD DATASET
 # ======================
-if not DATASET_PATH.exists():
-    raise SystemExit("❌ Dataset ML introuvable")
+def load_dataset(path: Path = DATASET_PATH, columns: list = DATASET_COLUMNS) -> pd.DataFrame:
+    """Dataset colonnaire (.npz, colonnes projetées) ou export JSON de débogage."""
+    if not path.exists():
+        raise SystemExit("❌ Dataset ML introuvable")
 
-df = pd.read_json(DATASET_PATH)
+    if path.suffix == ".json":
+        df = pd.read_json(path)
+    else:
+        df = load_columns(path, columns)
 
-print(f"📊 Échantillons disponibles : {len(df)}")
+    print(f"📊 Échantillons disponibles : {len(df)}")
 
-if len(df) < 200:
-    raise SystemExit("❌ Dataset insuffisant pour entraîner un modèle fiable")
+    if len(df) < 200:
+        raise SystemExit("❌ Dataset insuffisant pour entraîner un modèle fiable")
+    return df
 
 # ======================
 # ANALYSE DISTRIBUTION
 # ======================
-color_counts = df["color"].value_counts()
-print("\n📈 Distribution des couleurs :")
-for color, count in color_counts.items():
-    pct = count / len(df) * 100
-    print(f"   {color}: {count} ({pct:.1f}%)")
-
-# Vérification critique
-if "bleu" not in color_counts.index:
-    raise SystemExit("❌ ERREUR : Pas de jours bleu dans le dataset ! "
-                     "Exécutez build_history_from_tempo_api.py d'abord.")
-
-# Distribution par mois hivernal
-print("\n📅 Distribution par mois hivernal :")
-df["_month"] = pd.to_datetime(df["date"]).dt.month
-for month in [11, 12, 1, 2, 3]:
-    month_df = df[df["_month"] == month]
-    if len(month_df) > 0:
-        dist = month_df["color"].value_counts(normalize=True) * 100
-        print(f"   Mois {month:02d}: "
-              f"bleu={dist.get('bleu', 0):.0f}% "
-              f"blanc={dist.get('blanc', 0):.0f}% "
-              f"rouge={dist.get('rouge', 0):.0f}%")
+def print_distribution(df: pd.DataFrame) -> None:
+    color_counts = df["color"].value_counts()
+    print("\n📈 Distribution des couleurs :")
+    for color, count in color_counts.items():
+        pct = count / len(df) * 100
+        print(f"   {color}: {count} ({pct:.1f}%)")
+
+    # Vérification critique
+    if "bleu" not in color_counts.index:
+        raise SystemExit("❌ ERREUR : Pas de jours bleu dans le dataset ! "
+                         "Exécutez build_history_from_tempo_api.py d'abord.")
+
+    # Distribution par mois hivernal
+    print("\n📅 Distribution par mois hivernal :")
+    months = pd.to_datetime(df["date"]).dt.month
+    for month in [11, 12, 1, 2, 3]:
+        month_df = df[months == month]
+        if len(month_df) > 0:
+            dist = month_df["color"].value_counts(normalize=True) * 100
+            print(f"   Mois {month:02d}: "
+                  f"bleu={dist.get('bleu', 0):.0f}% "
+                  f"blanc={dist.get('blanc', 0):.0f}% "
+                  f"rouge={dist.get('rouge', 0):.0f}%")
 
 # ======================
 # FEATURE ENGINEERING
 # ======================
-df["date"] = pd.to_datetime(df["date"], errors="coerce")
-df = df.dropna(subset=["date"])
-
-df["weekday"] = df["date"].dt.weekday
-df["month"]   = df["date"].dt.month
-df["day_of_month"] = df["date"].dt.day
-
-if "temperature" in df.columns and "temp" not in df.columns:
-    df["temp"] = df["temperature"]
-if "rteConsommation" in df.columns and "rte" not in df.columns:
-    df["rte"] = df["rteConsommation"]
-
-if "horizon" not in df.columns:
-    df["horizon"] = 0
-if "winterBleuRemaining" not in df.columns:
-    df["winterBleuRemaining"] = df.get("remainingBleu", pd.Series([300]*len(df)))
-if "isWinter" not in df.columns:
-    df["isWinter"] = df["month"].isin([11, 12, 1, 2, 3]).astype(int)
-if "isWeekend" not in df.columns:
-    df["isWeekend"] = df["weekday"].isin([5, 6]).astype(int)
-
-# Catégorie de température
-df["temp_cat"] = pd.cut(
-    df["temp"].fillna(10), 
-    bins=[-50, -5, 0, 5, 10, 15, 50],
-    labels=[0, 1, 2, 3, 4, 5]
-).astype(int)
-
-# Intensité hivernale
-df["winter_intensity"] = df["month"].map({
-    11: 2, 12: 3, 1: 4, 2: 4, 3: 2
-}).fillna(0).astype(int)
-
-# Pression quotas
-if "remainingBlanc" in df.columns and "remainingRouge" in df.columns:
-    df["quota_pressure"] = (
-        (43 - df["remainingBlanc"]) / 43 * 0.5 +
-        (22 - df["remainingRouge"]) / 22 * 0.5
-    ).clip(0, 1)
-else:
-    df["quota_pressure"] = 0.0
-
-# ======================
-# FEATURES OPTIMISÉES
-# ======================
-FEATURES = [
-    "temp", "temp_cat", "coldDays",
-    "rte",
-    "weekday", "month", "day_of_month",
-    "isWeekend", "isWinter", "winter_intensity",
-    "remainingBlanc", "remainingRouge", "winterBleuRemaining",
-    "seasonDayIndex", "quota_pressure",
-    "horizon"
-]
-
-available_features = [f for f in FEATURES if f in df.columns]
-missing = [f for f in FEATURES if f not in df.columns]
-if missing:
-    print(f"⚠️ Features manquantes : {missing}")
-
-FEATURES = available_features
-print(f"\n✅ Features utilisées ({len(FEATURES)}) : {FEATURES}")
-
-df[FEATURES] = df[FEATURES].fillna(0)
-X = df[FEATURES]
-y = df["color"]
+def input_column(df: pd.DataFrame, names: tuple, default: float) -> np.ndarray:
+    """Première colonne présente parmi `names`, valeurs manquantes → default."""
+    for name in names:
+        if name in df.columns:
+            return df[name].fillna(default).to_numpy(dtype=float)
+    return np.full(len(df), float(default))
+
+def engineer_features(df: pd.DataFrame) -> tuple:
+    """Features du pipeline partagé (features.py) ; retourne (df, FEATURES)."""
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df.dropna(subset=["date"])
+
+    remaining = np.stack([input_column(df, (f"remaining{c.capitalize()}",), MAX_DAYS[c])
+                          for c in COLORS], axis=1)
+    temp = input_column(df, ("temp", "temperature"), DEFAULT_TEMP)
+    # Météo glissante calculée au build (historique complet) ; absente → déduite de temp
+    weather = {name: input_column(df, (name,), np.nan) for name in WEATHER_FEATURES}
+    columns = compute_features(
+        dates=df["date"].to_numpy().astype("datetime64[D]"),
+        temp=temp,
+        rte=input_column(df, ("rte", "rteConsommation"), DEFAULT_CONSUMPTION),
+        remaining=remaining,
+        horizon=input_column(df, ("horizon",), 0),
+        weather=fill_weather(weather, temp),
+    )
+    for name in FEATURES:
+        df[name] = columns[name]
+    return df, list(FEATURES)
 
 # ======================
-# LABEL ENCODER
+# CLASS WEIGHTS
 # ======================
-le = LabelEncoder()
-y_enc = le.fit_transform(y)
-classes = list(le.classes_)
-print(f"🏷️ Classes : {classes}")
+def compute_class_weights(y, classes: list) -> dict:
+    freq = Counter(y)
+    total = sum(freq.values())
+
+    # Poids inversement proportionnels à la fréquence
+    # Blanc/rouge sont rares mais CRITIQUES à bien prédire
+    weights = {}
+    for c in classes:
+        base_w = total / (len(classes) * freq.get(c, 1))
+        # Bonus pour blanc et rouge (plus important à détecter)
+        if c == "rouge":
+            weights[c] = max(base_w * 1.5, 3.0)
+        elif c == "blanc":
+            weights[c] = max(base_w * 1.3, 2.0)
+        else:
+            weights[c] = max(base_w, 1.0)
+    return weights
 
 # ======================
-# CLASS WEIGHTS
+# VALIDATION CROISÉE PAR SAISON
 # ======================
-freq = Counter(y)
-total = sum(freq.values())
-
-# Poids inversement proportionnels à la fréquence
-# Blanc/rouge sont rares mais CRITIQUES à bien prédire
-BASE_WEIGHTS = {}
-for c in classes:
-    base_w = total / (len(classes) * freq.get(c, 1))
-    # Bonus pour blanc et rouge (plus important à détecter)
-    if c == "rouge":
-        BASE_WEIGHTS[c] = max(base_w * 1.5, 3.0)
-    elif c == "blanc":
-        BASE_WEIGHTS[c] = max(base_w * 1.3, 2.0)
-    else:
-        BASE_WEIGHTS[c] = max(base_w, 1.0)
-
-print(f"⚖️ Poids : {BASE_WEIGHTS}")
-
-sample_weights = [BASE_WEIGHTS[label] for label in y]
+def season_folds(dates: pd.Series, n_splits: int = CV_SPLITS) -> list:
+    """
+    Folds à fenêtre croissante : test = une saison Tempo (1er sept. → 31 août),
+    entraînement = toutes les saisons précédentes. Aucune donnée future dans
+    l'entraînement. Retourne [(saison, idx_train, idx_test), ...].
+    """
+    dates = pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+    season = np.where(dates.dt.month >= 9, dates.dt.year, dates.dt.year - 1)
+    seasons = np.unique(season)
+    # Au moins une saison d'entraînement avant la première saison de test
+    tested = seasons[1:][-n_splits:]
+    return [(int(s), np.flatnonzero(season < s), np.flatnonzero(season == s)) for s in tested]
+
+def fit_fold(engine: str, X: np.ndarray, y: np.ndarray, w: np.ndarray,
+             train_idx: np.ndarray, test_idx: np.ndarray, params: dict = None) -> dict:
+    """
+    Entraîne sur un fold (avec les poids de classe) et score la saison de test
+    après chaque étape de boosting : accuracy brute, accuracy pondérée par les
+    poids de classe (qui ne récompense pas le « tout bleu ») et log-loss
+    (probabilités publiées) — critères d'élagage.
+    """
+    t0 = time.perf_counter()
+    model = make_model(engine, params=params)
+    model.fit(X[train_idx], y[train_idx], sample_weight=w[train_idx])
+    fit_s = time.perf_counter() - t0
+    staged, staged_weighted, staged_loss = [], [], []
+    for proba in model.staged_predict_proba(X[test_idx]):
+        hits = model.classes_[proba.argmax(axis=1)] == y[test_idx]
+        staged.append(float(hits.mean()))
+        staged_weighted.append(float(np.average(hits, weights=w[test_idx])))
+        staged_loss.append(float(log_loss(y[test_idx], proba, labels=model.classes_)))
+    return {"accuracy": staged[-1], "stages": len(staged),
+            "staged": staged, "stagedWeighted": staged_weighted, "stagedLogLoss": staged_loss,
+            "fitSeconds": fit_s, "seconds": time.perf_counter() - t0}
+
+def season_cv(engine: str, X: np.ndarray, y: np.ndarray, w: np.ndarray, dates,
+              n_splits: int = CV_SPLITS, n_jobs: int = -1, params: dict = None) -> tuple:
+    """Folds en parallèle ; retourne (résultats par fold, durée totale en secondes)."""
+    folds = season_folds(dates, n_splits)
+    X = np.asarray(X, dtype=np.float64)
+    w = np.asarray(w, dtype=np.float64)
+
+    t0 = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(engine, X, y, w, train_idx, test_idx, params)
+        for _, train_idx, test_idx in folds
+    )
+    wall = time.perf_counter() - t0
+
+    for (season, train_idx, test_idx), r in zip(folds, results):
+        r.update(season=f"{season}-{season + 1}", train=len(train_idx), test=len(test_idx))
+    return results, wall
 
 # ======================
-# TRAIN GRADIENT BOOSTING
+# ÉLAGAGE DES ÉTAPES
 # ======================
-print("\n🚀 Entraînement GradientBoosting...")
-
-model = GradientBoostingClassifier(
-    n_estimators=300,
-    max_depth=5,
-    learning_rate=0.08,
-    min_samples_leaf=8,
-    subsample=0.85,
-    random_state=42
-)
-
-model.fit(X, y_enc, sample_weight=sample_weights)
+def staged_cv_accuracy(cv_results: list, n_stages: int, field: str = "stagedWeighted") -> np.ndarray:
+    """Accuracy (ou autre courbe `field`) CV moyenne après 1..n_stages étapes
+    (folds arrêtés tôt : dernière valeur)."""
+    curves = np.empty((len(cv_results), n_stages))
+    for i, r in enumerate(cv_results):
+        staged = r[field][:n_stages]
+        curves[i, :len(staged)] = staged
+        curves[i, len(staged):] = staged[-1]
+    return curves.mean(axis=0)
+
+def prune_point(curve: np.ndarray, tolerance: float, loss_curve: np.ndarray = None,
+                loss_tolerance: float = PRUNE_LOSS_TOLERANCE,
+                min_stages: int = PRUNE_MIN_STAGES) -> int:
+    """
+    Plus petit nombre d'étapes (au moins min_stages) dont l'accuracy reste à
+    `tolerance` du modèle complet et, si loss_curve est fournie, dont la
+    log-loss reste à `loss_tolerance` : un modèle trop court garde la bonne
+    couleur en tête mais des probabilités écrasées vers l'a priori.
+    """
+    ok = curve >= curve[-1] - tolerance
+    if loss_curve is not None:
+        ok &= loss_curve <= loss_curve[-1] + loss_tolerance
+    ok[:min(min_stages, len(curve)) - 1] = False
+    return int(np.argmax(ok)) + 1
+
+def artifact_stats(model_path: Path, compiled_path: Path) -> dict:
+    """Tailles sur disque et temps de chargement (ms) du pickle, du .npz et du dossier .mmap."""
+    directory = mapped_path(compiled_path)
+    t0 = time.perf_counter()
+    joblib.load(model_path)
+    t1 = time.perf_counter()
+    load_compiled(compiled_path)
+    t2 = time.perf_counter()
+    load_mapped(directory)
+    t3 = time.perf_counter()
+    return {
+        "pickleBytes": model_path.stat().st_size,
+        "compiledBytes": compiled_path.stat().st_size,
+        "mappedBytes": sum(f.stat().st_size for f in mapped_current(directory).iterdir()),
+        "pickleLoadMs": round((t1 - t0) * 1000, 1),
+        "compiledLoadMs": round((t2 - t1) * 1000, 2),
+        "mappedLoadMs": round((t3 - t2) * 1000, 2),
+    }
 
 # ======================
-# VALIDATION
+# ENTRAÎNEMENT INCRÉMENTAL
 # ======================
-print("\n📊 Validation croisée (5-fold)...")
-scores = cross_val_score(model, X, y_enc, cv=5, scoring='accuracy')
-print(f"   Accuracy : {scores.mean():.2%} (+/- {scores.std()*2:.2%})")
-
-# Validation par couleur
-from sklearn.metrics import classification_report
-y_pred = model.predict(X)
-y_pred_labels = le.inverse_transform(y_pred)
-print("\n📊 Rapport par couleur (sur données d'entraînement) :")
-print(classification_report(y, y_pred_labels, zero_division=0))
+def load_previous_bundle(path: Path = MODEL_PATH):
+    if not path.exists():
+        return None
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        print(f"⚠️ Bundle précédent illisible : {e}")
+        return None
+
+def full_retrain_reason(previous, engine: str, features: list, classes: list,
+                        params: dict, args, today: date):
+    """None si une mise à jour incrémentale est possible, sinon la raison du réentraînement complet."""
+    if previous is None:
+        return "aucun bundle précédent"
+    if "trained_through" not in previous:
+        return "bundle sans historique d'entraînement"
+    if previous.get("engine", "gb") != engine:
+        return "moteur différent"
+    if previous["features"] != features or previous["classes"] != classes:
+        return "features ou classes modifiées"
+    # Le nombre d'arbres varie d'une mise à jour à l'autre : exclu de la comparaison
+    budget_key = N_ESTIMATORS_PARAM[engine]
+    before = {k: v for k, v in previous.get("hyperparameters", {}).items() if k != budget_key}
+    if before != {k: v for k, v in params.items() if k != budget_key}:
+        return "hyperparamètres modifiés"
+
+    age = (today - date.fromisoformat(previous["full_fit_at"])).days
+    if age >= args.max_age:
+        return f"modèle âgé de {age} jours (seuil {args.max_age})"
+    if previous.get("incremental_stages", 0) + args.incremental_stages > args.max_extra_stages:
+        return f"plus de {args.max_extra_stages} arbres ajoutés depuis l'entraînement complet"
+
+    recent = previous.get("recent_hits", [])[-DRIFT_WINDOW:]
+    if len(recent) >= DRIFT_MIN_DAYS:
+        recent_acc = float(np.mean(recent))
+        if recent_acc < previous["training_accuracy"] - args.drift_tolerance:
+            return (f"dérive : accuracy {recent_acc:.0%} sur les {len(recent)} derniers jours "
+                    f"(validation {previous['training_accuracy']:.0%})")
+    return None
+
+def warm_start_update(model, engine: str, n_new: int, X, y, w):
+    """Ajoute n_new étapes de boosting au modèle existant (warm_start)."""
+    budget_key = N_ESTIMATORS_PARAM[engine]
+    model.set_params(warm_start=True, **{budget_key: fitted_stages(model) + n_new})
+    model.fit(X, y, sample_weight=w)
+    model.set_params(warm_start=False)
+    return model
 
 # ======================
-# FEATURE IMPORTANCE
+# RÉPLIQUES BOOTSTRAP (optionnel)
 # ======================
-print("🔍 Importance des features :")
-importances = sorted(
-    zip(FEATURES, model.feature_importances_),
-    key=lambda x: x[1], reverse=True
-)
-for feat, imp in importances[:10]:
-    print(f"   {feat}: {imp:.3f}")
+def fit_replica(engine: str, seed: int, X: np.ndarray, y: np.ndarray, w: np.ndarray,
+                classes: list, features: list, params: dict = None):
+    """Réplique sur un tirage avec remise stratifié par couleur, compilée dans le worker."""
+    rng = np.random.default_rng(seed)
+    idx = np.concatenate([
+        rng.choice(np.flatnonzero(y == k), size=int((y == k).sum()), replace=True)
+        for k in np.unique(y)
+    ])
+    replica = make_model(engine, random_state=seed, params=params)
+    replica.fit(X[idx], y[idx], sample_weight=w[idx])
+    # Seuls les tableaux compilés reviennent au processus principal
+    return export_model(replica, classes, features)
 
 # ======================
-# SAVE
+# MAIN
 # ======================
-bundle = {
-    "model": model,
-    "label_encoder": le,
-    "features": FEATURES,
-    "class_weights": BASE_WEIGHTS,
-    "model_type": "GradientBoosting",
-    "classes": classes,
-    "training_samples": len(df),
-    "training_accuracy": float(scores.mean())
-}
-
-MODEL_PATH.parent.mkdir(exist_ok=True)
-joblib.dump(bundle, MODEL_PATH)
-
-size = MODEL_PATH.stat().st_size
-print(f"\n✅ Modèle sauvegardé ({size:,} bytes)")
-print(f"🎉 Entraîné sur {len(df)} échantillons avec 3 couleurs !")
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement ML Tempo")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="gb",
+                        help="gb = GradientBoosting (défaut), hgb = HistGradientBoosting")
+    parser.add_argument("--bootstrap", type=int, default=0,
+                        help="nombre de répliques bootstrap (0 = modèle seul)")
+    parser.add_argument("--jobs", type=int, default=-1,
+                        help="processus pour la validation et les répliques (-1 = tous les cœurs)")
+    parser.add_argument("--cv-splits", type=int, default=CV_SPLITS,
+                        help="nombre de saisons de test (0 = sans validation)")
+    parser.add_argument("--tuned", nargs="?", type=Path, const=TUNING_PATH, default=None,
+                        help="utiliser la meilleure configuration de tune_ml.py")
+    parser.add_argument("--incremental", action="store_true",
+                        help="warm_start depuis le bundle précédent si possible")
+    parser.add_argument("--incremental-stages", type=int, default=INCREMENTAL_STAGES)
+    parser.add_argument("--max-age", type=int, default=MAX_MODEL_AGE_DAYS,
+                        help="jours depuis le dernier entraînement complet avant d'en refaire un")
+    parser.add_argument("--max-extra-stages", type=int, default=MAX_EXTRA_STAGES)
+    parser.add_argument("--drift-tolerance", type=float, default=DRIFT_TOLERANCE)
+    parser.add_argument("--force", action="store_true",
+                        help="réentraîner même si le registre contient déjà ce modèle")
+    parser.add_argument("--early-stopping", action="store_true",
+                        help=f"arrêt après {EARLY_STOPPING_ROUNDS} étapes sans progrès "
+                             f"sur {VALIDATION_FRACTION:.0%}% de validation")
+    parser.add_argument("--farm", nargs="*", default=None, metavar="FAMILLE",
+                        help=f"ferme de modèles ({', '.join(CANDIDATES)} ; toutes par défaut)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="pic mémoire Python par étape (tracemalloc, ~2× plus lent)")
+    parser.add_argument("--prune", nargs="?", type=float, const=PRUNE_TOLERANCE, default=None,
+                        help="coupe les dernières étapes (tolérance d'accuracy CV, "
+                             f"défaut {PRUNE_TOLERANCE} ; log-loss CV à {PRUNE_LOSS_TOLERANCE} "
+                             f"près, au moins {PRUNE_MIN_STAGES} étapes)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    profiler = StageProfiler(trace_memory=args.tracemalloc)
+    model_type = ENGINES[args.engine][0]
+    print(f"🌲 Entraînement ML Tempo ({model_type} - 3 couleurs)")
+
+    overrides, tuning = ({}, None) if args.tuned is None \
+        else load_tuned_params(args.tuned, args.engine)
+    params = model_params(args.engine, overrides)
+    if tuning is not None:
+        print(f"🎛️ Hyperparamètres optimisés : {overrides}")
+    if args.early_stopping:
+        overrides = {**overrides, **EARLY_STOPPING[args.engine]}
+        params = model_params(args.engine, overrides)
+
+    df = load_dataset()
+    print_distribution(df)
+    profiler.mark("load", rows=len(df), columns=len(df.columns))
+
+    df, features = engineer_features(df)
+    print(f"\n✅ Features utilisées ({len(features)}) : {features}")
+
+    X = df[features]
+    y = df["color"]
+
+    # ======================
+    # LABEL ENCODER
+    # ======================
+    le = LabelEncoder()
+    y_enc = le.fit_transform(y)
+    classes = list(le.classes_)
+    print(f"🏷️ Classes : {classes}")
+
+    base_weights = compute_class_weights(y, classes)
+    print(f"⚖️ Poids : {base_weights}")
+
+    sample_weights = [base_weights[label] for label in y]
+    profiler.mark("features", rows=len(X), features=len(features))
+
+    # ======================
+    # FERME DE MODÈLES (le modèle de production reste inchangé)
+    # ======================
+    if args.farm is not None:
+        names = args.farm or list(CANDIDATES)
+        unknown = [n for n in names if n not in CANDIDATES]
+        if unknown:
+            raise SystemExit(f"❌ Familles inconnues : {unknown} (disponibles : {list(CANDIDATES)})")
+        boosting = {e: model_params(e, overrides if e == args.engine else None) for e in ENGINES}
+        jobs = None if args.jobs < 0 else args.jobs
+        print(f"\n🏭 Ferme de modèles : {', '.join(names)} (jobs={jobs or 'tous'})...")
+        bundle, report = train_farm(X.values, y_enc, sample_weights, season_folds(df["date"], 1),
+                                    le, features, names, boosting, jobs)
+        bundle.update(training_samples=len(df),
+                      trained_through=df["date"].max().date().isoformat())
+        print_report(report)
+        save_farm(bundle, report)
+        return
+
+    # ======================
+    # MODE (complet ou incrémental)
+    # ======================
+    today = date.today()
+    trained_through = df["date"].max().date().isoformat()
+    previous = load_previous_bundle() if args.incremental else None
+    reason = full_retrain_reason(previous, args.engine, features, classes, params, args, today) \
+        if args.incremental else "mode complet"
+    incremental = reason is None
+
+    # ======================
+    # REGISTRE : mêmes entrées → même modèle
+    # ======================
+    # Un modèle mis à jour par warm_start dépend de sa lignée : mode et
+    # empreinte du modèle parent font partie de la clé
+    parent = (previous.get("training_key") or file_sha256(MODEL_PATH)) if incremental else None
+    registry = ModelRegistry()
+    key = training_key(DATASET_PATH, features, params,
+                       {"engine": args.engine, "bootstrap": args.bootstrap, "prune": args.prune,
+                        "mode": "incremental" if incremental else "full", "parent": parent})
+    known = registry.get(key)
+    if known is not None and known["key"] == key and not args.force:
+        registry.activate(known["id"], MODEL_PATH, COMPILED_PATH)
+        print(f"\n♻️ Dataset et configuration inchangés : modèle {known['id']} "
+              f"du registre réutilisé (entraîné le {known['createdAt']})")
+        return
+
+    # ======================
+    # TRAIN (complet ou incrémental)
+    # ======================
+    t0 = time.perf_counter()
+    if incremental:
+        new_rows = (df["date"] > pd.Timestamp(previous["trained_through"])).to_numpy()
+        if not new_rows.any():
+            print("\n✅ Aucun nouveau jour depuis le dernier entraînement : modèle inchangé")
+            return
+
+        model = previous["model"]
+        # Jours jamais vus : évalués avant mise à jour (suivi de dérive)
+        hits = (model.predict(X[new_rows]) == y_enc[new_rows]).tolist()
+        recent_hits = (previous.get("recent_hits", []) + hits)[-DRIFT_WINDOW:]
+
+        print(f"\n⚡ Mise à jour incrémentale : {int(new_rows.sum())} nouveau(x) jour(s), "
+              f"+{args.incremental_stages} arbres")
+        warm_start_update(model, args.engine, args.incremental_stages, X, y_enc, sample_weights)
+        extra_stages = previous.get("incremental_stages", 0) + args.incremental_stages
+        full_fit_at = previous["full_fit_at"]
+    else:
+        if args.incremental:
+            print(f"\n🔄 Réentraînement complet : {reason}")
+        print(f"\n🚀 Entraînement {model_type}...")
+
+        model = make_model(args.engine, params=overrides)
+        model.fit(X, y_enc, sample_weight=sample_weights)
+        recent_hits, extra_stages, full_fit_at = [], 0, today.isoformat()
+    print(f"   ⏱️ {time.perf_counter() - t0:.1f} s")
+    budget_key = N_ESTIMATORS_PARAM[args.engine]
+    n_stages = fitted_stages(model)
+    if n_stages < model.get_params()[budget_key]:
+        print(f"   ⏹️ Arrêt précoce : {n_stages} étapes sur {model.get_params()[budget_key]}")
+    params[budget_key] = model.get_params()[budget_key]
+    profiler.mark("fit", rows=len(X), features=len(features), boostingStages=n_stages,
+                  mode="incremental" if incremental else "full")
+
+    # ======================
+    # VALIDATION (entraînement complet uniquement)
+    # ======================
+    cv_results = []
+    if incremental:
+        cv_results = previous.get("cv_folds", [])
+        scores = np.array([previous["training_accuracy"]])
+        print(f"\n📊 Validation du dernier entraînement complet : {scores.mean():.2%}")
+    elif args.cv_splits > 0:
+        print(f"\n📊 Validation croisée par saison ({args.cv_splits} saisons de test, jobs={args.jobs})...")
+        cv_results, cv_wall = season_cv(args.engine, X.values, y_enc, sample_weights,
+                                         df["date"], args.cv_splits, args.jobs, overrides)
+        for r in cv_results:
+            print(f"   {r['season']} : {r['accuracy']:.2%} "
+                  f"(train {r['train']}, test {r['test']}, fit {r['fitSeconds']:.1f} s)")
+        scores = np.array([r["accuracy"] for r in cv_results])
+        fold_time = sum(r["seconds"] for r in cv_results)
+        print(f"   Accuracy : {scores.mean():.2%} (+/- {scores.std()*2:.2%})")
+        print(f"   ⏱️ {cv_wall:.1f} s (somme des folds {fold_time:.1f} s, ×{fold_time / cv_wall:.1f})")
+    else:
+        scores = np.array([np.nan])
+
+    # ======================
+    # ÉLAGAGE (entraînement complet avec validation uniquement)
+    # ======================
+    pruning = None
+    if args.prune is not None and not incremental and cv_results:
+        curve = staged_cv_accuracy(cv_results, n_stages)
+        loss_curve = staged_cv_accuracy(cv_results, n_stages, field="stagedLogLoss")
+        kept = min(prune_point(curve, args.prune, loss_curve), n_stages)
+        pruning = {
+            "stagesBefore": n_stages,
+            "stagesAfter": kept,
+            "tolerance": args.prune,
+            "logLossTolerance": PRUNE_LOSS_TOLERANCE,
+            "minStages": PRUNE_MIN_STAGES,
+            "weightedCvAccuracyBefore": float(curve[-1]),
+            "weightedCvAccuracyAfter": float(curve[kept - 1]),
+            "cvLogLossBefore": float(loss_curve[-1]),
+            "cvLogLossAfter": float(loss_curve[kept - 1]),
+        }
+        print(f"\n✂️ Élagage : {n_stages} → {kept} étapes (accuracy CV pondérée "
+              f"{curve[-1]:.2%} → {curve[kept - 1]:.2%}, tolérance {args.prune:.2%} ; "
+              f"log-loss CV {loss_curve[-1]:.4f} → {loss_curve[kept - 1]:.4f}, "
+              f"tolérance {PRUNE_LOSS_TOLERANCE})")
+        if kept < n_stages:
+            truncate_stages(model, kept)
+            n_stages = kept
+            params[budget_key] = kept
+            # Les répliques bootstrap sont entraînées directement à la taille élaguée
+            overrides = {**overrides, budget_key: kept}
+            for r in cv_results:
+                r["accuracy"] = r["staged"][min(kept, r["stages"]) - 1]
+            scores = np.array([r["accuracy"] for r in cv_results])
+    elif args.prune is not None and not incremental:
+        print("\n⚠️ Élagage ignoré : nécessite la validation croisée (--cv-splits > 0)")
+    for r in cv_results:
+        r.pop("staged", None)
+        r.pop("stagedWeighted", None)
+        r.pop("stagedLogLoss", None)
+    profiler.mark("cv", folds=0 if incremental else len(cv_results),
+                  rows=0 if incremental else sum(r["train"] + r["test"] for r in cv_results))
+
+    # Validation par couleur
+    from sklearn.metrics import classification_report
+    y_pred = model.predict(X)
+    y_pred_labels = le.inverse_transform(y_pred)
+    print("\n📊 Rapport par couleur (sur données d'entraînement) :")
+    print(classification_report(y, y_pred_labels, zero_division=0))
+
+    # ======================
+    # FEATURE IMPORTANCE
+    # ======================
+    # HistGradientBoosting n'expose pas d'importances par impureté
+    if hasattr(model, "feature_importances_"):
+        print("🔍 Importance des features :")
+        importances = sorted(
+            zip(features, model.feature_importances_),
+            key=lambda x: x[1], reverse=True
+        )
+        for feat, imp in importances[:10]:
+            print(f"   {feat}: {imp:.3f}")
+
+    profiler.mark("report", rows=len(X))
+
+    # ======================
+    # SAVE
+    # ======================
+    bundle = {
+        "model": model,
+        "label_encoder": le,
+        "features": features,
+        "class_weights": base_weights,
+        "model_type": model_type,
+        "engine": args.engine,
+        "classes": classes,
+        "training_samples": len(df),
+        "training_accuracy": float(scores.mean()),
+        "cv_folds": cv_results,
+        "hyperparameters": params,
+        "tuning": tuning,
+        "n_stages": n_stages,
+        "n_trees": n_stages * (len(classes) if len(classes) > 2 else 1),
+        "pruning": pruning,
+        "bootstrap_replicas": args.bootstrap,
+        "trained_through": trained_through,
+        "full_fit_at": full_fit_at,
+        "incremental_stages": extra_stages,
+        "recent_hits": recent_hits,
+        "training_key": key,
+        "data_hash": file_sha256(DATASET_PATH)
+    }
+
+    MODEL_PATH.parent.mkdir(exist_ok=True)
+    joblib.dump(bundle, MODEL_PATH)
+
+    size = MODEL_PATH.stat().st_size
+    print(f"\n✅ Modèle sauvegardé ({size:,} bytes)")
+    print(f"🎉 Entraîné sur {len(df)} échantillons avec 3 couleurs !")
+    profiler.mark("save", bytes=size)
+
+    # ======================
+    # EXPORT COMPILÉ (prédiction sans sklearn)
+    # ======================
+    compiled = export_model(model, classes, features)
+    compiled.meta["hyperparameters"] = params
+
+    # Contrôle de parité : l'évaluateur NumPy doit reproduire sklearn
+    max_diff = float(np.abs(model.predict_proba(X) - compiled.predict_proba(X.values)).max())
+    if max_diff > 1e-9:
+        raise SystemExit(f"❌ Modèle compilé divergent de sklearn (écart max {max_diff:.2e})")
+
+    # Incrémental : les répliques du dernier entraînement complet sont conservées
+    previous_compiled = load_compiled(COMPILED_PATH) if incremental and COMPILED_PATH.exists() else None
+    if args.bootstrap > 0 and previous_compiled is not None \
+            and previous_compiled.n_models == args.bootstrap + 1:
+        print(f"\n🎯 {args.bootstrap} répliques bootstrap reprises du modèle précédent")
+        replicas = select_models(previous_compiled, list(range(1, args.bootstrap + 1)))
+        compiled = stack_forests([compiled, replicas])
+    elif args.bootstrap > 0:
+        print(f"\n🎯 {args.bootstrap} répliques bootstrap (jobs={args.jobs})...")
+        X_np = X.values.astype(np.float64)
+        w_np = np.asarray(sample_weights, dtype=np.float64)
+        seed0 = params["random_state"] + 1
+        replicas = Parallel(n_jobs=args.jobs)(
+            delayed(fit_replica)(args.engine, seed0 + b, X_np, y_enc, w_np, classes, features,
+                                 overrides)
+            for b in range(args.bootstrap)
+        )
+        compiled = stack_forests([compiled] + replicas)
+
+    save_compiled(compiled, COMPILED_PATH)
+    # Dossier memory-mappé prêt pour la prédiction (évite sa génération au premier chargement)
+    save_mapped(compiled, mapped_path(COMPILED_PATH), source=file_sha256(COMPILED_PATH))
+    size = COMPILED_PATH.stat().st_size
+    print(f"🌳 Modèle compilé sauvegardé ({compiled.n_models} modèle(s), {size:,} bytes, "
+          f"écart max vs sklearn {max_diff:.1e})")
+
+    # Taille et temps de chargement des artefacts livrés, notés dans le bundle
+    bundle["artifacts"] = artifact_stats(MODEL_PATH, COMPILED_PATH)
+    joblib.dump(bundle, MODEL_PATH)
+    a = bundle["artifacts"]
+    print(f"📦 {n_stages} étapes ({bundle['n_trees']} arbres) : "
+          f"pickle {a['pickleBytes']:,} bytes / {a['pickleLoadMs']:.0f} ms, "
+          f"compilé {a['compiledBytes']:,} bytes / {a['compiledLoadMs']:.1f} ms, "
+          f"memory-map {a['mappedLoadMs']:.1f} ms")
+
+    entry = registry.register(key, MODEL_PATH, COMPILED_PATH, {
+        "modelType": model_type,
+        "engine": args.engine,
+        "samples": len(df),
+        "trainedThrough": trained_through,
+        "accuracy": None if np.isnan(scores.mean()) else float(scores.mean()),
+        "incremental": incremental,
+        "bootstrap": args.bootstrap,
+        "hyperparameters": params,
+        "stages": n_stages,
+        "trainingSeconds": round(time.perf_counter() - started, 1),
+    })
+    print(f"🗂️ Registre : entrée {entry['id']}")
+    profiler.mark("export", models=compiled.n_models, bytes=bundle["artifacts"]["compiledBytes"])
+
+    profiler.print_summary()
+    profiler.save(STATS_PATH, engine=args.engine, mode="incremental" if incremental else "full",
+                  rows=len(df), features=len(features), boostingStages=n_stages,
+                  bootstrap=args.bootstrap, registryId=entry["id"])
+    print(f"📝 Instrumentation : {STATS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
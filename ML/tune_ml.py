@@ -0,0 +1,329 @@
+"""
+🎛️ Recherche d'hyperparamètres ML Tempo (successive halving)
+Opt-in : les constantes de train_ml.py restent la référence tant que
+`python ML/train_ml.py --tuned` n'est pas utilisé.
+
+Successive halving : N configurations tirées au hasard (dont la
+configuration actuelle) sont évaluées avec peu d'arbres ; seul le meilleur
+tiers passe au tour suivant avec 3 fois plus d'arbres, jusqu'au budget
+maximal. Score = log-loss moyenne sur les folds par saison de train_ml
+(poids de classe inclus), l'accuracy est conservée pour information.
+
+- Les matrices (X, y, poids, indices des folds) sont écrites une seule fois
+  en .npy et ouvertes en mmap par les workers : rien n'est re-picklé par tâche.
+- Budget temps (--time-budget) : chaque tour est estimé (coût observé par
+  arbre × ligne) avant d'être lancé ; s'il dépasse le temps restant, il est
+  réduit aux meilleures configurations qui tiennent dans le budget, ou sauté.
+  Plus aucune tâche n'est lancée après l'échéance.
+- Reprise : les résultats sont enregistrés dans ML/ml_tuning_state.json
+  (invalidé si les données changent) dès qu'une configuration est entièrement
+  évaluée — le fichier a toujours un "best" ; relancer la commande reprend
+  là où elle s'était arrêtée.
+
+Usage :
+    python ML/tune_ml.py --candidates 27 --time-budget 1500
+    python ML/train_ml.py --tuned
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import log_loss
+from sklearn.preprocessing import LabelEncoder
+from threadpoolctl import threadpool_limits
+
+from train_ml import (
+    ENGINES, N_ESTIMATORS_PARAM, TUNING_PATH, compute_class_weights, engineer_features,
+    load_dataset, make_model, season_folds
+)
+
+DEFAULT_CANDIDATES = 27
+DEFAULT_FACTOR = 3
+DEFAULT_MAX_ESTIMATORS = 300
+DEFAULT_CV_SPLITS = 3
+DEFAULT_TIME_BUDGET = 25 * 60       # secondes
+
+SEARCH_SPACE = {
+    "gb": {
+        "max_depth": [3, 4, 5, 6],
+        "learning_rate": (0.03, 0.2),           # log-uniforme
+        "min_samples_leaf": [4, 8, 16, 32],
+        "subsample": [0.7, 0.85, 1.0],
+    },
+    "hgb": {
+        "max_depth": [3, 4, 5, 6],
+        "learning_rate": (0.03, 0.2),
+        "min_samples_leaf": [4, 8, 16, 32],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+}
+
+# ======================
+# CONFIGURATIONS
+# ======================
+def sample_candidates(engine: str, n: int, seed: int) -> list:
+    """Configurations déterministes pour un seed donné ; la première = constantes actuelles."""
+    space = SEARCH_SPACE[engine]
+    defaults = ENGINES[engine][2]
+    rng = np.random.default_rng(seed)
+
+    candidates = [{k: defaults[k] for k in space if k in defaults}]
+    seen = {json.dumps(candidates[0], sort_keys=True)}
+    while len(candidates) < n:
+        cand = {}
+        for k, values in space.items():
+            if isinstance(values, tuple):
+                lo, hi = np.log(values[0]), np.log(values[1])
+                cand[k] = round(float(np.exp(rng.uniform(lo, hi))), 4)
+            else:
+                cand[k] = values[int(rng.integers(len(values)))]
+        key = json.dumps(cand, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(cand)
+    return candidates
+
+def halving_schedule(n_candidates: int, factor: int, max_estimators: int) -> list:
+    """[(nb de configurations, nb d'arbres), ...] du premier au dernier tour."""
+    rounds = max(1, math.ceil(math.log(n_candidates, factor))) + 1
+    schedule = []
+    n = n_candidates
+    for r in range(rounds):
+        budget = max(1, round(max_estimators / factor ** (rounds - 1 - r)))
+        schedule.append((n, budget))
+        n = max(1, math.ceil(n / factor))
+    return schedule
+
+def task_key(params: dict, n_estimators: int, season: int) -> str:
+    return json.dumps({"params": params, "n": n_estimators, "season": season}, sort_keys=True)
+
+# ======================
+# DONNÉES PARTAGÉES (mmap)
+# ======================
+def materialize(directory: Path, X: np.ndarray, y: np.ndarray, w: np.ndarray, folds: list) -> None:
+    """Écrit une fois les tableaux que les workers ouvriront en lecture mmap."""
+    np.save(directory / "X.npy", np.ascontiguousarray(X, dtype=np.float64))
+    np.save(directory / "y.npy", y)
+    np.save(directory / "w.npy", np.asarray(w, dtype=np.float64))
+    for season, train_idx, test_idx in folds:
+        np.save(directory / f"train_{season}.npy", train_idx)
+        np.save(directory / f"test_{season}.npy", test_idx)
+
+_SHARED = {}
+
+def _init_worker(directory: str) -> None:
+    # Un thread par worker : le parallélisme vient du pool de processus
+    threadpool_limits(1)
+    _SHARED["dir"] = Path(directory)
+    for name in ("X", "y", "w"):
+        _SHARED[name] = np.load(Path(directory) / f"{name}.npy", mmap_mode="r")
+
+def _run_task(engine: str, params: dict, n_estimators: int, season: int, labels: list) -> dict:
+    d = _SHARED["dir"]
+    train_idx = np.load(d / f"train_{season}.npy", mmap_mode="r")
+    test_idx = np.load(d / f"test_{season}.npy", mmap_mode="r")
+    X, y, w = _SHARED["X"], _SHARED["y"], _SHARED["w"]
+
+    t0 = time.perf_counter()
+    model = make_model(engine, params={**params, N_ESTIMATORS_PARAM[engine]: n_estimators})
+    model.fit(X[train_idx], y[train_idx], sample_weight=w[train_idx])
+    proba = model.predict_proba(X[test_idx])
+    return {
+        "logLoss": float(log_loss(y[test_idx], proba, labels=labels)),
+        "accuracy": float((proba.argmax(axis=1) == y[test_idx]).mean()),
+        "seconds": round(time.perf_counter() - t0, 3),
+        "trainRows": len(train_idx),
+    }
+
+# ======================
+# ÉTAT (reprise)
+# ======================
+def data_hash(X: np.ndarray, y: np.ndarray, w: np.ndarray, seasons: list) -> str:
+    h = hashlib.sha256()
+    for a in (np.ascontiguousarray(X, dtype=np.float64), y, np.asarray(w, dtype=np.float64)):
+        h.update(np.ascontiguousarray(a).tobytes())
+    h.update(json.dumps(seasons).encode())
+    return h.hexdigest()
+
+def load_state(path: Path, engine: str, digest: str) -> dict:
+    if path.exists():
+        state = json.loads(path.read_text(encoding="utf-8"))
+        if state.get("engine") == engine and state.get("dataHash") == digest:
+            return state
+        print("♻️ Données ou moteur modifiés : résultats de tuning précédents ignorés")
+    return {"engine": engine, "dataHash": digest, "results": {}, "best": None}
+
+def save_state(path: Path, state: dict) -> bool:
+    """Écrit l'état seulement s'il a une meilleure configuration (lue par train_ml --tuned)."""
+    if state.get("best") is None:
+        return False
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    return True
+
+def summarize(candidates: list, n_estimators: int, seasons: list, results: dict) -> list:
+    """Configurations complètes (tous les folds) à ce budget, triées par log-loss."""
+    ranked = []
+    for params in candidates:
+        fold = [results.get(task_key(params, n_estimators, s)) for s in seasons]
+        if all(fold):
+            ranked.append({
+                "params": params,
+                "nEstimators": n_estimators,
+                "logLoss": float(np.mean([f["logLoss"] for f in fold])),
+                "accuracy": float(np.mean([f["accuracy"] for f in fold])),
+            })
+    return sorted(ranked, key=lambda r: r["logLoss"])
+
+def best_config(candidates: list, schedule: list, seasons: list, results: dict,
+                complete: bool):
+    """Meilleure configuration au plus grand budget entièrement évalué (None si aucune)."""
+    for _, n_estimators in reversed(schedule):
+        ranked = summarize(candidates, n_estimators, seasons, results)
+        if ranked:
+            return {**ranked[0], "complete": complete}
+    return None
+
+def fit_budget(todo: list, n_estimators: int, rows: dict, unit_cost: float, jobs: int,
+               remaining: float) -> tuple:
+    """
+    Tâches du tour qui tiennent dans le temps restant : configurations gardées
+    dans l'ordre (la mieux classée d'abord) tant que leur coût cumulé estimé
+    le permet. Retourne (tâches gardées, estimation du tour complet en s).
+    """
+    cost = {}
+    for p, s in todo:
+        key = json.dumps(p, sort_keys=True)
+        cost[key] = cost.get(key, 0.0) + unit_cost * n_estimators * rows[s] / jobs
+    kept, total = set(), 0.0
+    for key, c in cost.items():
+        if total + c > remaining:
+            break
+        kept.add(key)
+        total += c
+    return [(p, s) for p, s in todo if json.dumps(p, sort_keys=True) in kept], sum(cost.values())
+
+# ======================
+# MAIN
+# ======================
+def main():
+    parser = argparse.ArgumentParser(description="Successive halving des hyperparamètres ML")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="gb")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--factor", type=int, default=DEFAULT_FACTOR)
+    parser.add_argument("--max-estimators", type=int, default=DEFAULT_MAX_ESTIMATORS)
+    parser.add_argument("--cv-splits", type=int, default=DEFAULT_CV_SPLITS)
+    parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET,
+                        help="secondes ; au-delà plus aucune tâche n'est lancée")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--state", type=Path, default=TUNING_PATH)
+    args = parser.parse_args()
+
+    deadline = time.monotonic() + args.time_budget
+    print(f"🎛️ Successive halving ({ENGINES[args.engine][0]}, {args.candidates} configurations, "
+          f"budget {args.time_budget:.0f} s, {args.jobs} processus)")
+
+    df, features = engineer_features(load_dataset())
+    y_labels = df["color"]
+    le = LabelEncoder()
+    y = le.fit_transform(y_labels)
+    weights = compute_class_weights(y_labels, list(le.classes_))
+    w = np.array([weights[c] for c in y_labels])
+    X = df[features].to_numpy(dtype=np.float64)
+
+    folds = season_folds(df["date"], args.cv_splits)
+    seasons = [s for s, _, _ in folds]
+    labels = list(range(len(le.classes_)))
+
+    state = load_state(args.state, args.engine, data_hash(X, y, w, seasons))
+    results = state["results"]
+    state.update(features=features, seasons=seasons)
+
+    schedule = halving_schedule(args.candidates, args.factor, args.max_estimators)
+    print("📐 Tours : " + " → ".join(f"{n}×{b} arbres" for n, b in schedule))
+
+    all_candidates = sample_candidates(args.engine, args.candidates, args.seed)
+    candidates = all_candidates
+    # Coût observé par (arbre × ligne d'entraînement), pour estimer les tours suivants
+    unit_costs = [r["seconds"] / (json.loads(k)["n"] * r["trainRows"]) for k, r in results.items()]
+    finished = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        materialize(Path(tmp), X, y, w, folds)
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                 initargs=(tmp,)) as pool:
+            for round_no, (n_keep, n_estimators) in enumerate(schedule, 1):
+                if round_no > 1:
+                    ranked = summarize(candidates, schedule[round_no - 2][1], seasons, results)
+                    candidates = [r["params"] for r in ranked[:n_keep]]
+
+                todo = [(p, s) for p in candidates for s, train_idx, _ in folds
+                        if task_key(p, n_estimators, s) not in results]
+                rows = {s: len(train_idx) for s, train_idx, _ in folds}
+                remaining = deadline - time.monotonic()
+                if unit_costs and todo:
+                    kept, estimate = fit_budget(todo, n_estimators, rows, float(np.median(unit_costs)),
+                                                args.jobs, remaining)
+                    print(f"🔁 Tour {round_no} : {len(candidates)} config × {n_estimators} arbres, "
+                          f"{len(todo)} tâche(s), ~{estimate:.0f} s estimées ({remaining:.0f} s restantes)")
+                    if len(kept) < len(todo):
+                        finished = False
+                        if not kept:
+                            print(f"⏳ Tour {round_no} sauté : estimation au-delà du budget temps")
+                            break
+                        n_configs = len({json.dumps(p, sort_keys=True) for p, _ in kept})
+                        print(f"   ✂️ Réduit aux {n_configs} meilleure(s) configuration(s) "
+                              f"({len(kept)} tâche(s)) pour tenir le budget")
+                        todo = kept
+                else:
+                    print(f"🔁 Tour {round_no} : {len(candidates)} config × {n_estimators} arbres, "
+                          f"{len(todo)} tâche(s)")
+
+                pending = {}
+                queue = list(todo)
+                while queue or pending:
+                    # Pas de nouvelle tâche après l'échéance
+                    while queue and len(pending) < args.jobs and time.monotonic() < deadline:
+                        p, s = queue.pop(0)
+                        pending[pool.submit(_run_task, args.engine, p, n_estimators, s, labels)] = (p, s)
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        p, s = pending.pop(fut)
+                        r = fut.result()
+                        results[task_key(p, n_estimators, s)] = r
+                        unit_costs.append(r["seconds"] / (n_estimators * r["trainRows"]))
+                    state["best"] = best_config(all_candidates, schedule, seasons, results, False)
+                    save_state(args.state, state)
+
+                if queue:
+                    finished = False
+                    print(f"⏳ Budget temps atteint au tour {round_no} : relancer pour reprendre")
+                    break
+
+    state["best"] = best_config(all_candidates, schedule, seasons, results, finished)
+    state["updatedAt"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    best = state["best"]
+    if not save_state(args.state, state):
+        raise SystemExit("❌ Aucune configuration entièrement évaluée (état non écrit)")
+    print(f"\n🏆 Meilleure configuration ({best['nEstimators']} arbres"
+          f"{'' if finished else ', recherche incomplète'}) :")
+    for k, v in best["params"].items():
+        print(f"   {k} = {v}")
+    print(f"   log-loss {best['logLoss']:.4f} | accuracy {best['accuracy']:.2%}")
+    print(f"💾 Sauvegardé : {args.state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -215,6 +215,63 @@ function renderTempo(days, mlData) {
   });
 }
 
+/* ==========================
+   PRÉVISION SAISON (CHARGEMENT DIFFÉRÉ)
+   ML/ml_season_forecast.json n'est téléchargé qu'au premier clic
+========================== */
+const seasonToggle = document.getElementById("season-toggle");
+const seasonDiv    = document.getElementById("season");
+let seasonLoaded   = false;
+
+if (seasonToggle && seasonDiv) {
+  seasonToggle.addEventListener("click", () => {
+    seasonDiv.hidden = !seasonDiv.hidden;
+    seasonToggle.textContent = seasonDiv.hidden
+      ? "Afficher la prévision ML saison"
+      : "Masquer la prévision ML saison";
+
+    if (seasonLoaded || seasonDiv.hidden) return;
+    seasonLoaded = true;
+    seasonDiv.innerHTML = "<p class='no-history'>Chargement…</p>";
+
+    fetch("ML/ml_season_forecast.json?v=" + Date.now())
+      .then(r => r.json())
+      .then(renderSeason)
+      .catch(err => {
+        console.error("Erreur prévision saison:", err);
+        seasonLoaded = false;
+        seasonDiv.innerHTML = "<p class='no-history'>Prévision saison indisponible</p>";
+      });
+  });
+}
+
+function renderSeason(forecast) {
+  const days = forecast?.days || [];
+  if (days.length === 0) {
+    seasonDiv.innerHTML = "<p class='no-history'>Prévision saison indisponible</p>";
+    return;
+  }
+
+  // Regroupement par mois, une case par jour (couleur de la séquence jointe)
+  const months = {};
+  days.forEach(d => {
+    const key = d.date.slice(0, 7);
+    (months[key] = months[key] || []).push(d);
+  });
+
+  seasonDiv.innerHTML = Object.entries(months).map(([key, list]) => {
+    const label = new Date(key + "-01").toLocaleDateString("fr-FR", { month: "long", year: "numeric" });
+    const cells = list.map(d => {
+      const color = d.mlJointPrediction || d.mlPrediction;
+      const p = d.mlProbabilities;
+      const title = `${formatDate(d.date)} : ${color} (🔴 ${p.rouge}% ⚪ ${p.blanc}% 🔵 ${p.bleu}%)`
+        + (d.temperatureSource === "climatologie" ? " • météo climatologique" : "");
+      return `<span class="season-day ${color}" title="${title}"></span>`;
+    }).join("");
+    return `<div class="season-month"><div class="season-label">${label}</div>${cells}</div>`;
+  }).join("");
+}
+
 /* ==========================
    HISTORIQUE — VALIDÉ EDF
 ========================== */
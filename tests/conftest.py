@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les scripts ML s'importent par nom de module depuis ML/ (comme `python ML/xxx.py`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ML"))
@@ -0,0 +1,153 @@
+"""Parité CompiledForest ↔ sklearn (predict_proba), pour les deux moteurs ; dossier .mmap."""
+import threading
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+
+from compiled_model import (
+    export_model, load_mapped, mapped_current, mapped_path, mapped_source, open_shared,
+    save_compiled, save_mapped, select_models, stack_forests
+)
+
+FEATURES = ["temp", "rte", "weekday", "month"]
+CLASSES = ["blanc", "bleu", "rouge"]
+TOLERANCE = 1e-9
+
+def make_data(n=600, seed=0, missing=0.0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.normal(8, 6, n),
+        rng.normal(55000, 8000, n),
+        rng.integers(0, 7, n),
+        rng.integers(1, 13, n),
+    ]).astype(float)
+    score = -X[:, 0] / 4 + (X[:, 1] - 55000) / 5000 + rng.normal(0, 1, n)
+    y = np.digitize(score, [-1.0, 1.5])
+    if missing:
+        X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+def fit(engine, X, y, seed=0):
+    if engine == "gb":
+        model = GradientBoostingClassifier(n_estimators=30, max_depth=3, subsample=0.85,
+                                           random_state=seed)
+    else:
+        model = HistGradientBoostingClassifier(max_iter=30, max_depth=4, early_stopping=False,
+                                               random_state=seed)
+    return model.fit(X, y)
+
+@pytest.mark.parametrize("engine", ["gb", "hgb"])
+def test_predict_proba_matches_sklearn(engine):
+    X, y = make_data()
+    model = fit(engine, X, y)
+    compiled = export_model(model, CLASSES, FEATURES)
+    X_test, _ = make_data(seed=1)
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test),
+                               rtol=0, atol=TOLERANCE)
+
+def test_binary_classifier_matches_sklearn():
+    X, y = make_data()
+    y = (y == 1).astype(int)
+    model = fit("gb", X, y)
+    compiled = export_model(model, CLASSES[:2], FEATURES)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X),
+                               rtol=0, atol=TOLERANCE)
+
+def test_hgb_missing_values_follow_sklearn():
+    # Entraîné avec des NaN : sklearn apprend un sens (gauche/droite) par nœud
+    X, y = make_data(missing=0.15)
+    model = fit("hgb", X, y)
+    compiled = export_model(model, CLASSES, FEATURES)
+    assert compiled.missing_left.any()
+
+    X_test, _ = make_data(seed=2, missing=0.3)
+    X_test[:5] = np.nan                                   # lignes entièrement manquantes
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test),
+                               rtol=0, atol=TOLERANCE)
+
+@pytest.mark.parametrize("engine", ["gb", "hgb"])
+def test_stacked_replicas_match_each_model(engine):
+    X, y = make_data(missing=0.1 if engine == "hgb" else 0.0)
+    if engine == "gb":
+        X = np.nan_to_num(X)
+    # Modèles de tailles différentes : stack_forests complète par une feuille nulle
+    models = [fit(engine, X, y, seed=s) for s in range(3)]
+    models[2].set_params(**({"n_estimators": 12} if engine == "gb" else {"max_iter": 12}))
+    models[2].fit(X, y)
+    stacked = stack_forests([export_model(m, CLASSES, FEATURES) for m in models])
+    assert stacked.n_models == 3
+
+    X_test, _ = make_data(seed=3, missing=0.2 if engine == "hgb" else 0.0)
+    expected = np.stack([m.predict_proba(X_test) for m in models], axis=1)
+    np.testing.assert_allclose(stacked.predict_proba_all(X_test), expected,
+                               rtol=0, atol=TOLERANCE)
+
+    # Reprise des répliques (entraînement incrémental) : select_models puis ré-empilement
+    replicas = select_models(stacked, [1, 2])
+    assert len(replicas.feature) < len(stacked.feature)
+    np.testing.assert_allclose(replicas.predict_proba_all(X_test), expected[:, 1:],
+                               rtol=0, atol=TOLERANCE)
+    restacked = stack_forests([export_model(models[0], CLASSES, FEATURES), replicas])
+    np.testing.assert_allclose(restacked.predict_proba_all(X_test), expected,
+                               rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(restacked.predict_proba(X_test), expected[:, 0],
+                               rtol=0, atol=TOLERANCE)
+
+def test_mapped_versions_swap_atomically(tmp_path):
+    X, y = make_data()
+    forests = [export_model(fit("gb", X, y, seed=s), CLASSES, FEATURES) for s in range(2)]
+    expected = [f.predict_proba(X) for f in forests]
+    npz = tmp_path / "model.npz"
+    save_compiled(forests[0], npz)
+    directory = mapped_path(npz)
+    save_mapped(forests[0], directory, source="a")
+
+    # Lecteurs pendant des réécritures successives : toujours une version complète
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        k = 0
+        while not stop.is_set():
+            k += 1
+            save_mapped(forests[k % 2], directory, source="ab"[k % 2])
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(200):
+            try:
+                proba = load_mapped(directory).predict_proba(X)
+            except OSError:
+                continue            # version supprimée entre CURRENT et l'ouverture
+            if not any(np.allclose(proba, e, rtol=0, atol=TOLERANCE) for e in expected):
+                errors.append("mélange de versions")
+            assert open_shared(npz, mapped_source(directory) or "a") is not None
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
+    # Au plus la version courante et la précédente restent sur disque
+    assert len([p for p in directory.iterdir() if p.is_dir()]) <= 2
+    assert mapped_current(directory).parent == directory
+
+def test_open_shared_reads_legacy_layout(tmp_path):
+    X, y = make_data()
+    forest = export_model(fit("gb", X, y), CLASSES, FEATURES)
+    npz = tmp_path / "model.npz"
+    save_compiled(forest, npz)
+    # Ancien format : fichiers .npy directement dans le dossier .mmap
+    legacy = mapped_path(npz)
+    save_mapped(forest, legacy, source="old")
+    version = mapped_current(legacy)
+    for f in version.iterdir():
+        f.rename(legacy / f.name)
+    version.rmdir()
+    (legacy / "CURRENT").unlink()
+    assert mapped_source(legacy) == "old"
+
+    shared = open_shared(npz, "new")
+    np.testing.assert_allclose(shared.predict_proba(X), forest.predict_proba(X), rtol=0, atol=0)
+    assert mapped_source(legacy) == "new"
+    assert not any(f.name.endswith(".npy") for f in legacy.iterdir() if f.is_file())
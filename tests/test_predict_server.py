@@ -0,0 +1,39 @@
+"""predict_server.py : validation des requêtes POST /predict (ValueError → 400)."""
+import pytest
+
+from features import FEATURES
+from predict_server import check_day, check_overrides, check_used_days
+from tempo_rules import MAX_DAYS
+
+
+def test_used_days_accepts_counters_within_quota():
+    assert check_used_days(None) == {}
+    assert check_used_days({"rouge": 3, "blanc": 5.0}) == {"rouge": 3, "blanc": 5}
+
+@pytest.mark.parametrize("used", [
+    {"violet": 1},
+    {"rouge": float("inf")},
+    {"rouge": 10 ** 400},
+    {"rouge": -1},
+    {"rouge": MAX_DAYS["rouge"] + 1},
+    {"rouge": 2.5},
+    {"rouge": True},
+    {"rouge": "3"},
+    [3, 0],
+])
+def test_used_days_rejects_bad_values(used):
+    with pytest.raises(ValueError):
+        check_used_days(used)
+
+def test_overrides_limited_to_model_features():
+    feature = FEATURES[0]
+    assert check_overrides(None, FEATURES) is None
+    assert check_overrides({feature: 1.5}, FEATURES) == {feature: 1.5}
+    for overrides in ({"inconnue": 1}, {feature: "x"}, {feature: float("nan")}, [feature]):
+        with pytest.raises(ValueError):
+            check_overrides(overrides, FEATURES)
+
+def test_day_rejects_unrepresentable_numbers():
+    check_day({"date": "2027-01-04", "temperature": 3})
+    with pytest.raises(ValueError):
+        check_day({"date": "2027-01-04", "temperature": 10 ** 400})
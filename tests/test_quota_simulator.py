@@ -0,0 +1,83 @@
+"""quota_simulator.py : simulation et point d'entrée sur les fichiers de jours réels."""
+import json
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+
+import predict_ml
+import quota_simulator
+from compiled_model import export_model
+from features import FEATURES
+from predict_ml import format_prediction
+from tempo_rules import COLORS, MAX_DAYS
+
+START = date(2027, 1, 4)
+
+@pytest.fixture
+def compiled_bundle(monkeypatch):
+    """Petit modèle compilé sur les features du pipeline, à la place du modèle du dépôt."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, len(FEATURES)))
+    y = rng.integers(0, len(COLORS), 300)
+    model = GradientBoostingClassifier(n_estimators=5, max_depth=2, random_state=0).fit(X, y)
+    compiled = export_model(model, sorted(COLORS), FEATURES)
+    bundle = {"model": compiled, "features": compiled.features, "classes": compiled.classes,
+              "model_type": "test", "model_hash": "test"}
+    monkeypatch.setattr(predict_ml, "load_bundle", lambda *a, **k: bundle)
+    monkeypatch.setattr(predict_ml, "load_used_days", lambda *a, **k: {c: 0 for c in COLORS})
+    return bundle
+
+def season_forecast(n_days: int) -> dict:
+    """Même forme que ML/ml_season_forecast.json (predict_season.py)."""
+    days = []
+    for i in range(n_days):
+        d = START + timedelta(days=i)
+        p = format_prediction(d.isoformat(), np.array([0.7, 0.2, 0.1]))
+        p.update(mlJointPrediction="bleu", temperature=2.5, temperatureSource="climatologie")
+        days.append(p)
+    return {"generatedAt": "2027-01-04T11:30:00Z", "seasonEnd": days[-1]["date"],
+            "modelType": "test", "usedDays": {c: 0 for c in COLORS}, "days": days}
+
+def run_main(monkeypatch, days_file, output, paths=500):
+    monkeypatch.setattr(sys, "argv", [
+        "quota_simulator.py", "--paths", str(paths), "--seed", "1",
+        "--days-file", str(days_file), "--output", str(output),
+    ])
+    quota_simulator.main()
+    return json.loads(output.read_text(encoding="utf-8"))
+
+def test_main_reads_season_forecast(monkeypatch, tmp_path, compiled_bundle):
+    days_file = tmp_path / "ml_season_forecast.json"
+    days_file.write_text(json.dumps(season_forecast(20)), encoding="utf-8")
+    result = run_main(monkeypatch, days_file, tmp_path / "simulation.json")
+
+    assert [d["date"] for d in result["days"]] == [d["date"] for d in season_forecast(20)["days"]]
+    for day in result["days"]:
+        assert sum(day["marginals"].values()) == pytest.approx(100, abs=0.5)
+    assert result["remaining"]["rouge"]["mean"] <= MAX_DAYS["rouge"]
+
+def test_main_reads_tempo_list(monkeypatch, tmp_path, compiled_bundle):
+    tempo = [{"date": (START + timedelta(days=i)).isoformat(), "fixed": i == 0}
+             for i in range(5)]
+    days_file = tmp_path / "tempo.json"
+    days_file.write_text(json.dumps(tempo), encoding="utf-8")
+    result = run_main(monkeypatch, days_file, tmp_path / "simulation.json")
+    assert len(result["days"]) == 4
+
+def test_load_days_rejects_other_shapes(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps({"predictions": []}), encoding="utf-8")
+    with pytest.raises(SystemExit):
+        quota_simulator.load_days(path)
+
+def test_simulation_respects_quotas():
+    dates = [START + timedelta(days=i) for i in range(40)]
+    P = np.tile([0.0, 0.0, 1.0], (len(dates), 1))          # toujours rouge si possible
+    used = {"bleu": 0, "blanc": 0, "rouge": MAX_DAYS["rouge"] - 3}
+    result = quota_simulator.simulate(P, dates, used, n_paths=200, seed=0)
+    rouge = result["marginals"][:, COLORS.index("rouge")]
+    assert rouge.sum() == pytest.approx(3)
+    assert (result["remaining"][:, COLORS.index("rouge")] == 0).all()